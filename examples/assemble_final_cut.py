@@ -0,0 +1,71 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Example: Assemble the final cut of a Text2Video project
+
+Joins the chosen copy of every scene (stream copy, no re-encode unless a clip's
+format differs) and lays the scene voiceovers over them.
+
+Usage:
+    python examples/assemble_final_cut.py <dir_videos> -o final.mp4 [--title T]
+        [--audio-dir DIR] [--choose 3=2 --choose 5=4] [--no-4k]
+
+Voiceovers are picked up from --audio-dir as scene_NN_audio.mp3 (the names
+generate_batch_audio writes).
+"""
+
+import argparse
+import os
+import sys
+from pathlib import Path
+
+# Add project root to path
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+
+from services.final_assembly import find_scene_clips, get_final_assembler
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Assemble scene clips into the final video")
+    parser.add_argument("dir_videos", help="Project video folder")
+    parser.add_argument("-o", "--output", required=True, help="Output file (.mp4)")
+    parser.add_argument("--title", help="Project title used in the clip file names")
+    parser.add_argument("--audio-dir", help="Folder with scene_NN_audio.mp3 voiceovers")
+    parser.add_argument("--choose", action="append", default=[], metavar="SCENE=COPY",
+                        help="Copy to use for a scene (default: lowest copy)")
+    parser.add_argument("--no-4k", action="store_true", help="Ignore _4k upscaled files")
+    args = parser.parse_args()
+
+    choices = {}
+    for item in args.choose:
+        scene, _, copy = item.partition("=")
+        choices[int(scene)] = int(copy)
+
+    clips = find_scene_clips(args.dir_videos, args.title, choices, prefer_4k=not args.no_4k)
+    if not clips:
+        print(f"❌ No scene clips found in {args.dir_videos}")
+        return 1
+    for scene, path in clips.items():
+        print(f"  Scene {scene}: {os.path.basename(path)}")
+
+    audio = {}
+    if args.audio_dir:
+        for scene in clips:
+            path = os.path.join(args.audio_dir, f"scene_{scene:02d}_audio.mp3")
+            if os.path.exists(path):
+                audio[scene] = path
+
+    try:
+        info = get_final_assembler().assemble(clips, args.output, audio=audio, progress=print)
+    except RuntimeError as e:
+        print(f"❌ {e}")
+        return 1
+
+    print(f"✓ {info['path']}: {len(info['scenes'])} scenes, {info['duration']:.1f}s "
+          f"in {info['seconds']:.1f}s (re-encoded: {info['reencoded'] or 'none'})")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,125 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Benchmark: Content Policy Filter cost per prompt
+
+Measures ContentPolicyFilter.age_up_text / detect_minor_references and the full
+sanitize_prompt_for_google_labs call on scene prompts with large character
+bibles, and compares age-up with the previous approach (compile and apply one
+regex per keyword on every call). Both produce the same text; the script checks
+that too.
+
+Usage:
+    python examples/benchmark_content_policy.py [--scenes 60] [--repeat 200]
+"""
+
+import argparse
+import json
+import re
+import sys
+import time
+from pathlib import Path
+
+# Add project root to path
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+
+from services.google.content_policy_filter import (
+    AGE_PATTERN_EN,
+    AGE_PATTERN_VI,
+    AGE_UP_REPLACEMENTS_EN,
+    AGE_UP_REPLACEMENTS_VI,
+    ContentPolicyFilter,
+    sanitize_prompt_for_google_labs,
+)
+
+
+def legacy_age_up_text(text: str, min_age: int = 18) -> str:
+    """The per-keyword implementation age_up_text replaced (reference for timing/output)."""
+    result = text
+    for keyword, replacement in AGE_UP_REPLACEMENTS_VI.items():
+        result = re.compile(re.escape(keyword), re.IGNORECASE).sub(replacement, result)
+    for keyword, replacement in AGE_UP_REPLACEMENTS_EN.items():
+        result = re.compile(r'\b' + re.escape(keyword) + r'\b', re.IGNORECASE).sub(replacement, result)
+
+    def age_replacer_vi(match):
+        age = int(match.group(1))
+        return f"20 {match.group(0).split()[-1]}" if age < min_age else match.group(0)
+
+    def age_replacer_en(match):
+        age = int(match.group(1))
+        return f"20{match.group(0).split(str(age))[-1]}" if age < min_age else match.group(0)
+
+    result = AGE_PATTERN_VI.sub(age_replacer_vi, result)
+    return AGE_PATTERN_EN.sub(age_replacer_en, result)
+
+
+def build_scene_prompt(index: int) -> dict:
+    """A scene prompt shaped like the Text2Video output, with a 6-character bible."""
+    bible = []
+    for c in range(6):
+        bible.append({
+            "name": f"Nhân vật {c}",
+            "role": "main" if c == 0 else "support",
+            "visual_identity": (
+                "Một người phụ nữ trưởng thành với mái tóc đen dài, mặc áo dài trắng, "
+                "ánh mắt sáng, phong thái tự tin; adult woman, long black hair, white ao dai, "
+                "confident posture, soft cinematic lighting, 35mm film grain. " * 4
+            ),
+            "key_trait": "kiên định, ấm áp",
+        })
+    return {
+        "scene": index,
+        "character_details": json.dumps(bible, ensure_ascii=False),
+        "prompt": (
+            f"Cảnh {index}: buổi chiều ở phố cổ Hội An, đèn lồng đỏ, người bán hàng rong, "
+            "camera dolly chậm từ trái sang phải, ánh hoàng hôn vàng cam. "
+            "A quiet street market at dusk, lanterns swaying, shallow depth of field. " * 6
+        ),
+        "negative_prompt": "blurry, low quality, watermark, text overlay",
+    }
+
+
+def timed(fn, repeat: int) -> float:
+    start = time.perf_counter()
+    for _ in range(repeat):
+        fn()
+    return (time.perf_counter() - start) / repeat
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[1])
+    parser.add_argument("--scenes", type=int, default=60)
+    parser.add_argument("--repeat", type=int, default=200)
+    args = parser.parse_args()
+
+    prompts = [build_scene_prompt(i) for i in range(1, args.scenes + 1)]
+    texts = [json.dumps(p, ensure_ascii=False) for p in prompts]
+    # One scene in ten mentions a minor, as in "Cô Bé Bán Diêm"-style stories
+    for i in range(0, len(texts), 10):
+        texts[i] += " Cô bé bán diêm 12 tuổi, a little girl and her kid brother."
+    avg_len = sum(len(t) for t in texts) // len(texts)
+
+    filt = ContentPolicyFilter()
+    for t in texts:
+        assert filt.age_up_text(t) == legacy_age_up_text(t), "output differs from legacy age_up_text"
+
+    per_legacy = timed(lambda: [legacy_age_up_text(t) for t in texts], max(1, args.repeat // 10)) / len(texts)
+    per_age_up = timed(lambda: [filt.age_up_text(t) for t in texts], args.repeat) / len(texts)
+    per_detect = timed(lambda: [filt.detect_minor_references(t) for t in texts], args.repeat) / len(texts)
+    per_sanitize = timed(lambda: [sanitize_prompt_for_google_labs(p) for p in prompts],
+                         max(1, args.repeat // 10)) / len(prompts)
+
+    print("=" * 70)
+    print(f"Content policy filter - {len(texts)} scene prompts, ~{avg_len:,} chars each")
+    print("=" * 70)
+    print(f"age_up_text (per-keyword regex, legacy): {per_legacy * 1e6:10.1f} µs/prompt")
+    print(f"age_up_text (compiled matcher):          {per_age_up * 1e6:10.1f} µs/prompt"
+          f"  ({per_legacy / per_age_up:.1f}x)")
+    print(f"detect_minor_references:                 {per_detect * 1e6:10.1f} µs/prompt")
+    print(f"sanitize_prompt_for_google_labs (dict):  {per_sanitize * 1e6:10.1f} µs/prompt")
+    print("✓ Output identical to the legacy implementation")
+
+
+if __name__ == "__main__":
+    main()
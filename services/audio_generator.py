@@ -5,6 +5,7 @@ Utilities to generate audio for video scenes
 """
 import json
 import logging
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from typing import Dict, Any, Optional, List
 from pathlib import Path
 
@@ -13,6 +14,14 @@ from services.tts_service import generate_audio_from_scene
 logger = logging.getLogger(__name__)
 
 
+def _max_workers() -> int:
+    try:
+        from utils import config as cfg
+        return max(1, int(cfg.get_section("tts").get("max_workers", 6)))
+    except Exception:
+        return 6
+
+
 def generate_scene_audio(scene_data: Dict[str, Any], 
                          output_dir: str,
                          scene_index: Optional[int] = None) -> Optional[str]:
@@ -61,6 +70,9 @@ def generate_batch_audio(scenes: List[Dict[str, Any]],
     """
     Generate audio files for multiple scenes
     
+    Scenes are synthesised concurrently (tts.max_workers); each provider's own
+    concurrency limit still applies, and unchanged lines come from the TTS cache.
+    
     Args:
         scenes: List of scene data dicts
         output_dir: Directory to save audio files
@@ -73,20 +85,33 @@ def generate_batch_audio(scenes: List[Dict[str, Any]],
     # Create output directory
     Path(output_dir).mkdir(parents=True, exist_ok=True)
 
-    for i, scene in enumerate(scenes, 1):
-        scene_index = scene.get("scene_index") or scene.get("scene", i)
-
-        logger.info(f"Generating audio for scene {scene_index}...")
-
-        audio_path = generate_scene_audio(scene, output_dir, scene_index)
-
-        if audio_path:
-            results[scene_index] = audio_path
-            logger.info(f"✓ Scene {scene_index} audio: {audio_path}")
-        else:
-            logger.warning(f"⚠ Failed to generate audio for scene {scene_index}")
-
-    return results
+    indexed = [(scene.get("scene_index") or scene.get("scene", i), scene)
+               for i, scene in enumerate(scenes, 1)]
+    if not indexed:
+        return results
+
+    with ThreadPoolExecutor(max_workers=min(_max_workers(), len(indexed)),
+                            thread_name_prefix="TTS") as pool:
+        futures = {}
+        for scene_index, scene in indexed:
+            logger.info(f"Generating audio for scene {scene_index}...")
+            futures[pool.submit(generate_scene_audio, scene, output_dir, scene_index)] = scene_index
+
+        for fut in as_completed(futures):
+            scene_index = futures[fut]
+            try:
+                audio_path = fut.result()
+            except Exception as e:
+                logger.error(f"Audio generation for scene {scene_index} raised: {e}")
+                audio_path = None
+
+            if audio_path:
+                results[scene_index] = audio_path
+                logger.info(f"✓ Scene {scene_index} audio: {audio_path}")
+            else:
+                logger.warning(f"⚠ Failed to generate audio for scene {scene_index}")
+
+    return {k: results[k] for k, _ in indexed if k in results}
 
 
 def validate_voiceover_config(voiceover_config: Dict[str, Any]) -> tuple:
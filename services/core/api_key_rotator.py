@@ -3,9 +3,10 @@
 API Key Rotator - Smart rotation with exponential backoff
 Based on geminiService.ts logic with enhanced error handling
 """
-import time
 from typing import List, Callable, Any, Optional
 
+from services.core.key_manager import INVALID, OK, RATE_LIMITED, get_key_registry, outcome_for_error
+
 
 class APIKeyRotationError(Exception):
     """Error raised when all API keys fail"""
@@ -17,22 +18,29 @@ class APIKeyRotator:
     Smart API key rotation with exponential backoff and intelligent retry logic
     
     Features:
-    - Exponential backoff: 10s, 20s, 40s, 60s... (optimized for Gemini free tier)
+    - Tries each key at most once per call, usable keys first
+    - Per-key backoff/cooldown shared process-wide (services.core.key_manager registry),
+      so a key rate limited by one call is skipped by the next
     - Smart error handling: retry 429, fail fast on 401
     - Transparent logging
-    - Minimum 5s delay between key switches for rate limit safety
     """
 
-    def __init__(self, keys: List[str], log_callback: Optional[Callable[[str], None]] = None):
+    # Longest wait for a key to leave its cooldown before giving up
+    MAX_BACKOFF_SECONDS = 60
+
+    def __init__(self, keys: List[str], log_callback: Optional[Callable[[str], None]] = None,
+                 provider: str = "google"):
         """
         Initialize rotator with keys and optional logging
         
         Args:
             keys: List of API keys to rotate through
             log_callback: Optional callback function for logging (receives string messages)
+            provider: Key rotation registry to use (default: Gemini keys)
         """
-        self.keys = keys if keys else []
+        self.keys = list(dict.fromkeys(k for k in keys if k)) if keys else []
         self.log_callback = log_callback
+        self.registry = get_key_registry(provider)
 
         if not self.keys:
             raise APIKeyRotationError("No API keys provided")
@@ -42,9 +50,6 @@ class APIKeyRotator:
         if self.log_callback:
             self.log_callback(msg)
 
-    # Maximum backoff delay in seconds (increased for free tier safety)
-    MAX_BACKOFF_SECONDS = 60
-
     def execute(self, api_call: Callable[[str], Any]) -> Any:
         """
         Execute an API call with smart key rotation and error handling
@@ -61,38 +66,39 @@ class APIKeyRotator:
         """
         last_error = None
         rate_limit_count = 0
-
-        for idx, key in enumerate(self.keys):
-            # Exponential backoff optimized for Gemini free tier (15 RPM = 4s per request)
-            # Start with 10s base delay and double each time
-            # Progression: 10s, 20s, 40s, 80s... (capped at 60s max)
-            if idx > 0:
-                delay = 10 * (2 ** (idx - 1))  # 10s, 20s, 40s, 80s...
-                # Cap at MAX_BACKOFF_SECONDS to avoid excessive waits
-                delay = min(delay, self.MAX_BACKOFF_SECONDS)
-                self._log(f"[BACKOFF] Waiting {delay}s before trying next key...")
-                time.sleep(delay)
+        # Keys recently rejected with 401/403 fail fast instead of being waited for
+        remaining = self.registry.valid(self.keys)
+        if len(remaining) < len(self.keys):
+            self._log(f"[FAIL] {len(self.keys) - len(remaining)} key(s) skipped: invalid or forbidden (401/403) recently")
+
+        while remaining:
+            wait = min(self.registry.seconds_until_ready(k) for k in remaining)
+            if wait > 0:
+                self._log(f"[BACKOFF] Waiting {wait:.0f}s for the next available key...")
+            key = self.registry.acquire(remaining, timeout=self.MAX_BACKOFF_SECONDS)
+            if key is None:
+                self._log(f"[EXHAUSTED] No key became available within {self.MAX_BACKOFF_SECONDS}s")
+                break
+            remaining.remove(key)
 
             key_preview = f"...{key[-6:]}" if len(key) > 6 else "***"
-            self._log(f"[KEY {idx + 1}/{len(self.keys)}] Trying key {key_preview}")
+            self._log(f"[KEY {len(self.keys) - len(remaining)}/{len(self.keys)}] Trying key {key_preview}")
 
             try:
                 result = api_call(key)
-                self._log(f"[SUCCESS] Key {key_preview} succeeded")
-                return result
-
             except Exception as e:
                 error_msg = str(e).lower()
                 last_error = e
+                outcome = outcome_for_error(e)
+                self.registry.release(key, outcome)
 
-                # Check HTTP status codes in error message
-                # 401: Unauthorized - key is invalid, skip to next immediately
-                if '401' in error_msg or 'unauthorized' in error_msg or 'invalid api key' in error_msg:
-                    self._log(f"[FAIL] Key {key_preview} is invalid (401/unauthorized)")
+                # 401/403: key is invalid or lacks permission, skip to next immediately
+                if outcome == INVALID:
+                    self._log(f"[FAIL] Key {key_preview} is invalid or forbidden (401/403)")
                     continue
 
-                # 429: Rate limit - continue with backoff
-                if '429' in error_msg or 'rate limit' in error_msg or 'quota' in error_msg or 'resource_exhausted' in error_msg:
+                # 429: Rate limit - key backs off in the shared registry
+                if outcome == RATE_LIMITED:
                     rate_limit_count += 1
                     self._log(f"[RATE LIMIT] Key {key_preview} hit rate limit (429) - {rate_limit_count}/{len(self.keys)} keys exhausted")
                     
@@ -101,11 +107,6 @@ class APIKeyRotator:
                         self._log(f"[WARNING] All {len(self.keys)} API keys are rate limited. Consider using Whisk or waiting longer.")
                     continue
 
-                # 403: Forbidden - permission issue, skip
-                if '403' in error_msg or 'forbidden' in error_msg:
-                    self._log(f"[FORBIDDEN] Key {key_preview} has permission issues (403)")
-                    continue
-
                 # 5xx: Server errors - might be transient, continue
                 if any(code in error_msg for code in ['500', '502', '503', '504']):
                     self._log(f"[SERVER ERROR] Key {key_preview} encountered server error (5xx)")
@@ -115,6 +116,10 @@ class APIKeyRotator:
                 self._log(f"[ERROR] Key {key_preview} failed: {str(e)[:100]}")
                 continue
 
+            self.registry.release(key, OK)
+            self._log(f"[SUCCESS] Key {key_preview} succeeded")
+            return result
+
         # All keys exhausted
         error_summary = f"All {len(self.keys)} API keys failed"
         if last_error:
@@ -2,60 +2,62 @@
 """
 Unified Configuration Loader - Single source for all configuration loading
 Replaces all duplicate _cfg() implementations across services
+
+Backed by the in-memory config store in utils.config: the file is re-read only
+when its mtime/size changes, so per-request reads cost no file I/O.
 """
 import json
 from pathlib import Path
-from typing import Dict, Any, Optional
+from typing import Dict, Any
+
+from utils import config as _store
+from utils.config import (  # noqa: F401  (typed accessors re-exported for services)
+    get,
+    get_bool,
+    get_float,
+    get_int,
+    get_list,
+    get_section,
+    get_str,
+    version,
+)
 
 CFG_PATH = Path.home() / ".veo_image2video_cfg.json"
-_CACHE: Optional[Dict[str, Any]] = None
+
+# Used when the config file is missing or unreadable
+_DEFAULTS: Dict[str, Any] = {
+    "google_api_keys": [],
+    "labs_tokens": [],
+    "download_root": str(Path.home() / "Downloads")
+}
 
 
 def load(force_reload: bool = False) -> Dict[str, Any]:
     """
-    Load configuration from file (cached for performance)
-    
+    Load configuration from file (cached, invalidated when the file changes)
+
     Args:
         force_reload: If True, bypass cache and reload from disk
-        
+
     Returns:
-        Configuration dictionary
+        Configuration dictionary (shared; do not modify)
     """
-    global _CACHE
-
-    if _CACHE is not None and not force_reload:
-        return _CACHE
-
-    if CFG_PATH.exists():
-        try:
-            with open(CFG_PATH, "r", encoding="utf-8") as f:
-                _CACHE = json.load(f)
-                return _CACHE
-        except Exception:
-            # If file is corrupted, return default config
-            pass
-
-    # Default configuration
-    _CACHE = {
-        "google_api_keys": [],
-        "labs_tokens": [],
-        "download_root": str(Path.home() / "Downloads")
-    }
-    return _CACHE
+    if force_reload:
+        _store.invalidate()
+    raw = _store.raw_snapshot()
+    return raw if raw is not None else _DEFAULTS
 
 
 def save(cfg: Dict[str, Any]) -> bool:
     """
     Save configuration to file (atomic write)
-    
+
     Args:
         cfg: Configuration dictionary to save
-        
+
     Returns:
         True if successful, False otherwise
     """
-    global _CACHE
-
     try:
         # Atomic write using temporary file
         temp_path = CFG_PATH.with_suffix('.tmp')
@@ -64,15 +66,13 @@ def save(cfg: Dict[str, Any]) -> bool:
 
         # Rename is atomic on most filesystems
         temp_path.replace(CFG_PATH)
-
-        # Update cache
-        _CACHE = cfg
         return True
     except Exception:
         return False
+    finally:
+        _store.invalidate()
 
 
 def clear_cache():
     """Clear the configuration cache (useful for testing)"""
-    global _CACHE
-    _CACHE = None
+    _store.invalidate()
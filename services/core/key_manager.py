@@ -2,10 +2,19 @@
 """
 Unified API Key Management - Single source for all key rotation and management
 Replaces all duplicate key management implementations across services
+
+Key pools (which keys exist) are rebuilt from the config. Rotation state (which
+key may be used now) lives in one KeyRotationRegistry per provider for the
+whole session: per-key token buckets, call spacing, 429 backoff/cooldown and
+401/403 lockouts are shared by every caller, so a key Google just throttled is
+skipped by the next image, script, vision or TTS request too.
 """
-from typing import List
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, List, Optional
+import re
 import threading
-from services.core.config import load as load_config
+import time
+from services.core.config import load as load_config, version as config_version
 
 
 class KeyPool:
@@ -46,9 +55,27 @@ _POOLS = {
 }
 
 
-def refresh():
-    """Refresh all key pools from configuration"""
-    cfg = load_config()
+_loaded_version = None
+_refresh_lock = threading.Lock()
+
+
+def refresh(force: bool = False):
+    """
+    Refresh all key pools from configuration
+
+    Pools are only rebuilt when the config content changed since the last
+    refresh (or when ``force`` is set), so calling this per request is cheap.
+    """
+    global _loaded_version
+    with _refresh_lock:
+        current = config_version()
+        if not force and current == _loaded_version:
+            return
+        _loaded_version = current
+        _rebuild_pools(load_config())
+
+
+def _rebuild_pools(cfg):
 
     # Google keys
     google_keys = []
@@ -78,13 +105,13 @@ def refresh():
     _POOLS['labs'].set_keys(labs_tokens)
 
     # OpenAI keys
-    openai_keys = cfg.get('openai_api_keys', [])
+    openai_keys = list(cfg.get('openai_api_keys', []))
     if cfg.get('openai_api_key'):
         openai_keys.append(cfg['openai_api_key'])
     _POOLS['openai'].set_keys(openai_keys)
 
     # ElevenLabs keys
-    elevenlabs_keys = cfg.get('elevenlabs_api_keys', [])
+    elevenlabs_keys = list(cfg.get('elevenlabs_api_keys', []))
     _POOLS['elevenlabs'].set_keys(elevenlabs_keys)
 
 
@@ -98,7 +125,7 @@ def get_key(provider: str) -> str:
     Returns:
         API key or empty string if none available
     """
-    refresh()  # Always refresh to get latest config
+    refresh()  # No-op unless the config file changed
     return _POOLS.get(provider, KeyPool()).get_next()
 
 
@@ -137,3 +164,294 @@ def rotated_list(provider: str, base_list: List[str]) -> List[str]:
 
     # Move key to front
     return [key] + [x for x in base_list if x != key]
+
+
+@dataclass
+class KeyUsageTracker:
+    """Track usage statistics for a single API key"""
+    key: str
+    total_calls: int = 0
+    failed_calls: int = 0
+    rate_limit_hits: int = 0
+    last_used_time: float = 0.0
+    last_rate_limit_time: float = 0.0
+    cooldown_until: float = 0.0  # Unix timestamp when key is available again
+    consecutive_failures: int = 0
+    tokens: float = -1.0  # Token bucket level (-1: not used yet, bucket full)
+    refilled_at: float = 0.0
+    in_flight: int = 0
+    invalid_until: float = 0.0  # 401/403 lockout (part of cooldown_until, kept apart so callers can skip it)
+
+
+# Outcomes passed to KeyRotationRegistry.release()
+OK = "ok"
+RATE_LIMITED = "rate_limited"
+INVALID = "invalid"
+ERROR = "error"
+
+# Text fallback for errors without an HTTP response; codes only as whole numbers
+# (not inside a URL path, byte count or "401ms")
+_RATE_LIMIT_RE = re.compile(r"(?<![\w/.])429(?![\w/.])|rate limit|quota|resource_exhausted|too many requests")
+_INVALID_RE = re.compile(r"(?<![\w/.])40[13](?![\w/.])|unauthorized|invalid api key|forbidden|permission_denied")
+
+# Defaults for every provider; the optional "key_rotation" config section overrides
+# them per provider. The token bucket and call spacing are off unless configured
+# (e.g. rpm 15 for Gemini free-tier keys), so paid keys are not throttled.
+_ROTATION_DEFAULTS = {
+    "rpm": 0,                     # Requests per minute per key (0: no token bucket)
+    "burst": 1,                   # Token bucket size
+    "min_interval_sec": 0.0,      # Minimum spacing between calls on one key
+    "backoff_sec": 2.0,           # First 429 backoff, doubled per consecutive 429
+    "max_backoffs": 3,            # Consecutive 429s before the long cooldown
+    "cooldown_sec": 60.0,
+    "invalid_cooldown_sec": 600.0,  # 401/403: key skipped this long
+}
+
+
+def outcome_for_status(status_code: int) -> str:
+    """Registry outcome of an HTTP response status"""
+    if status_code == 429:
+        return RATE_LIMITED
+    if status_code in (401, 403):
+        return INVALID
+    if status_code == 408 or status_code >= 500:
+        return ERROR
+    return OK
+
+
+def outcome_for_error(error: Exception) -> str:
+    """Registry outcome of a failed call: its HTTP status if it has one, else its text"""
+    status = getattr(getattr(error, "response", None), "status_code", None)
+    if isinstance(status, int):
+        outcome = outcome_for_status(status)
+        return ERROR if outcome == OK else outcome
+    msg = str(error).lower()
+    if _RATE_LIMIT_RE.search(msg):
+        return RATE_LIMITED
+    if _INVALID_RE.search(msg):
+        return INVALID
+    return ERROR
+
+
+class KeyRotationRegistry:
+    """
+    Process-wide rotation state for one provider's keys
+
+    Usage:
+        registry = get_key_registry('google')
+        key = registry.acquire(keys)            # waits for a usable key
+        try:
+            response = call(key)
+        finally:
+            registry.release(key, outcome_for_status(response.status_code))
+
+    Callers that must not wait use ``order(keys)`` to try usable keys first,
+    with ``begin(key)`` / ``release(key, outcome)`` around each call. Pass
+    ``valid(keys)`` to acquire() to leave out keys rejected with 401/403,
+    rather than waiting out their lockout.
+    """
+
+    def __init__(self, provider: str, rpm: float = 0, burst: int = 1, min_interval_sec: float = 0.0,
+                 backoff_sec: float = 2.0, max_backoffs: int = 3, cooldown_sec: float = 60.0,
+                 invalid_cooldown_sec: float = 600.0):
+        self.provider = provider
+        self.rpm = float(rpm)
+        self.burst = max(1, int(burst))
+        self.min_interval = float(min_interval_sec)
+        self.backoff = float(backoff_sec)
+        self.max_backoffs = max(1, int(max_backoffs))
+        self.cooldown = float(cooldown_sec)
+        self.invalid_cooldown = float(invalid_cooldown_sec)
+        self.lock = threading.Lock()
+        self._changed = threading.Condition(self.lock)
+        self._trackers: Dict[str, KeyUsageTracker] = {}
+
+    def _get(self, key: str) -> KeyUsageTracker:
+        tracker = self._trackers.get(key)
+        if tracker is None:
+            tracker = self._trackers[key] = KeyUsageTracker(key=key)
+        return tracker
+
+    def tracker(self, key: str) -> KeyUsageTracker:
+        """Shared state object of a key (created on first use)"""
+        with self.lock:
+            return self._get(key)
+
+    def _refill(self, tracker: KeyUsageTracker, now: float):
+        if tracker.tokens < 0:
+            tracker.tokens = float(self.burst)
+        else:
+            tracker.tokens = min(float(self.burst), tracker.tokens + (now - tracker.refilled_at) * self.rpm / 60.0)
+        tracker.refilled_at = now
+
+    def _ready_at(self, tracker: KeyUsageTracker, now: float) -> float:
+        """Earliest time the key may be used (lock held)"""
+        at = tracker.cooldown_until
+        if tracker.last_used_time:
+            at = max(at, tracker.last_used_time + self.min_interval)
+        if self.rpm > 0:
+            self._refill(tracker, now)
+            if tracker.tokens < 1:
+                at = max(at, now + (1 - tracker.tokens) * 60.0 / self.rpm)
+        return at
+
+    def _begin(self, tracker: KeyUsageTracker, now: float):
+        if self.rpm > 0:
+            self._refill(tracker, now)
+            tracker.tokens -= 1
+        tracker.last_used_time = now
+        tracker.total_calls += 1
+        tracker.in_flight += 1
+
+    def order(self, keys: List[str]) -> List[str]:
+        """Keys by when they can next be used, least recently used first among ready ones (never waits)"""
+        keys = [k for k in dict.fromkeys(keys) if k]
+        with self.lock:
+            now = time.time()
+            return sorted(keys, key=lambda k: (max(self._ready_at(self._get(k), now), now),
+                                               self._get(k).last_used_time))
+
+    def valid(self, keys: List[str]) -> List[str]:
+        """Keys not locked out by a recent 401/403 (waiting for those would take invalid_cooldown_sec)"""
+        keys = [k for k in dict.fromkeys(keys) if k]
+        with self.lock:
+            now = time.time()
+            return [k for k in keys if self._get(k).invalid_until <= now]
+
+    def seconds_until_ready(self, key: str) -> float:
+        with self.lock:
+            now = time.time()
+            return max(0.0, self._ready_at(self._get(key), now) - now)
+
+    def acquire(self, keys: List[str], exclusive: bool = False, timeout: Optional[float] = None,
+                should_stop: Optional[Callable[[], bool]] = None) -> Optional[str]:
+        """
+        Reserve the least recently used key that is usable now, waiting for one if needed
+
+        Args:
+            keys: Candidate keys
+            exclusive: Skip keys that already have a call in flight (one lane per key)
+            timeout: Give up after this many seconds (None: wait as long as it takes)
+            should_stop: Polled while waiting; returning True gives up
+
+        Returns:
+            The key (pair with release()), or None on timeout/stop/no keys
+        """
+        keys = [k for k in dict.fromkeys(keys) if k]
+        if not keys:
+            return None
+        deadline = time.time() + timeout if timeout is not None else None
+        with self._changed:
+            while True:
+                if should_stop and should_stop():
+                    return None
+                now = time.time()
+                candidates = [self._get(k) for k in keys]
+                if exclusive:
+                    candidates = [t for t in candidates if not t.in_flight]
+                ready_at = {t.key: self._ready_at(t, now) for t in candidates}
+                ready = [t for t in candidates if ready_at[t.key] <= now]
+                if ready:
+                    tracker = min(ready, key=lambda t: t.last_used_time)
+                    self._begin(tracker, now)
+                    return tracker.key
+                if deadline is not None and now >= deadline:
+                    return None
+                wake = min(ready_at.values()) if ready_at else now + 1.0
+                if deadline is not None:
+                    wake = min(wake, deadline)
+                # Releases notify; the cap keeps should_stop responsive
+                self._changed.wait(min(max(wake - now, 0.01), 1.0))
+
+    def begin(self, key: str):
+        """Record a call started without acquire() (caller picked the key itself)"""
+        with self.lock:
+            self._begin(self._get(key), time.time())
+
+    def release(self, key: str, outcome: str = OK) -> float:
+        """
+        Record how a call on ``key`` ended and wake waiting callers
+
+        Returns:
+            Seconds the key is now held back for (0 if it can be reused right away)
+        """
+        delay = 0.0
+        with self._changed:
+            tracker = self._get(key)
+            now = time.time()
+            tracker.in_flight = max(0, tracker.in_flight - 1)
+            if outcome == OK:
+                tracker.consecutive_failures = 0
+                tracker.invalid_until = 0.0
+            elif outcome == RATE_LIMITED:
+                tracker.failed_calls += 1
+                tracker.rate_limit_hits += 1
+                tracker.last_rate_limit_time = now
+                tracker.consecutive_failures += 1
+                if tracker.consecutive_failures > self.max_backoffs:
+                    delay = self.cooldown
+                    tracker.consecutive_failures = 0
+                else:
+                    delay = self.backoff * (2 ** (tracker.consecutive_failures - 1))
+            elif outcome == INVALID:
+                tracker.failed_calls += 1
+                delay = self.invalid_cooldown
+                tracker.invalid_until = now + delay
+            else:
+                tracker.failed_calls += 1
+            if delay:
+                tracker.cooldown_until = max(tracker.cooldown_until, now + delay)
+            self._changed.notify_all()
+        return delay
+
+    def status(self, keys: Optional[List[str]] = None) -> Dict[str, Any]:
+        """Usage statistics and availability of the given (or all known) keys"""
+        with self.lock:
+            now = time.time()
+            trackers = [self._get(k) for k in keys] if keys is not None else list(self._trackers.values())
+            details = [{
+                'key_preview': f"...{t.key[-6:]}" if len(t.key) > 6 else "***",
+                'total_calls': t.total_calls,
+                'failed_calls': t.failed_calls,
+                'rate_limit_hits': t.rate_limit_hits,
+                'consecutive_failures': t.consecutive_failures,
+                'in_flight': t.in_flight,
+                'is_available': now >= t.cooldown_until,
+                'cooldown_remaining': max(0, t.cooldown_until - now),
+            } for t in trackers]
+        return {
+            'total_keys': len(details),
+            'available_keys': sum(1 for d in details if d['is_available']),
+            'rate_limited_keys': sum(1 for d in details if not d['is_available']),
+            'key_details': details,
+        }
+
+
+_registries: Dict[str, KeyRotationRegistry] = {}
+_registries_lock = threading.Lock()
+
+
+def _rotation_cfg(provider: str) -> dict:
+    try:
+        from utils import config as cfg
+        return cfg.get_section("key_rotation").get(provider) or {}
+    except Exception:
+        return {}
+
+
+def get_key_registry(provider: str) -> KeyRotationRegistry:
+    """
+    Get the session-wide rotation registry of a provider
+    ('google' for Gemini text/image/vision, 'google_tts', 'openai', 'elevenlabs')
+    Limits come from the optional "key_rotation" config section
+
+    Returns:
+        KeyRotationRegistry instance
+    """
+    with _registries_lock:
+        registry = _registries.get(provider)
+        if registry is None:
+            settings = dict(_ROTATION_DEFAULTS)
+            settings.update({k: v for k, v in _rotation_cfg(provider).items() if k in _ROTATION_DEFAULTS})
+            registry = _registries[provider] = KeyRotationRegistry(provider, **settings)
+        return registry
@@ -0,0 +1,306 @@
+# services/final_assembly.py
+"""
+Final Assembly Service - Build the final cut from scene clips and voiceovers
+
+The chosen copy of every scene is joined with ffmpeg's concat demuxer and the
+video stream is copied, not re-encoded. Clips are probed first; a clip whose
+codec, resolution, frame rate, pixel format or time base differs from the
+majority is re-encoded to match (in parallel), and only that clip. Scene
+voiceovers are laid over their scenes in the same ffmpeg run: each one is padded
+or trimmed to its scene's length and the joined track is muxed next to the
+copied video, optionally mixed with the clips' own audio. Only audio is decoded.
+"""
+
+import json
+import os
+import re
+import shutil
+import subprocess
+import tempfile
+import threading
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, List, Optional, Tuple
+
+from utils.filename_sanitizer import sanitize_filename
+
+# Re-encode mismatched segments with the encoder of the majority codec
+_ENCODERS = {"h264": "libx264", "hevc": "libx265"}
+_AUDIO_RATE = 48000
+
+
+def _cfg() -> dict:
+    try:
+        from utils import config as cfg
+        return cfg.get_section("assembly")
+    except Exception:
+        return {}
+
+
+def _concat_line(path: str) -> str:
+    # concat demuxer list syntax: single-quoted, with ' written as '\''
+    return "file '" + os.path.abspath(path).replace("'", "'\\''") + "'"
+
+
+def find_scene_clips(dir_videos: str, title: Optional[str] = None,
+                     choices: Optional[Dict[int, int]] = None,
+                     prefer_4k: bool = True) -> Dict[int, str]:
+    """
+    Chosen clip per scene in a project's video folder.
+
+    Files follow the Text2Video naming (``{title}_scene{n}_copy{k}.mp4`` or
+    ``scene_{n:03d}_copy_{k:02d}.mp4``, plus ``_4k`` variants).
+
+    Args:
+        choices: Copy number to use per scene; other scenes use their lowest copy
+        prefer_4k: Use the upscaled files when every chosen clip has one (mixing
+            4K and 1080p clips would force re-encoding)
+
+    Returns:
+        {scene number: clip path}, ordered by scene
+    """
+    choices = choices or {}
+    prefix = ""
+    if title:
+        # Sanitize a whole sample name, as the downloader does, and keep the title part
+        sample = sanitize_filename(f"{title}_scene0_copy0.mp4")
+        prefix = re.escape(sample[:-len("scene0_copy0.mp4")])
+    pattern = re.compile(
+        rf"^(?:{prefix}scene(?P<s1>\d+)_copy(?P<c1>\d+)|scene_(?P<s2>\d+)_copy_(?P<c2>\d+))(?P<k>_4k)?\.mp4$",
+        re.IGNORECASE)
+    found: Dict[int, Dict[int, Dict[bool, str]]] = {}
+    try:
+        names = os.listdir(dir_videos)
+    except OSError:
+        return {}
+    for name in names:
+        m = pattern.match(name)
+        if not m:
+            continue
+        scene = int(m.group("s1") or m.group("s2"))
+        copy = int(m.group("c1") or m.group("c2"))
+        found.setdefault(scene, {}).setdefault(copy, {})[bool(m.group("k"))] = os.path.join(dir_videos, name)
+
+    picked = {}
+    for scene in sorted(found):
+        copies = found[scene]
+        copy = choices.get(scene) if choices.get(scene) in copies else min(copies)
+        picked[scene] = copies[copy]
+    use_4k = prefer_4k and picked and all(True in v for v in picked.values())
+    return {scene: v[True] if use_4k else v.get(False) or v[True] for scene, v in picked.items()}
+
+
+class FinalAssembler:
+    """
+    Usage:
+        assembler = get_final_assembler()
+        clips = find_scene_clips(dir_videos, title)
+        audio = generate_batch_audio(scenes, dir_audio)     # {scene: mp3 path}
+        info = assembler.assemble(clips, out_path, audio=audio)
+        info["reencoded"]                                    # scenes that had to be converted
+    """
+
+    def __init__(self, max_workers: Optional[int] = None, preset: str = "veryfast", crf: int = 18,
+                 keep_clip_audio: bool = True, clip_audio_volume: float = 0.25,
+                 audio_bitrate: str = "192k"):
+        self.max_workers = max(1, max_workers or os.cpu_count() or 2)
+        self.preset = preset
+        self.crf = int(crf)
+        self.keep_clip_audio = keep_clip_audio
+        self.clip_audio_volume = float(clip_audio_volume)
+        self.audio_bitrate = audio_bitrate
+        self._pool = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="Assembly")
+
+    # ---- probing -------------------------------------------------------
+
+    @staticmethod
+    def probe(path: str) -> Dict:
+        """Stream parameters that must match for a stream-copy concat, plus duration."""
+        cmd = ["ffprobe", "-v", "error", "-show_streams", "-show_format", "-of", "json", path]
+        result = subprocess.run(cmd, capture_output=True, text=True, timeout=30)
+        if result.returncode != 0:
+            raise RuntimeError(f"ffprobe failed for {os.path.basename(path)}: {result.stderr.strip()[:200]}")
+        data = json.loads(result.stdout or "{}")
+        streams = data.get("streams") or []
+        video = next((s for s in streams if s.get("codec_type") == "video"), None)
+        if video is None:
+            raise RuntimeError(f"No video stream in {os.path.basename(path)}")
+        audio = next((s for s in streams if s.get("codec_type") == "audio"), None)
+        return {
+            "video": (video.get("codec_name"), video.get("profile"), int(video.get("width") or 0),
+                      int(video.get("height") or 0), video.get("pix_fmt"),
+                      video.get("r_frame_rate"), video.get("time_base")),
+            "audio": (audio.get("codec_name"), audio.get("sample_rate"), audio.get("channels")) if audio else None,
+            "duration": float((data.get("format") or {}).get("duration") or video.get("duration") or 0.0),
+        }
+
+    # ---- segment normalisation ----------------------------------------
+
+    def _conform(self, src: str, dst: str, ref: Dict, has_audio: bool):
+        """Re-encode ``src`` to the reference video/audio parameters."""
+        codec, profile, width, height, pix_fmt, rate, time_base = ref["video"]
+        vf = (f"scale={width}:{height}:force_original_aspect_ratio=decrease,"
+              f"pad={width}:{height}:(ow-iw)/2:(oh-ih)/2,setsar=1,fps={rate},format={pix_fmt}")
+        cmd = ["ffmpeg", "-y", "-v", "error", "-i", src]
+        if ref["audio"] and not has_audio:
+            # Every segment needs the same streams; give a silent clip a silent track
+            cmd += ["-f", "lavfi", "-i", f"anullsrc=r={ref['audio'][1]}:cl=stereo"]
+        cmd += ["-vf", vf, "-c:v", _ENCODERS.get(codec, "libx264"),
+                "-preset", self.preset, "-crf", str(self.crf)]
+        if codec == "h264" and (profile or "").lower() in ("baseline", "constrained baseline", "main", "high"):
+            cmd += ["-profile:v", profile.lower().replace("constrained ", "")]
+        if time_base and "/" in time_base:
+            cmd += ["-video_track_timescale", time_base.split("/")[1]]
+        if ref["audio"]:
+            _, a_rate, a_channels = ref["audio"]
+            cmd += ["-map", "0:v:0", "-map", "0:a:0" if has_audio else "1:a:0", "-shortest",
+                    "-c:a", "aac", "-ar", str(a_rate), "-ac", str(a_channels), "-b:a", self.audio_bitrate]
+        else:
+            cmd += ["-map", "0:v:0", "-an"]
+        cmd.append(dst)
+        result = subprocess.run(cmd, capture_output=True, text=True)
+        if result.returncode != 0:
+            raise RuntimeError(f"Re-encode failed for {os.path.basename(src)}: {result.stderr.strip()[-300:]}")
+
+    # ---- assembly ------------------------------------------------------
+
+    def _audio_graph(self, durations: List[float], audio_inputs: Dict[int, int],
+                     clip_audio: bool) -> Tuple[str, str]:
+        """filter_complex building the voiceover track; returns (graph, output label)."""
+        fmt = f"aresample={_AUDIO_RATE},aformat=sample_fmts=fltp:channel_layouts=stereo"
+        parts, labels = [], []
+        for i, duration in enumerate(durations):
+            label = f"vo{i}"
+            if i in audio_inputs:
+                parts.append(f"[{audio_inputs[i]}:a:0]{fmt},apad,atrim=0:{duration:.3f},asetpts=N/SR/TB[{label}]")
+            else:
+                parts.append(f"anullsrc=r={_AUDIO_RATE}:cl=stereo,atrim=0:{duration:.3f},{fmt}[{label}]")
+            labels.append(f"[{label}]")
+        parts.append(f"{''.join(labels)}concat=n={len(labels)}:v=0:a=1[vo]")
+        if not clip_audio:
+            return ";".join(parts), "[vo]"
+        parts.append(f"[0:a:0]{fmt},volume={self.clip_audio_volume}[bed]")
+        parts.append("[vo][bed]amix=inputs=2:duration=first:dropout_transition=0,"
+                     "volume=2[mix]")  # amix halves each input; restore voiceover level
+        return ";".join(parts), "[mix]"
+
+    def assemble(self, clips: Dict[int, str], output_path: str,
+                 audio: Optional[Dict[int, str]] = None,
+                 progress: Optional[Callable[[str], None]] = None) -> Dict:
+        """
+        Join the clips (in scene order) into ``output_path``.
+
+        Args:
+            clips: {scene number: clip path}
+            audio: {scene number: voiceover file}; scenes without one get silence
+                (or just their own audio when clip audio is kept)
+            progress: Optional callback for log lines
+
+        Returns:
+            {"path", "duration", "scenes", "reencoded": [scene numbers], "seconds"}
+
+        Raises:
+            RuntimeError: ffmpeg/ffprobe missing or failing
+        """
+        if not clips:
+            raise RuntimeError("No clips to assemble")
+        if not shutil.which("ffmpeg") or not shutil.which("ffprobe"):
+            raise RuntimeError("ffmpeg/ffprobe not found in PATH")
+        log = progress or (lambda msg: None)
+        start = time.perf_counter()
+        scenes = sorted(clips)
+        audio = {s: p for s, p in (audio or {}).items() if s in clips and p and os.path.exists(p)}
+
+        probes = dict(zip(scenes, self._pool.map(lambda s: self.probe(clips[s]), scenes)))
+        ref_video = Counter(p["video"] for p in probes.values()).most_common(1)[0][0]
+        # Clip audio is kept only when most clips have it; silent ones then get a silent track
+        with_audio = [p["audio"] for p in probes.values() if p["audio"]]
+        ref_audio = Counter(with_audio).most_common(1)[0][0] if len(with_audio) * 2 > len(probes) else None
+        ref = {"video": ref_video, "audio": ref_audio}
+        mismatched = [s for s in scenes
+                      if probes[s]["video"] != ref_video or (ref_audio and probes[s]["audio"] != ref_audio)]
+
+        out_dir = os.path.dirname(os.path.abspath(output_path))
+        os.makedirs(out_dir, exist_ok=True)
+        work = tempfile.mkdtemp(prefix=".assembly_", dir=out_dir)
+        try:
+            segments = {s: clips[s] for s in scenes}
+            if mismatched:
+                log(f"[ASSEMBLY] Re-encode {len(mismatched)}/{len(scenes)} cảnh khác định dạng: "
+                    f"{', '.join(map(str, mismatched))}")
+                targets = {s: os.path.join(work, f"scene_{s:03d}.mp4") for s in mismatched}
+                list(self._pool.map(
+                    lambda s: self._conform(clips[s], targets[s], ref, probes[s]["audio"] is not None),
+                    mismatched))
+                segments.update(targets)
+                for s in mismatched:
+                    probes[s]["duration"] = self.probe(targets[s])["duration"]
+
+            list_file = os.path.join(work, "concat.txt")
+            with open(list_file, "w", encoding="utf-8") as f:
+                f.write("\n".join(_concat_line(segments[s]) for s in scenes) + "\n")
+
+            cmd = ["ffmpeg", "-y", "-v", "error", "-f", "concat", "-safe", "0", "-i", list_file]
+            if audio:
+                audio_inputs = {}
+                for i, s in enumerate(scenes):
+                    if s in audio:
+                        audio_inputs[i] = len(audio_inputs) + 1
+                        cmd += ["-i", audio[s]]
+                graph, out_label = self._audio_graph(
+                    [probes[s]["duration"] for s in scenes], audio_inputs,
+                    clip_audio=self.keep_clip_audio and ref_audio is not None)
+                cmd += ["-filter_complex", graph, "-map", "0:v:0", "-map", out_label,
+                        "-c:v", "copy", "-c:a", "aac", "-b:a", self.audio_bitrate, "-shortest"]
+            else:
+                cmd += ["-map", "0:v:0"] + (["-map", "0:a:0"] if ref_audio else []) + ["-c", "copy"]
+            tmp_out = os.path.join(work, "final" + (os.path.splitext(output_path)[1] or ".mp4"))
+            cmd += ["-movflags", "+faststart", tmp_out]
+
+            log(f"[ASSEMBLY] Ghép {len(scenes)} cảnh (stream copy), {len(audio)} voiceover…")
+            result = subprocess.run(cmd, capture_output=True, text=True)
+            if result.returncode != 0:
+                raise RuntimeError(f"ffmpeg concat failed: {result.stderr.strip()[-300:]}")
+            os.replace(tmp_out, output_path)
+        finally:
+            shutil.rmtree(work, ignore_errors=True)
+
+        info = {
+            "path": output_path,
+            "duration": sum(probes[s]["duration"] for s in scenes),
+            "scenes": scenes,
+            "reencoded": mismatched,
+            "seconds": time.perf_counter() - start,
+        }
+        log(f"[ASSEMBLY] Xong: {output_path} ({info['duration']:.1f}s video, {info['seconds']:.1f}s xử lý)")
+        return info
+
+
+# Global service instance
+_global_assembler: Optional[FinalAssembler] = None
+_assembler_lock = threading.Lock()
+
+
+def get_final_assembler() -> FinalAssembler:
+    """
+    Get the process-wide final assembly service
+    Settings come from the optional "assembly" config section
+
+    Returns:
+        FinalAssembler instance
+    """
+    global _global_assembler
+
+    with _assembler_lock:
+        if _global_assembler is None:
+            c = _cfg()
+            _global_assembler = FinalAssembler(
+                max_workers=int(c.get("max_workers") or 0) or None,
+                preset=str(c.get("preset", "veryfast")),
+                crf=int(c.get("crf", 18)),
+                keep_clip_audio=bool(c.get("keep_clip_audio", True)),
+                clip_audio_volume=float(c.get("clip_audio_volume", 0.25)),
+                audio_bitrate=str(c.get("audio_bitrate", "192k")),
+            )
+        return _global_assembler
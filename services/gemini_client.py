@@ -1,7 +1,7 @@
 # -*- coding: utf-8 -*-
-import requests, time, random
+import requests, time
 from typing import List, Optional
-from services.core.key_manager import get_all_keys, refresh
+from services.core.key_manager import ERROR, get_all_keys, get_key_registry, outcome_for_status, refresh
 from services.core.api_config import GEMINI_TEXT_MODEL, gemini_text_endpoint
 
 class MissingAPIKey(Exception): pass
@@ -12,8 +12,9 @@ class GeminiClient:
         if api_key: keys = [api_key] + [k for k in keys if k != api_key]
         self.keys = list(dict.fromkeys(keys))
         if not self.keys: raise MissingAPIKey("Chưa nhập Google API Key trong Cài đặt.")
-        random.shuffle(self.keys); self.rr=0; self.model=model or GEMINI_TEXT_MODEL
-    def _next_key(self): k=self.keys[self.rr%len(self.keys)]; self.rr+=1; return k
+        self.registry=get_key_registry('google'); self.model=model or GEMINI_TEXT_MODEL
+    # Key that is usable soonest across the session (429/401 backoffs are shared)
+    def _next_key(self): return self.registry.order(self.keys)[0]
     def _endpoint(self, key): 
         if self.model == GEMINI_TEXT_MODEL:
             return gemini_text_endpoint(key)
@@ -25,7 +26,10 @@ class GeminiClient:
             try:
                 body={"system_instruction":{"parts":[{"text":system_text}]},
                       "contents":[{"role":"user","parts":[{"text":user_text}]}]}
-                r=requests.post(self._endpoint(key), json=body, timeout=timeout)
+                self.registry.begin(key)
+                try: r=requests.post(self._endpoint(key), json=body, timeout=timeout)
+                except Exception: self.registry.release(key, ERROR); raise
+                self.registry.release(key, outcome_for_status(r.status_code))
                 if r.status_code in (429,408) or r.status_code>=500: raise requests.HTTPError(str(r.status_code), response=r)
                 r.raise_for_status()
                 data=r.json()
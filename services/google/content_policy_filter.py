@@ -5,10 +5,15 @@ Sanitizes prompts to comply with Google's content policies, especially regarding
 
 This module detects and rewrites prompts that may violate Google's policies about
 creating content featuring minors (children/teenagers under 18).
+
+All keyword patterns are compiled once per process. A substring pass over the
+lowercased text finds which keywords it contains; only those replacements (plus any a replacement could
+create) are applied, in table order, so the output is identical to rewriting
+the text once per keyword.
 """
 
 import re
-from typing import Dict, List, Tuple, Any
+from typing import Dict, FrozenSet, List, Optional, Tuple, Any
 
 # Keywords that indicate child/minor characters (Vietnamese + English)
 MINOR_KEYWORDS_VI = [
@@ -91,6 +96,75 @@ AGE_UP_REPLACEMENTS_EN = {
 }
 
 
+class _KeywordSet:
+    """
+    Which of a fixed set of keywords occur (as substrings) in a lowercased text.
+
+    Keywords that contain a shorter keyword are only searched for when that
+    shorter one was found, so a text without "bé" skips "cô bé", "em bé", ...
+    """
+
+    def __init__(self, keywords):
+        self.keywords = list(dict.fromkeys(keywords))
+        self._lowered = {k: k.lower() for k in self.keywords}
+        by_len = sorted(self.keywords, key=lambda k: len(self._lowered[k]))
+        self._children: Dict[Optional[str], List[str]] = {None: []}
+        for i, k in enumerate(by_len):
+            parent = next((o for o in reversed(by_len[:i])
+                           if self._lowered[o] in self._lowered[k]), None)
+            self._children.setdefault(parent, []).append(k)
+            self._children.setdefault(k, [])
+
+    def present(self, text_lower: str) -> FrozenSet[str]:
+        found = set()
+        stack = list(self._children[None])
+        while stack:
+            k = stack.pop()
+            if self._lowered[k] in text_lower:
+                found.add(k)
+                stack.extend(self._children[k])
+        return frozenset(found)
+
+
+def _fold_guard(keywords):
+    """
+    Characters IGNORECASE matching treats as keyword letters but str.lower() does
+    not map onto one (e.g. dotless "ı" matches "i"); texts containing them skip
+    the substring pre-check.
+    """
+    letters = "".join(sorted({ch for k in keywords for ch in k.lower()}))
+    equivalents = re.compile("[%s]" % re.escape(letters), re.IGNORECASE).findall(
+        "".join(map(chr, range(0x10000))))
+    odd = sorted({ch for ch in equivalents if len(ch.lower()) != 1 or ch.lower() not in letters})
+    return re.compile("[%s]" % re.escape("".join(odd))) if odd else None
+
+
+def _may_create(replacement: str, keyword: str) -> bool:
+    """Could inserting ``replacement`` form a new occurrence of ``keyword`` (with any neighbours)?"""
+    r, k = replacement.casefold(), keyword.casefold()
+    if k in r or r in k:
+        return True
+    return any(r.endswith(k[:p]) or r.startswith(k[-p:]) for p in range(1, min(len(r), len(k))))
+
+
+# Minor keyword detection (substring semantics on the lowercased text)
+_MINOR_KEYWORDS = _KeywordSet(MINOR_KEYWORDS_VI + MINOR_KEYWORDS_EN)
+
+# Age-up: one precompiled pattern per replacement, in the order they are applied
+_AGE_UP_STEPS = (
+    [(k, re.compile(re.escape(k), re.IGNORECASE), v) for k, v in AGE_UP_REPLACEMENTS_VI.items()] +
+    [(k, re.compile(r'\b' + re.escape(k) + r'\b', re.IGNORECASE), v) for k, v in AGE_UP_REPLACEMENTS_EN.items()]
+)
+_AGE_UP_KEYS = [k for k, _, _ in _AGE_UP_STEPS]
+_AGE_UP_KEYWORDS = _KeywordSet(_AGE_UP_KEYS)
+_AGE_UP_GUARD = _fold_guard(_AGE_UP_KEYS)
+# Keywords (by step index) that each step's replacement text could create
+_AGE_UP_CREATES = [
+    frozenset(j for j in range(i + 1, len(_AGE_UP_STEPS)) if _may_create(rep_i, _AGE_UP_STEPS[j][0]))
+    for i, (_, _, rep_i) in enumerate(_AGE_UP_STEPS)
+]
+
+
 class ContentPolicyViolation(Exception):
     """Raised when content cannot be sanitized to comply with policies"""
     pass
@@ -127,16 +201,15 @@ class ContentPolicyFilter:
         """
         found = []
         text_lower = text.lower()
+        present = _MINOR_KEYWORDS.present(text_lower)
         
         # Check Vietnamese keywords
-        for keyword in MINOR_KEYWORDS_VI:
-            if keyword in text_lower:
-                found.append((keyword, "vi"))
+        if present:
+            found.extend((keyword, "vi") for keyword in MINOR_KEYWORDS_VI if keyword in present)
         
         # Check English keywords
-        for keyword in MINOR_KEYWORDS_EN:
-            if keyword in text_lower:
-                found.append((keyword, "en"))
+        if present:
+            found.extend((keyword, "en") for keyword in MINOR_KEYWORDS_EN if keyword in present)
         
         # Check age patterns
         for match in AGE_PATTERN_VI.finditer(text):
@@ -163,16 +236,21 @@ class ContentPolicyFilter:
         """
         result = text
         
-        # Replace Vietnamese keywords (case-insensitive, preserve case)
-        for keyword, replacement in AGE_UP_REPLACEMENTS_VI.items():
-            # Case-insensitive replacement preserving original case
-            pattern = re.compile(re.escape(keyword), re.IGNORECASE)
-            result = pattern.sub(replacement, result)
-        
-        # Replace English keywords (case-insensitive, preserve case)
-        for keyword, replacement in AGE_UP_REPLACEMENTS_EN.items():
-            pattern = re.compile(r'\b' + re.escape(keyword) + r'\b', re.IGNORECASE)
-            result = pattern.sub(replacement, result)
+        # Replace Vietnamese then English keywords (case-insensitive), skipping every
+        # keyword that is neither in the text nor creatable by an earlier replacement
+        if _AGE_UP_GUARD is not None and _AGE_UP_GUARD.search(text):
+            present = frozenset(_AGE_UP_KEYS)
+        else:
+            present = _AGE_UP_KEYWORDS.present(text.lower())
+        if present:
+            pending = {i for i, key in enumerate(_AGE_UP_KEYS) if key in present}
+            for i in range(len(_AGE_UP_STEPS)):
+                if i not in pending:
+                    continue
+                _, pattern, replacement = _AGE_UP_STEPS[i]
+                result, count = pattern.subn(replacement, result)
+                if count:
+                    pending |= _AGE_UP_CREATES[i]
         
         # Age up specific ages (e.g., "12 tuổi" -> "20 tuổi")
         def age_replacer_vi(match):
@@ -0,0 +1,679 @@
+"""
+Labs Client Core - Single request engine for the Google Labs Flow video API
+
+Both LabsClient (services.labs_flow_service) and LabsFlowClient
+(services.google.labs_flow_client) are thin subclasses of LabsClientCore.
+Token rotation, retries, uploads, the model fallback ladder and batch status
+checks live here; the behaviours that differ between panels are strategies
+set as class attributes on the subclass:
+
+- prompt_builder:  turns structured prompt JSON into the text sent to the API
+- prompt_sanitizer: optional content policy pass applied before building
+- prompt_saver:    optional callback that stores each prompt under the project
+- batch_check_sends_project: include clientContext.projectId in status checks
+"""
+
+import base64
+import hashlib
+import json
+import mimetypes
+import re
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+import requests
+
+from services.google.token_scheduler import get_token_scheduler
+from services.google.upload_cache import get_upload_cache
+from services.resilience import rate_limiter
+from utils.performance import get_pooled_session
+
+# Support both package and flat layouts
+try:
+    from services.endpoints import BATCH_CHECK_URL, I2V_URL, T2V_URL, UPLOAD_IMAGE_URL
+except Exception:  # pragma: no cover
+    from endpoints import BATCH_CHECK_URL, I2V_URL, T2V_URL, UPLOAD_IMAGE_URL
+
+DEFAULT_PROJECT_ID = "87b19267-13d6-49cd-a7ed-db19a90c9339"
+
+# Optional default_project_id from user config (non-breaking)
+try:
+    from utils import config as _cfg_mod  # type: ignore
+    _cfg = getattr(_cfg_mod, "load", lambda: {})() if hasattr(_cfg_mod, "load") else {}
+    _cfg_pid = None
+    if isinstance(_cfg, dict):
+        _cfg_pid = _cfg.get("default_project_id") or (_cfg.get("labs") or {}).get("default_project_id")
+    if _cfg_pid:
+        DEFAULT_PROJECT_ID = _cfg_pid  # override safely if present
+except Exception:
+    pass
+
+# Prompt length limits for video generation API
+MAX_PROMPT_LENGTH = 5000  # Maximum total prompt length
+MAX_PLAIN_STRING_LENGTH = 4000  # Maximum length for plain string prompts
+MAX_CHARACTER_DETAILS_LENGTH = 1500  # Maximum length for character details when truncating
+MAX_SCENE_DESCRIPTION_LENGTH = 3000  # Maximum length for scene description when truncating
+
+# Model ladders tried after the user's chosen model, per aspect ratio.
+# I2V (has start image) and T2V (text only) use different model families.
+FALLBACKS_I2V = {
+    "VIDEO_ASPECT_RATIO_PORTRAIT": [
+        "veo_3_1_i2v_s_fast_portrait_ultra", "veo_3_1_i2v_s_fast_portrait", "veo_3_1_i2v_s_portrait", "veo_3_1_i2v_s"
+    ],
+    "VIDEO_ASPECT_RATIO_LANDSCAPE": [
+        "veo_3_1_i2v_s_fast_ultra", "veo_3_1_i2v_s_fast", "veo_3_1_i2v_s"
+    ],
+    "VIDEO_ASPECT_RATIO_SQUARE": [
+        "veo_3_1_i2v_s_fast", "veo_3_1_i2v_s"
+    ]
+}
+FALLBACKS_T2V = {
+    "VIDEO_ASPECT_RATIO_PORTRAIT": [
+        "veo_3_1_t2v_fast_ultra", "veo_3_1_t2v"
+    ],
+    "VIDEO_ASPECT_RATIO_LANDSCAPE": [
+        "veo_3_1_t2v_fast_ultra", "veo_3_1_t2v"
+    ],
+    "VIDEO_ASPECT_RATIO_SQUARE": [
+        "veo_3_1_t2v_fast_ultra", "veo_3_1_t2v"
+    ]
+}
+
+def _headers(bearer: str) -> dict:
+    return {
+        "authorization": f"Bearer {bearer}",
+        "content-type": "application/json; charset=utf-8",
+        "origin": "https://labs.google",
+        "referer": "https://labs.google/",
+        "user-agent": "Mozilla/5.0"
+    }
+
+def _account_scope(tokens: List[str]) -> str:
+    """Stable, non-reversible id for a token set (one keep-alive pool per account)."""
+    return hashlib.sha256("\n".join(sorted(tokens)).encode("utf-8")).hexdigest()[:16]
+
+def _encode_image_file(path: str):
+    with open(path, "rb") as f:
+        raw = f.read()
+    b64 = base64.b64encode(raw).decode("utf-8")
+    mime = mimetypes.guess_type(path)[0] or "image/jpeg"
+    return b64, mime
+
+_URL_PAT = re.compile(r'^(https?://|gs://)', re.I)
+def _collect_urls_any(obj: Any) -> List[str]:
+    urls=set(); KEYS={"gcsUrl","gcsUri","signedUrl","signedUri","downloadUrl","downloadUri","videoUrl","url","uri","fileUri"}
+    def visit(x):
+        if isinstance(x, dict):
+            for k,v in x.items():
+                if k in KEYS and isinstance(v,str) and _URL_PAT.match(v): urls.add(v)
+                else: visit(v)
+        elif isinstance(x, list):
+            for it in x: visit(it)
+        elif isinstance(x, str):
+            if _URL_PAT.match(x): urls.add(x)
+    visit(obj)
+    lst=list(urls); lst.sort(key=lambda u: (0 if "/video/" in u else 1, len(u)))
+    return lst
+
+def _convert_aspect_ratio_to_vertex(aspect_ratio: str) -> str:
+    """Convert Google Labs aspect ratio format to Vertex AI format."""
+    mapping = {
+        "VIDEO_ASPECT_RATIO_LANDSCAPE": "16:9",
+        "VIDEO_ASPECT_RATIO_PORTRAIT": "9:16",
+        "VIDEO_ASPECT_RATIO_SQUARE": "1:1"
+    }
+    return mapping.get(aspect_ratio, "16:9")
+
+def _convert_model_key_to_vertex(model_key: str) -> str:
+    """Convert Google Labs model key to Vertex AI model format."""
+    # Extract base model name from keys like "veo_3_1_t2v_fast_ultra"
+    if "veo_3_1" in model_key or "veo_3.1" in model_key:
+        return "veo-3.1"
+    elif "veo_2" in model_key or "veo_2.0" in model_key:
+        return "veo-2.0"
+    # Default to veo-3.1
+    return "veo-3.1"
+
+def _normalize_status(item: dict) -> str:
+    if item.get("done") is True:
+        if item.get("error"): return "FAILED"
+        return "DONE"
+    s=item.get("status") or ""
+    if s in ("MEDIA_GENERATION_STATUS_SUCCEEDED","SUCCEEDED","SUCCESS"): return "DONE"
+    if s in ("MEDIA_GENERATION_STATUS_FAILED","FAILED","ERROR"): return "FAILED"
+    return "PROCESSING"
+
+def _extract_negative_prompt(prompt_data: Any) -> str:
+    """Extract negative prompt from prompt data structure."""
+    if isinstance(prompt_data, dict):
+        negatives = prompt_data.get("negatives", [])
+        if isinstance(negatives, list) and negatives:
+            return ", ".join(str(neg) for neg in negatives)
+    return "text, words, letters, subtitles, captions, titles, credits, on-screen text, watermarks, logos, brands, camera shake, fisheye, photorealistic, live action, 3D CGI, Disney 3D, Pixar style"
+
+def _parse_prompt_data(prompt: Any) -> Any:
+    """Return the parsed value for JSON strings, anything else unchanged."""
+    if isinstance(prompt, str):
+        try:
+            return json.loads(prompt)
+        except Exception:
+            return prompt
+    return prompt
+
+def _dedup(xs):
+    seen=set(); r=[]
+    for x in xs:
+        if x not in seen: seen.add(x); r.append(x)
+    return r
+
+def _retry_after(r) -> Optional[float]:
+    try:
+        return float(r.headers.get("Retry-After"))
+    except (TypeError, ValueError):
+        return None
+
+def _is_invalid(e: Exception)->bool:
+    s=str(e).lower()
+    return ("400" in str(e)) or ("invalid json" in s) or ("invalid argument" in s)
+
+def _is_auth_error(e: Exception)->bool:
+    """Check if error is a 401 authentication error"""
+    s=str(e).lower()
+    return ("401" in str(e)) or ("unauthorized" in s) or ("authentication" in s and "invalid" in s)
+
+
+class _MediaReadiness:
+    """
+    Learned delay between uploading an image and the first start that uses it.
+
+    Only media uploaded by this process within WINDOW seconds counts as fresh;
+    cached or older media IDs are used immediately. The delay shrinks after
+    fresh media starts cleanly and doubles when the API answers 400 right after
+    an upload (media not indexed yet).
+    """
+    WINDOW = 30.0
+
+    def __init__(self, initial: float = 1.0, max_delay: float = 8.0):
+        self.delay = initial
+        self.max_delay = max_delay
+        self._uploaded: Dict[str, float] = {}
+        self._lock = threading.Lock()
+
+    def mark_uploaded(self, media_id: str):
+        with self._lock:
+            now = time.monotonic()
+            self._uploaded = {m: t for m, t in self._uploaded.items() if now - t < self.WINDOW}
+            self._uploaded[media_id] = now
+
+    def age(self, media_id: Optional[str]) -> Optional[float]:
+        """Seconds since upload for fresh media, None otherwise."""
+        with self._lock:
+            t = self._uploaded.get(media_id or "")
+        if t is None:
+            return None
+        age = time.monotonic() - t
+        return age if age < self.WINDOW else None
+
+    def wait(self, media_id: Optional[str]):
+        age = self.age(media_id)
+        if age is not None and age < self.delay:
+            time.sleep(self.delay - age)
+
+    def on_success(self, media_id: Optional[str]):
+        with self._lock:
+            if self._uploaded.pop(media_id or "", None) is not None:
+                self.delay *= 0.8
+
+    def on_not_ready(self) -> float:
+        with self._lock:
+            self.delay = min(self.max_delay, max(0.5, self.delay * 2))
+            return self.delay
+
+_READINESS = _MediaReadiness()
+
+
+class LabsClientCore:
+    """
+    Google Labs Flow request engine with multi-token rotation
+
+    Features:
+    - Automatic token selection across multiple OAuth tokens for load balancing
+    - Robust error handling with retries
+    - Supports both I2V (image-to-video) and T2V (text-to-video) generation
+    - Health-scored token selection shared process-wide (401 memory, 429 cooldowns)
+
+    Subclasses configure the strategy attributes below instead of overriding methods.
+    """
+    MAX_RETRY_ATTEMPTS = 9  # Maximum total retry attempts across all tokens
+
+    # Strategies (see module docstring)
+    prompt_builder: Callable[[Any], str] = staticmethod(lambda data: data if isinstance(data, str) else json.dumps(data, ensure_ascii=False))
+    prompt_sanitizer: Optional[Callable[..., Tuple[Any, List[str]]]] = None
+    prompt_saver: Optional[Callable[..., Optional[str]]] = None
+    batch_check_sends_project = False
+
+    def __init__(self, bearers: List[str], timeout: Tuple[int,int]=(20,180), on_event: Optional[Callable[[dict], None]]=None):
+        self.tokens=[t.strip() for t in (bearers or []) if t.strip()]
+        if not self.tokens: raise ValueError("No Labs tokens provided")
+        self.timeout=timeout; self.on_event=on_event
+        # Keep-alive connection pool shared by every client of the same account
+        self._scope=_account_scope(self.tokens)
+        self._session=get_pooled_session(f"labs:{self._scope}")
+
+    def _emit(self, kind: str, **kw):
+        if self.on_event:
+            try: self.on_event({"kind":kind, **kw})
+            except Exception: pass
+
+    def _all_invalid_error(self) -> requests.HTTPError:
+        return requests.HTTPError(
+            f"All {len(self.tokens)} authentication token(s) are invalid or expired. "
+            "Please update your Google Labs OAuth tokens in the API Credentials settings. "
+            "To get new tokens, visit https://labs.google and inspect network requests."
+        )
+
+    def _post(self, url: str, payload: dict, suppress_error_logging: bool = False) -> dict:
+        # Tokens come from the process-wide scheduler: the healthiest usable token of this
+        # account, skipping tokens known invalid (401) and waiting out 429 cooldowns
+        sched = get_token_scheduler()
+        valid_tokens = [t for t in self.tokens if not sched.is_invalid(t)]
+        if not valid_tokens:
+            # All tokens are invalid - fail immediately with clear error message
+            err = self._all_invalid_error()
+            self._emit("http_other_err", code=401, detail=str(err))
+            raise err
+
+        last=None
+        for _ in range(min(3 * len(valid_tokens), self.MAX_RETRY_ATTEMPTS)):
+            current_token = sched.acquire(self.tokens)
+            if current_token is None:
+                raise self._all_invalid_error()
+
+            t0 = time.monotonic()
+            try:
+                r=self._session.post(url, headers=_headers(current_token), json=payload, timeout=self.timeout)
+            except requests.RequestException as e:
+                # Network error/timeout: the token gets a short cooldown, retry elsewhere
+                sched.release(current_token, 0, time.monotonic() - t0)
+                last=e
+                continue
+            sched.release(current_token, r.status_code, time.monotonic() - t0, _retry_after(r))
+
+            if 200 <= r.status_code < 300:
+                self._emit("http_ok", code=r.status_code)
+                try: return r.json()
+                except Exception: return {}
+
+            # Handle 401 Unauthorized - the scheduler remembers the token as invalid for every client
+            if r.status_code == 401:
+                token_id = f"Token #{self.tokens.index(current_token) + 1}" if current_token in self.tokens else "Unknown token"
+                self._emit("http_other_err", code=401, detail=f"{token_id} is invalid (401 Unauthorized)")
+
+                # Check if all tokens are now invalid - fail fast (the exception carries the message)
+                if all(sched.is_invalid(t) for t in self.tokens):
+                    raise self._all_invalid_error()
+
+                last = requests.HTTPError(f"401 Client Error: Unauthorized for url: {url}")
+                continue
+
+            det=""
+            try: det=r.json().get("error",{}).get("message","")[:300]
+            except Exception: det=(r.text or "")[:300]
+
+            # Only emit error if not suppressed (for retry attempts)
+            if not suppress_error_logging:
+                self._emit("http_other_err", code=r.status_code, detail=det)
+
+            try:
+                r.raise_for_status()
+                last = requests.HTTPError(f"{r.status_code} Error for url: {url}", response=r)
+            except requests.HTTPError as e:
+                last = e
+            # 429/5xx put the token on cooldown, so the next attempt goes to a usable token.
+            # Other 4xx are about the request itself; retrying cannot help.
+            if r.status_code != 429 and r.status_code < 500:
+                raise last
+
+        if last is None:
+            last = Exception("All tokens are invalid or max attempts reached")
+        raise last
+
+    def upload_image_file(self, image_path: str, aspect_hint="IMAGE_ASPECT_RATIO_PORTRAIT", refresh: bool = False)->Optional[str]:
+        """
+        Upload an image file to Google Labs for image-to-video generation.
+
+        The same image (by content) uploaded with the same account and aspect
+        hint is served from the upload cache instead of being sent again.
+
+        Args:
+            image_path: Path to the image file
+            aspect_hint: Aspect ratio hint (e.g., IMAGE_ASPECT_RATIO_PORTRAIT)
+            refresh: Skip and replace the cached mediaId (e.g. the API no longer knows it)
+
+        Returns:
+            Media ID string if successful, None otherwise
+        """
+        cache = get_upload_cache()
+        account = self._scope
+        with open(image_path, "rb") as f:
+            raw = f.read()
+        sha = hashlib.sha256(raw).hexdigest()
+        if refresh:
+            cache.invalidate(sha, account, aspect_hint)
+        else:
+            mid = cache.get(sha, account, aspect_hint)
+            if mid:
+                self._emit("upload_cache_hit", media_id=mid, image=image_path)
+                return mid
+
+        b64 = base64.b64encode(raw).decode("utf-8")
+        mime = mimetypes.guess_type(image_path)[0] or "image/jpeg"
+        payload={"imageInput":{"rawImageBytes":b64,"mimeType":mime,"isUserUploaded":True,"aspectRatio":aspect_hint},
+                 "clientContext":{"sessionId":f";{int(time.time()*1000)}","tool":"ASSET_MANAGER"}}
+        data=self._post(UPLOAD_IMAGE_URL,payload) or {}
+        mid=(data.get("mediaGenerationId") or {}).get("mediaGenerationId")
+        if mid:
+            cache.put(sha, account, aspect_hint, mid)
+            _READINESS.mark_uploaded(mid)
+        return mid
+
+    def build_prompt(self, prompt: Any) -> str:
+        """
+        Turn a prompt (dict, JSON string or plain text) into the text sent to the API.
+
+        JSON prompts go through the sanitizer strategy (if any) and then the
+        prompt builder strategy; plain text is passed through unchanged.
+        """
+        data = _parse_prompt_data(prompt)
+        if self.prompt_sanitizer is not None:
+            # Content policy filter: prevents HTTP 400 errors caused by policy violations
+            data, policy_warnings = self.prompt_sanitizer(data, enable_age_up=True)
+            for warning in policy_warnings or []:
+                self._emit("content_policy_warning", warning=warning)
+        if isinstance(data, dict):
+            return self.prompt_builder(data)
+        return data if isinstance(data, str) else str(data)
+
+    def start_one(self, job: Dict, model_key: str, aspect_ratio: str, prompt_text: str, copies:int=1, project_id: Optional[str]=DEFAULT_PROJECT_ID)->int:
+        """Start a scene with robust fallbacks: delay-after-upload, model ladder (I2V vs T2V), reupload-on-400, per-copy fallback, complete prompt preservation."""
+        copies=max(1,int(copies)); base_seed=int(job.get("seed",0)) if str(job.get("seed","")).isdigit() else 0
+        mid=job.get("media_id")
+
+        # Log which video generator will be used
+        generator_type = "Image-to-Video (I2V)" if mid else "Text-to-Video (T2V)"
+        self._emit("video_generator_info", generator_type=generator_type, has_start_image=bool(mid),
+                   model_key=model_key, aspect_ratio=aspect_ratio, copies=copies, project_id=project_id)
+
+        if self.prompt_saver is not None:
+            # Save to project_dir/prompts/ folder for user reference
+            scene_num = job.get("scene_num") or job.get("scene")
+            saved_path = self.prompt_saver(
+                prompt_data=prompt_text,
+                project_dir=job.get("dir") or job.get("project_dir"),
+                scene_num=scene_num,
+                model_key=model_key,
+                aspect_ratio=aspect_ratio
+            )
+            if saved_path:
+                self._emit("prompt_saved", filepath=saved_path, scene_num=scene_num)
+
+        # Freshly uploaded images need a moment to be indexed (avoids 400 right after upload);
+        # text-only jobs and cached/older media IDs start immediately
+        _READINESS.wait(mid)
+
+        fallbacks = FALLBACKS_I2V if mid else FALLBACKS_T2V
+        # start with the user's chosen model, then ladder through same-family models for the aspect
+        models=[model_key]+[m for m in fallbacks.get(aspect_ratio, []) if m!=model_key]
+
+        prompt = self.build_prompt(prompt_text)
+
+        def _make_body(use_model, mid_val, copies_n):
+            requests_list = []
+            for k in range(copies_n):
+                seed = base_seed + k if copies_n > 1 else base_seed
+                request_item = {
+                    "aspectRatio": aspect_ratio,
+                    "seed": seed,
+                    "videoModelKey": use_model
+                }
+                # Add prompt - different field for I2V vs T2V
+                if mid_val:
+                    request_item["imageInput"] = {
+                        "startImage": {"mediaId": mid_val},
+                        "prompt": prompt
+                    }
+                else:
+                    request_item["textInput"] = {"prompt": prompt}
+                requests_list.append(request_item)
+
+            body = {"requests": requests_list}
+            if project_id:
+                body["clientContext"] = {"projectId": project_id}
+            return body
+
+        def _try(body, suppress_errors=False):
+            url=I2V_URL if mid else T2V_URL
+            # Pace start requests per account instead of fixed sleeps between jobs
+            rate_limiter("labs_submit", self._scope, rate=1.0, burst=2).acquire()
+            self._emit("api_call_info", endpoint=url, endpoint_type="I2V" if mid else "T2V",
+                       request_body_keys=list(body.keys()), num_requests=len(body.get("requests", [])))
+            return self._post(url, body, suppress_error_logging=suppress_errors) or {}
+
+        readiness_retry = bool(mid)  # one readiness retry per start
+
+        def _ladder(copies_n):
+            # Walk the model ladder; only the last model's HTTP error is logged as such
+            nonlocal data, last_err, readiness_retry
+            for idx, mkey in enumerate(models):
+                while True:
+                    try:
+                        self._emit("trying_model", model_key=mkey, attempt="batch")
+                        data=_try(_make_body(mkey, mid, copies_n), suppress_errors=(idx < len(models) - 1))
+                        last_err=None
+                        _READINESS.on_success(mid)
+                        self._emit("model_success", model_key=mkey, has_data=data is not None)
+                        return
+                    except Exception as e:
+                        last_err=e
+                        # A 400 right after uploading usually means "media not indexed yet":
+                        # wait the (learned) readiness delay and retry the same model once
+                        if (readiness_retry and _is_invalid(e) and not _is_auth_error(e)
+                                and _READINESS.age(mid) is not None):
+                            readiness_retry = False
+                            delay = _READINESS.on_not_ready()
+                            self._emit("media_not_ready", media_id=mid, wait_sec=round(delay, 2))
+                            time.sleep(delay)
+                            continue
+                        break
+                self._emit("model_failed", model_key=mkey, error=str(last_err)[:200])
+                # Stop immediately on auth errors (401) and non-invalid errors (e.g., network issues)
+                if _is_auth_error(last_err) or not _is_invalid(last_err):
+                    return
+
+        # 1) Try batch with model fallbacks
+        data=None; last_err=None
+        _ladder(copies)
+
+        # 2) If invalid and have image -> reupload once then retry ladder (I2V only).
+        #    A 400 here usually means the mediaId is unknown/expired, so bypass the upload cache.
+        if last_err and _is_invalid(last_err) and not _is_auth_error(last_err) and mid and job.get("image_path"):
+            try:
+                new_mid=self.upload_image_file(job["image_path"], refresh=True)
+                if new_mid:
+                    job["media_id"]=new_mid; mid=new_mid
+                    _ladder(copies)
+            except Exception as e3:
+                last_err=e3
+
+        # 3) Per-copy fallback (still invalid)
+        job.setdefault("operation_names",[])
+        job.setdefault("video_by_idx", [None]*copies)
+        job.setdefault("thumb_by_idx", [None]*copies)
+        job.setdefault("op_index_map", {})
+        job.setdefault("operation_metadata", {})
+        if data is None and last_err is not None:
+            # Don't retry per-copy if we have an auth error - user needs to fix their tokens
+            if _is_auth_error(last_err):
+                raise last_err
+
+            for k in range(copies):
+                for idx, mkey in enumerate(models):
+                    try:
+                        dat=_try(_make_body(mkey, mid, 1), suppress_errors=(idx < len(models) - 1))
+                        ops=dat.get("operations",[]) if isinstance(dat,dict) else []
+                        if ops and self._record_op(job, ops[0], k):
+                            break
+                    except Exception as e:
+                        # If it's an auth error, stop trying and raise immediately
+                        if _is_auth_error(e):
+                            raise
+                        continue
+            return len(job.get("operation_names",[]))
+
+        # 4) Batch success
+        ops=data.get("operations",[]) if isinstance(data,dict) else []
+        self._emit("operations_result", num_operations=len(ops), data_type=type(data).__name__,
+                   has_operations_key="operations" in (data if isinstance(data, dict) else {}))
+        for ci,op in enumerate(ops):
+            self._record_op(job, op, ci)
+        if job.get("operation_names"): job["status"]="PENDING"
+
+        final_count = len(job.get("operation_names",[]))
+        self._emit("start_one_result", operation_count=final_count, requested_copies=copies)
+        return final_count
+
+    @staticmethod
+    def _record_op(job: Dict, op: Dict, copy_idx: int) -> bool:
+        nm=(op.get("operation") or {}).get("name") or op.get("name") or ""
+        if not nm:
+            return False
+        job["operation_names"].append(nm)
+        job["op_index_map"][nm]=copy_idx
+        # Store metadata for batch check (sceneId and status from Google API)
+        # Always store metadata with at least the default status for Google API compatibility
+        job["operation_metadata"][nm] = {"sceneId": op.get("sceneId", ""),
+                                         "status": op.get("status", "MEDIA_GENERATION_STATUS_PENDING")}
+        return True
+
+    def _wrap_ops(self, op_names: List[str], metadata: Optional[Dict[str, Dict]] = None, project_id: Optional[str] = None)->dict:
+        """
+        Wrap operation names into the payload format for batch check.
+
+        Args:
+            op_names: List of operation names
+            metadata: Optional dict mapping operation name to metadata (sceneId, status)
+            project_id: Optional project ID, sent as clientContext when given
+
+        Returns:
+            Payload dict with operations list
+        """
+        uniq=[]; seen=set()
+        for s in op_names or []:
+            if s and s not in seen: seen.add(s); uniq.append(s)
+
+        operations = []
+        for op_name in uniq:
+            op_entry = {"operation": {"name": op_name}}
+            # Include sceneId and status if available in metadata
+            if metadata and op_name in metadata:
+                meta = metadata[op_name]
+                if meta.get("sceneId"):
+                    op_entry["sceneId"] = meta["sceneId"]
+                if meta.get("status"):
+                    op_entry["status"] = meta["status"]
+            operations.append(op_entry)
+
+        payload = {"operations": operations}
+        if project_id:
+            payload["clientContext"] = {"projectId": project_id}
+        return payload
+
+    def batch_check_operations(self, op_names: List[str], metadata: Optional[Dict[str, Dict]] = None, project_id: Optional[str] = None)->Dict[str,Dict]:
+        """
+        Check status of video generation operations.
+
+        Args:
+            op_names: List of operation names to check
+            metadata: Optional dict mapping operation name to metadata (sceneId, status)
+            project_id: Project the operations were started in; only sent when
+                        the client's batch_check_sends_project strategy is on
+
+        Returns:
+            Dict mapping operation name to status info
+        """
+        if not op_names:
+            return {}
+
+        num_requested = len(op_names)
+        self._emit("batch_check_start", num_operations=num_requested, project_id=project_id)
+
+        send_project = project_id if self.batch_check_sends_project else None
+        try:
+            data = self._post(BATCH_CHECK_URL, self._wrap_ops(op_names, metadata, send_project)) or {}
+        except Exception as e:
+            # If project_id caused error (e.g., API doesn't support it), retry without
+            error_msg = str(e).lower()
+            if send_project and ("invalid" in error_msg or "unrecognized" in error_msg or "400" in error_msg):
+                self._emit("batch_check_fallback", error=str(e)[:100], retry_without_project=True)
+                data = self._post(BATCH_CHECK_URL, self._wrap_ops(op_names, metadata, None)) or {}
+            else:
+                raise
+
+        out={}
+        for item in data.get("operations",[]):
+            key=(item.get("operation") or {}).get("name") or item.get("name") or ""
+            st=_normalize_status(item)
+            urls=_collect_urls_any(item.get("response",{})) or _collect_urls_any(item)
+            vurls=[u for u in urls if "/video/" in u]; iurls=[u for u in urls if "/image/" in u]
+            out[key or "unknown"]={"status": ("COMPLETED" if st=="DONE" and vurls else ("DONE_NO_URL" if st=="DONE" else st)),
+                                   "video_urls": _dedup(vurls), "image_urls": _dedup(iurls), "raw": item}
+
+        num_missing = num_requested - len(out)
+        self._emit("batch_check_result",
+                   num_requested=num_requested,
+                   num_returned=len(out),
+                   num_missing=num_missing,
+                   missing_ops=[name for name in op_names if name not in out] if num_missing > 0 else [])
+        return out
+
+    def generate_videos_batch(self, prompt: str, num_videos: int = 1, model_key: str = "veo_3_1_t2v_fast_ultra",
+                              aspect_ratio: str = "VIDEO_ASPECT_RATIO_LANDSCAPE",
+                              project_id: Optional[str] = DEFAULT_PROJECT_ID) -> List[str]:
+        """
+        Generate multiple videos in one API call (PR#4: Batch video generation)
+        Google Lab Flow supports up to 4 videos per request
+
+        Args:
+            prompt: Text prompt for video generation
+            num_videos: Number of videos to generate (max 4)
+            model_key: Video model to use
+            aspect_ratio: Aspect ratio (e.g., VIDEO_ASPECT_RATIO_LANDSCAPE)
+            project_id: Project ID for the request
+
+        Returns:
+            List of operation names for polling
+        """
+        num_videos = min(num_videos, 4)
+        prompt_text = self.build_prompt(prompt)
+
+        base_seed = int(time.time() * 1000)
+        requests_list = [{
+            "aspectRatio": aspect_ratio,
+            "seed": base_seed + i,
+            "videoModelKey": model_key,
+            "textInput": {"prompt": prompt_text}
+        } for i in range(num_videos)]
+
+        payload = {"requests": requests_list}
+        if project_id:
+            payload["clientContext"] = {"projectId": project_id}
+
+        data = self._post(T2V_URL, payload) or {}
+
+        operation_names = []
+        for op in data.get("operations", []):
+            name = (op.get("operation") or {}).get("name") or op.get("name") or ""
+            if name:
+                operation_names.append(name)
+        return operation_names
@@ -0,0 +1,292 @@
+# -*- coding: utf-8 -*-
+"""
+Operation Poller - Shared, adaptive status polling for Google Labs video operations
+
+One background thread owns every in-flight operation name across panels and
+projects. Operations are grouped per account/project so each group costs a
+single batchCheckAsync call per round, and each operation is re-checked on its
+own schedule derived from its age and the typical completion time of its model.
+Completions are pushed to the caller through callbacks.
+"""
+
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+# Raw API states that end an operation
+TERMINAL_RAW_STATUSES = {
+    "MEDIA_GENERATION_STATUS_SUCCESSFUL",
+    "MEDIA_GENERATION_STATUS_FAILED",
+    "MEDIA_GENERATION_STATUS_BLOCKED",
+}
+# Normalized states (see batch_check_operations) that end an operation
+TERMINAL_STATUSES = {"COMPLETED", "DONE_NO_URL", "FAILED"}
+
+# Typical completion times (seconds) used until real completions are observed
+DEFAULT_EXPECTED_SECONDS = {
+    "fast": 60.0,
+    "default": 120.0,
+}
+
+
+def _cfg() -> dict:
+    try:
+        from utils import config as cfg
+        return cfg.get_section("polling")
+    except Exception:
+        return {}
+
+
+def _model_family(model_key: str) -> str:
+    return "fast" if "fast" in (model_key or "").lower() else "default"
+
+
+def is_terminal(result: Dict[str, Any]) -> bool:
+    """Return True if a batch_check_operations entry describes a finished operation."""
+    raw_status = (result.get("raw") or {}).get("status", "")
+    return raw_status in TERMINAL_RAW_STATUSES or result.get("status") in TERMINAL_STATUSES
+
+
+class _WatchedOp:
+    __slots__ = ("name", "group", "callback", "metadata", "model_key",
+                 "submitted_at", "deadline", "next_due")
+
+    def __init__(self, name, group, callback, metadata, model_key, submitted_at, deadline):
+        self.name = name
+        self.group = group
+        self.callback = callback
+        self.metadata = metadata
+        self.model_key = model_key
+        self.submitted_at = submitted_at
+        self.deadline = deadline
+        self.next_due = 0.0
+
+
+class _Group:
+    """Operations that can be checked with one call (same account tokens + project)."""
+
+    def __init__(self, client, project_id: Optional[str]):
+        self.client = client
+        self.project_id = project_id
+        self.ops: Dict[str, _WatchedOp] = {}
+        self.in_flight = False
+
+
+class OperationPoller:
+    """
+    Process-wide poller for Labs operations.
+
+    Usage:
+        poller = get_operation_poller()
+        poller.watch(client, op_name, on_done, metadata=meta, project_id=pid, model_key=mk)
+
+    ``on_done(op_name, result)`` is called from a poller thread with the
+    batch_check_operations entry for the operation once it reaches a terminal
+    state, or with ``{"status": "TIMEOUT", "raw": {}}`` when its deadline passes.
+    """
+
+    def __init__(self, min_interval: float = 2.0, max_interval: float = 15.0,
+                 error_backoff: float = 10.0, default_timeout: float = 900.0,
+                 max_parallel_checks: int = 4):
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.error_backoff = error_backoff
+        self.default_timeout = default_timeout
+        self._groups: Dict[Tuple, _Group] = {}
+        self._expected: Dict[str, float] = dict(DEFAULT_EXPECTED_SECONDS)
+        self._cond = threading.Condition()
+        self._thread: Optional[threading.Thread] = None
+        self._stopped = False
+        self._pool = ThreadPoolExecutor(max_workers=max_parallel_checks,
+                                        thread_name_prefix="LabsPoll")
+
+    # ------------------------------------------------------------------ public
+
+    def watch(self, client, op_name: str, callback: Callable[[str, Dict[str, Any]], None],
+              metadata: Optional[Dict[str, Any]] = None, project_id: Optional[str] = None,
+              model_key: str = "", timeout: Optional[float] = None,
+              submitted_at: Optional[float] = None):
+        """Start tracking ``op_name``; ``client`` must provide batch_check_operations()."""
+        if not op_name:
+            return
+        now = time.time()
+        submitted_at = submitted_at or now
+        deadline = submitted_at + (timeout if timeout is not None else self.default_timeout)
+        if submitted_at < now:
+            # Reattached op: check it at least once before it can time out
+            deadline = max(deadline, now + 2 * self.max_interval)
+        key = self._group_key(client, project_id)
+        with self._cond:
+            group = self._groups.get(key)
+            if group is None:
+                group = self._groups[key] = _Group(client, project_id)
+            op = _WatchedOp(op_name, key, callback, metadata or {}, model_key,
+                            submitted_at, deadline)
+            op.next_due = now + self._interval(op, now)
+            group.ops[op_name] = op
+            self._ensure_thread()
+            self._cond.notify_all()
+
+    def unwatch(self, op_names: List[str]):
+        """Stop tracking the given operations without invoking their callbacks."""
+        names = set(op_names or [])
+        with self._cond:
+            for key, group in list(self._groups.items()):
+                for nm in names & set(group.ops):
+                    del group.ops[nm]
+                if not group.ops and not group.in_flight:
+                    del self._groups[key]
+
+    def pending_count(self) -> int:
+        with self._cond:
+            return sum(len(g.ops) for g in self._groups.values())
+
+    def expected_seconds(self, model_key: str) -> float:
+        """Current estimate of how long an operation of this model takes."""
+        return self._expected.get(_model_family(model_key), DEFAULT_EXPECTED_SECONDS["default"])
+
+    def stop(self):
+        with self._cond:
+            self._stopped = True
+            self._cond.notify_all()
+        self._pool.shutdown(wait=False)
+
+    # ---------------------------------------------------------------- internal
+
+    @staticmethod
+    def _group_key(client, project_id: Optional[str]) -> Tuple:
+        tokens = getattr(client, "tokens", None)
+        ident = tuple(sorted(tokens)) if tokens else (id(client),)
+        return ident, project_id or ""
+
+    def _interval(self, op: _WatchedOp, now: float) -> float:
+        """Seconds until the next check of ``op`` based on its age vs. the model's typical time."""
+        expected = self.expected_seconds(op.model_key)
+        age = now - op.submitted_at
+        if age < expected:
+            # Nothing to see early on; tighten up as the typical completion time approaches
+            interval = (expected - age) / 2.0
+        else:
+            # Overdue: back off gently the later it gets
+            interval = self.min_interval * (1.0 + 2.0 * (age - expected) / expected)
+        return max(self.min_interval, min(self.max_interval, interval))
+
+    def _learn(self, op: _WatchedOp, now: float):
+        family = _model_family(op.model_key)
+        observed = now - op.submitted_at
+        if observed > self.default_timeout:
+            return  # reattached from an earlier run: not a real generation time
+        prev = self._expected.get(family, observed)
+        self._expected[family] = 0.8 * prev + 0.2 * observed
+
+    def _ensure_thread(self):
+        if self._thread is None or not self._thread.is_alive():
+            self._stopped = False
+            self._thread = threading.Thread(target=self._run, name="LabsOperationPoller",
+                                            daemon=True)
+            self._thread.start()
+
+    def _run(self):
+        while True:
+            expired: List[_WatchedOp] = []
+            with self._cond:
+                if self._stopped:
+                    return
+                now = time.time()
+                wake_at = now + self.max_interval
+                for key, group in list(self._groups.items()):
+                    for op in list(group.ops.values()):
+                        if now >= op.deadline:
+                            del group.ops[op.name]
+                            expired.append(op)
+                    if not group.ops:
+                        if not group.in_flight:
+                            del self._groups[key]
+                        continue
+                    if group.in_flight:
+                        continue
+                    earliest = min(op.next_due for op in group.ops.values())
+                    if earliest <= now:
+                        # Piggyback ops that would be due soon anyway: the call is being made
+                        batch = [op for op in group.ops.values()
+                                 if op.next_due <= now + self.min_interval]
+                        group.in_flight = True
+                        self._pool.submit(self._check_group, key, group, batch)
+                    else:
+                        wake_at = min(wake_at, earliest)
+                if not expired:
+                    self._cond.wait(timeout=max(0.05, wake_at - time.time()))
+            for op in expired:
+                self._deliver(op, {"status": "TIMEOUT", "raw": {}})
+
+    def _check_group(self, key: Tuple, group: _Group, batch: List[_WatchedOp]):
+        names = [op.name for op in batch]
+        metadata = {op.name: op.metadata for op in batch if op.metadata}
+        try:
+            if group.project_id:
+                rs = group.client.batch_check_operations(names, metadata,
+                                                         project_id=group.project_id)
+            else:
+                rs = group.client.batch_check_operations(names, metadata)
+            error = None
+        except Exception as e:
+            rs, error = {}, e
+
+        finished: List[Tuple[_WatchedOp, Dict[str, Any]]] = []
+        with self._cond:
+            now = time.time()
+            for op in batch:
+                if op.name not in group.ops:
+                    continue  # unwatched while the call was in flight
+                result = (rs or {}).get(op.name)
+                if error is None and result and is_terminal(result):
+                    del group.ops[op.name]
+                    self._learn(op, now)
+                    finished.append((op, result))
+                elif error is not None:
+                    op.next_due = now + self.error_backoff
+                else:
+                    op.next_due = now + self._interval(op, now)
+            group.in_flight = False
+            if not group.ops and self._groups.get(key) is group:
+                del self._groups[key]
+            self._cond.notify_all()
+
+        for op, result in finished:
+            self._deliver(op, result)
+
+    @staticmethod
+    def _deliver(op: _WatchedOp, result: Dict[str, Any]):
+        try:
+            op.callback(op.name, result)
+        except Exception:
+            pass
+
+
+# Global poller instance
+_global_poller: Optional[OperationPoller] = None
+_poller_lock = threading.Lock()
+
+
+def get_operation_poller() -> OperationPoller:
+    """
+    Get the process-wide operation poller
+    Lazy-created on first access; intervals come from the optional "polling" config section
+
+    Returns:
+        OperationPoller instance
+    """
+    global _global_poller
+
+    with _poller_lock:
+        if _global_poller is None:
+            c = _cfg()
+            _global_poller = OperationPoller(
+                min_interval=float(c.get("min_interval_sec", 2.0)),
+                max_interval=float(c.get("max_interval_sec", 15.0)),
+                error_backoff=float(c.get("error_backoff_sec", 10.0)),
+                default_timeout=float(c.get("timeout_sec", 900.0)),
+                max_parallel_checks=int(c.get("max_parallel_checks", 4)),
+            )
+        return _global_poller
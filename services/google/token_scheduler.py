@@ -0,0 +1,189 @@
+# -*- coding: utf-8 -*-
+"""
+Token Scheduler - Process-wide health-scored selection of Google Labs bearer tokens
+
+Every Labs client shares one scheduler, so what one panel learns about a token
+(401 invalid, 429 cooldown, slow or failing) immediately steers every other
+panel. Each request asks for the healthiest usable token of its account and
+reports the outcome back.
+"""
+
+import threading
+import time
+from typing import Dict, List, Optional
+
+# EWMA weight of the newest observation
+_ALPHA = 0.3
+# Seconds of expected latency a fully failing token is charged, on top of its
+# measured latency (which only successes update, so it can stay 0)
+_ERROR_PENALTY = 10.0
+
+
+class _TokenHealth:
+    __slots__ = ("latency", "error_rate", "in_flight", "cooldown_until",
+                 "consecutive_429", "invalid", "last_used")
+
+    def __init__(self):
+        self.latency = 0.0  # seconds; 0 until observed, so untried tokens get used
+        self.error_rate = 0.0
+        self.in_flight = 0
+        self.cooldown_until = 0.0
+        self.consecutive_429 = 0
+        self.invalid = False
+        self.last_used = 0.0
+
+
+class TokenScheduler:
+    """
+    Health-scored token picker.
+
+    Usage:
+        sched = get_token_scheduler()
+        tok = sched.acquire(tokens)        # None if every token is invalid (401)
+        t0 = time.monotonic()
+        ... send request with tok ...
+        sched.release(tok, status_code, time.monotonic() - t0, retry_after=...)
+    """
+
+    def __init__(self, cooldown_429: float = 5.0, max_cooldown: float = 120.0,
+                 error_cooldown: float = 2.0, max_wait: float = 60.0):
+        self.cooldown_429 = cooldown_429
+        self.max_cooldown = max_cooldown
+        self.error_cooldown = error_cooldown
+        self.max_wait = max_wait
+        self._health: Dict[str, _TokenHealth] = {}
+        self._cond = threading.Condition()
+
+    def _get(self, token: str) -> _TokenHealth:
+        h = self._health.get(token)
+        if h is None:
+            h = self._health[token] = _TokenHealth()
+        return h
+
+    @staticmethod
+    def _score(h: _TokenHealth) -> float:
+        # Lower is better: expected latency, inflated by load and recent failures,
+        # plus a flat penalty so a token that never succeeds can't look fastest
+        return (h.latency * (1.0 + h.in_flight) * (1.0 + 4.0 * h.error_rate)
+                + _ERROR_PENALTY * h.error_rate)
+
+    def acquire(self, tokens: List[str]) -> Optional[str]:
+        """
+        Return the healthiest usable token from ``tokens`` and count it in flight.
+
+        Blocks (up to max_wait) while every valid token is cooling down.
+        Returns None when every token is known invalid.
+        """
+        deadline = time.monotonic() + self.max_wait
+        with self._cond:
+            while True:
+                now = time.monotonic()
+                valid = [(t, self._get(t)) for t in tokens if not self._get(t).invalid]
+                if not valid:
+                    return None
+                ready = [(t, h) for t, h in valid if h.cooldown_until <= now]
+                if ready or now >= deadline:
+                    pool = ready or valid
+                    # Rotate (least recently used) among tokens close to the best score,
+                    # so healthy tokens share the load and unhealthy ones are skipped
+                    best = min(self._score(h) for _, h in pool)
+                    near = [(t, h) for t, h in pool if self._score(h) <= best * 1.5 + 0.05]
+                    token, h = min(near, key=lambda th: th[1].last_used)
+                    h.in_flight += 1
+                    h.last_used = now
+                    return token
+                wake = min(h.cooldown_until for _, h in valid)
+                self._cond.wait(timeout=max(0.01, min(wake, deadline) - now))
+
+    def release(self, token: str, status: int, latency: float,
+                retry_after: Optional[float] = None):
+        """
+        Report a request outcome.
+
+        Args:
+            status: HTTP status code, or 0 for a network error/timeout
+            latency: Seconds the request took
+            retry_after: Server-provided Retry-After in seconds (429/503)
+        """
+        with self._cond:
+            h = self._get(token)
+            h.in_flight = max(0, h.in_flight - 1)
+            now = time.monotonic()
+            failed = status == 0 or status == 429 or status >= 500
+            if 200 <= status < 300:
+                latency = max(0.01, latency)
+                h.latency = latency if h.latency == 0.0 else (1 - _ALPHA) * h.latency + _ALPHA * latency
+            h.error_rate = (1 - _ALPHA) * h.error_rate + (_ALPHA if failed else 0.0)
+            if status == 401:
+                h.invalid = True
+            elif status == 429:
+                h.consecutive_429 += 1
+                backoff = self.cooldown_429 * (2 ** (h.consecutive_429 - 1))
+                h.cooldown_until = now + min(self.max_cooldown, retry_after or backoff)
+            elif failed:
+                h.cooldown_until = now + (retry_after or self.error_cooldown)
+            if status != 429 and status != 0:
+                h.consecutive_429 = 0
+            self._cond.notify_all()
+
+    def mark_invalid(self, token: str):
+        with self._cond:
+            self._get(token).invalid = True
+            self._cond.notify_all()
+
+    def is_invalid(self, token: str) -> bool:
+        with self._cond:
+            h = self._health.get(token)
+            return bool(h and h.invalid)
+
+    def reset(self, token: Optional[str] = None):
+        """Forget what is known about ``token`` (or every token), e.g. after re-login."""
+        with self._cond:
+            if token is None:
+                self._health.clear()
+            else:
+                self._health.pop(token, None)
+            self._cond.notify_all()
+
+    def get_stats(self) -> List[Dict]:
+        with self._cond:
+            now = time.monotonic()
+            return [{
+                "token": f"{t[:6]}…" if len(t) > 6 else t,
+                "latency": round(h.latency, 2),
+                "error_rate": round(h.error_rate, 2),
+                "in_flight": h.in_flight,
+                "cooldown_sec": round(max(0.0, h.cooldown_until - now), 1),
+                "invalid": h.invalid,
+            } for t, h in self._health.items()]
+
+
+# Global scheduler instance
+_global_scheduler: Optional[TokenScheduler] = None
+_scheduler_lock = threading.Lock()
+
+
+def get_token_scheduler() -> TokenScheduler:
+    """
+    Get the process-wide Labs token scheduler
+    Cooldowns come from the optional "token_scheduler" config section
+
+    Returns:
+        TokenScheduler instance
+    """
+    global _global_scheduler
+
+    with _scheduler_lock:
+        if _global_scheduler is None:
+            try:
+                from utils import config as cfg
+                c = cfg.get_section("token_scheduler")
+            except Exception:
+                c = {}
+            _global_scheduler = TokenScheduler(
+                cooldown_429=float(c.get("cooldown_429_sec", 5.0)),
+                max_cooldown=float(c.get("max_cooldown_sec", 120.0)),
+                error_cooldown=float(c.get("error_cooldown_sec", 2.0)),
+                max_wait=float(c.get("max_wait_sec", 60.0)),
+            )
+        return _global_scheduler
@@ -0,0 +1,106 @@
+# -*- coding: utf-8 -*-
+"""
+Upload Cache - Content-addressed cache of Google Labs image uploads
+
+Maps (image SHA-256, account, aspect hint) to the mediaId returned by the
+upload endpoint, so a product or model photo reused across scenes, retries
+and projects is uploaded once per account. Entries expire after a TTL and are
+replaced when the API no longer accepts a cached mediaId.
+"""
+
+import os
+import threading
+from typing import Dict, Optional
+
+from utils.performance import DiskCache
+
+
+def _cfg() -> dict:
+    try:
+        from utils import config as cfg
+        return cfg.get_section("upload_cache")
+    except Exception:
+        return {}
+
+
+class UploadCache:
+    """
+    Persistent (sha256, account, aspect) -> mediaId map.
+
+    Usage:
+        cache = get_upload_cache()
+        mid = cache.get(sha, account, aspect)
+        if not mid:
+            mid = upload(...)
+            cache.put(sha, account, aspect, mid)
+    """
+
+    def __init__(self, cache_dir: Optional[str] = None, ttl_hours: float = 24.0, enabled: bool = True):
+        self.enabled = enabled
+        self._disk = DiskCache(cache_dir=cache_dir, max_age_days=ttl_hours / 24.0) if enabled else None
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def _key(sha: str, account: str, aspect: str) -> str:
+        return f"labs_upload:{sha}:{account}:{aspect}"
+
+    def get(self, sha: str, account: str, aspect: str) -> Optional[str]:
+        if not self.enabled:
+            return None
+        with self._lock:
+            mid = self._disk.get(self._key(sha, account, aspect))
+            if mid:
+                self.hits += 1
+            else:
+                self.misses += 1
+            return mid
+
+    def put(self, sha: str, account: str, aspect: str, media_id: str):
+        if not self.enabled or not media_id:
+            return
+        with self._lock:
+            self._disk.set(self._key(sha, account, aspect), media_id)
+
+    def invalidate(self, sha: str, account: str, aspect: str):
+        if not self.enabled:
+            return
+        with self._lock:
+            self._disk.delete(self._key(sha, account, aspect))
+
+    def get_stats(self) -> Dict[str, int]:
+        return {"hits": self.hits, "misses": self.misses}
+
+
+# Global cache instance
+_global_cache: Optional[UploadCache] = None
+_cache_lock = threading.Lock()
+
+
+def get_upload_cache() -> UploadCache:
+    """
+    Get the process-wide upload cache
+    TTL and on/off switch come from the optional "upload_cache" config section
+
+    Returns:
+        UploadCache instance
+    """
+    global _global_cache
+
+    with _cache_lock:
+        if _global_cache is None:
+            c = _cfg()
+            cache_dir = c.get("cache_dir") or os.path.join(
+                os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))),
+                "cache", "labs_uploads")
+            try:
+                _global_cache = UploadCache(
+                    cache_dir=cache_dir,
+                    ttl_hours=float(c.get("ttl_hours", 24.0)),
+                    enabled=bool(c.get("enabled", True)),
+                )
+            except OSError:
+                # Cache directory not writable: uploads still work, just uncached
+                _global_cache = UploadCache(enabled=False)
+        return _global_cache
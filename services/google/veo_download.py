@@ -4,11 +4,13 @@ Google Veo Video Download Service
 Implements video download using Google Veo API endpoints with quality selection support.
 """
 
+import hashlib
 import os
 import time
 from typing import Any, Dict, List, Optional, Tuple
 
-import requests
+from services.utils.video_downloader import VideoDownloader
+from utils.performance import get_pooled_session
 
 
 class VeoDownloader:
@@ -28,6 +30,9 @@ class VeoDownloader:
         self.api_key = api_key
         self.log = log_callback or print
         self.base_url = "https://aisandbox-pa.googleapis.com"
+        # Keep-alive pools: API calls isolated per key, downloads shared
+        self._session = get_pooled_session(f"veo:{hashlib.sha256(api_key.encode('utf-8')).hexdigest()[:16]}")
+        self._downloader = VideoDownloader(log_callback=self.log)
 
     def _headers(self) -> dict:
         """Generate headers for API requests"""
@@ -85,7 +90,7 @@ class VeoDownloader:
 
         try:
             self.log(f"[Veo] Generating {num_videos} video(s) at {quality}...")
-            response = requests.post(url, headers=self._headers(), json=payload, timeout=(20, 180))
+            response = self._session.post(url, headers=self._headers(), json=payload, timeout=(20, 180))
             response.raise_for_status()
 
             data = response.json()
@@ -124,7 +129,7 @@ class VeoDownloader:
         payload = {"operations": operations}
 
         try:
-            response = requests.post(url, headers=self._headers(), json=payload, timeout=(20, 180))
+            response = self._session.post(url, headers=self._headers(), json=payload, timeout=(20, 180))
             response.raise_for_status()
 
             data = response.json()
@@ -236,51 +241,15 @@ class VeoDownloader:
         try:
             self.log(f"[Veo] Downloading video: {os.path.basename(output_path)}")
 
-            # Ensure output directory exists
-            os.makedirs(os.path.dirname(output_path), exist_ok=True)
-
-            # Download with streaming
-            with requests.get(url, stream=True, timeout=timeout, allow_redirects=True) as r:
-                r.raise_for_status()
-
-                total = int(r.headers.get('content-length', 0))
-                downloaded = 0
-
-                with open(output_path, 'wb') as f:
-                    for chunk in r.iter_content(chunk_size=8192):
-                        if chunk:
-                            f.write(chunk)
-                            downloaded += len(chunk)
-
-                # Log progress
-                if total > 0:
-                    progress = (downloaded / total) * 100
-                    self.log(f"[Veo] Downloaded {downloaded}/{total} bytes ({progress:.1f}%)")
-
-            # Verify download
-            if not os.path.exists(output_path) or os.path.getsize(output_path) == 0:
-                self.log("[Veo] Download verification failed - file empty or missing")
-                # Clean up empty or corrupted file
-                if os.path.exists(output_path):
-                    try:
-                        os.remove(output_path)
-                        self.log("[Veo] Removed corrupted file")
-                    except OSError:
-                        pass
-                return False
+            # Streams into <output>.part, resumes with Range, verifies, then renames;
+            # a failed download leaves its .part file behind for the next attempt
+            self._downloader.download(url, output_path, timeout=timeout)
 
             self.log(f"[Veo] Download complete: {output_path}")
             return True
 
         except Exception as e:
             self.log(f"[Veo] Download error: {e}")
-            # Clean up partial download on error
-            if os.path.exists(output_path):
-                try:
-                    os.remove(output_path)
-                    self.log("[Veo] Removed partial download")
-                except OSError:
-                    pass
             return False
 
     def poll_and_download(
@@ -1,6 +1,8 @@
 # -*- coding: utf-8 -*-
 import csv, io, re, requests
 from typing import List, Dict
+
+from services.utils.video_downloader import VideoDownloader
 def to_csv_export_url(sheet_url:str)->str:
     if "export?format=csv" in sheet_url: return sheet_url
     m=re.search(r"/spreadsheets/d/([a-zA-Z0-9-_]+)", sheet_url)
@@ -23,9 +25,10 @@ def download_drive_file(url_or_id:str, out_path:str)->str:
     fid = url_or_id if re.fullmatch(r"[a-zA-Z0-9_-]{20,}", url_or_id) else drive_id_from_url(url_or_id)
     if not fid: raise RuntimeError("Không nhận diện được file id từ Google Drive URL.")
     url=f"https://drive.google.com/uc?export=download&id={fid}"
-    r=requests.get(url, timeout=120)
-    if r.status_code>=400: raise RuntimeError(f"Tải Google Drive thất bại HTTP {r.status_code}")
-    with open(out_path,"wb") as f: f.write(r.content)
+    try:
+        VideoDownloader(log_callback=lambda msg: None).download(url, out_path, timeout=120)
+    except requests.HTTPError as e:
+        raise RuntimeError(f"Tải Google Drive thất bại HTTP {e.response.status_code if e.response is not None else '?'}")
     return out_path
 def slugify(text:str):
     import unicodedata, re
@@ -4,9 +4,8 @@ from typing import Dict, Any, Tuple
 
 
 def _knob(name:str, default):
-    from services.core.config import load as load_config
-    c = load_config()
-    return c.get('resilience', {}).get(name, default)
+    from services.core.config import get as get_config
+    return get_config(f'resilience.{name}', default)
 
 RETRY_STATUS = {429, 500, 502, 503, 504}
 
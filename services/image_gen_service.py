@@ -1,9 +1,14 @@
 # -*- coding: utf-8 -*-
-import base64, requests, time
-from typing import Optional
+import base64, requests, threading, time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, List, Optional, Tuple
 from services.core.api_config import gemini_image_endpoint, IMAGE_GEN_TIMEOUT
-from services.core.key_manager import get_all_keys, refresh
+from services.core.key_manager import (
+    ERROR, INVALID, OK, RATE_LIMITED, get_all_keys, get_key_registry, outcome_for_status, refresh,
+)
 from services.core.api_key_rotator import APIKeyRotator, APIKeyRotationError
+from utils.performance import get_pooled_session
 
 
 class ImageGenError(Exception):
@@ -44,6 +49,28 @@ def _extract_image_from_response(data: dict) -> bytes:
     raise ImageGenError("No image data found in response")
 
 
+def _gemini_image_payload(prompt: str, aspect_ratio: str = "1:1") -> dict:
+    """generateContent payload for an image, with the aspect ratio as a prompt hint"""
+    # Gemini doesn't have an explicit aspect_ratio parameter, so we enhance the prompt
+    aspect_hint = ""
+    if aspect_ratio and aspect_ratio != "1:1":
+        if aspect_ratio in ("9:16", "4:5"):
+            aspect_hint = " (portrait orientation, vertical format)"
+        elif aspect_ratio in ("16:9", "21:9"):
+            aspect_hint = " (landscape orientation, horizontal format)"
+
+    return {
+        "contents": [{
+            "parts": [{"text": prompt + aspect_hint}]
+        }],
+        "generationConfig": {
+            "temperature": 0.9,
+            "topK": 40,
+            "topP": 0.95,
+        }
+    }
+
+
 def generate_image_gemini(prompt: str, timeout: int = None, retry_delay: float = 15.0, enforce_rate_limit: bool = True, log_callback=None) -> bytes:
     """
     Generate image using Gemini Flash Image model with APIKeyRotator (PR#5)
@@ -202,39 +229,13 @@ def generate_image_with_rate_limit(
         if model.lower() in ("gemini", "imagen_4"):
             log(f"[IMAGE GEN] Tạo ảnh với {model}...")
 
-            # Build generation config with aspect ratio hint if provided
-            generation_config = {
-                "temperature": 0.9,
-                "topK": 40,
-                "topP": 0.95,
-            }
-
-            # Add aspect ratio to prompt for better results
-            # Note: Gemini doesn't have explicit aspect_ratio parameter, so we enhance the prompt
-            aspect_hint = ""
-            if aspect_ratio and aspect_ratio != "1:1":
-                if aspect_ratio in ("9:16", "4:5"):
-                    aspect_hint = " (portrait orientation, vertical format)"
-                elif aspect_ratio in ("16:9", "21:9"):
-                    aspect_hint = " (landscape orientation, horizontal format)"
-
-            enhanced_prompt = actual_prompt + aspect_hint if aspect_hint else actual_prompt
-
-            # Build parts array for API payload
-            parts = [{"text": enhanced_prompt}]
+            payload = _gemini_image_payload(actual_prompt, aspect_ratio)
 
             # Use APIKeyRotator for key rotation with shared API call logic
             def api_call_with_key(api_key: str) -> bytes:
                 """Make API call with given key"""
                 url = gemini_image_endpoint(api_key)
 
-                payload = {
-                    "contents": [{
-                        "parts": parts
-                    }],
-                    "generationConfig": generation_config
-                }
-
                 response = requests.post(url, json=payload, timeout=IMAGE_GEN_TIMEOUT)
                 response.raise_for_status()
 
@@ -293,3 +294,183 @@ def generate_image_with_rate_limit(
     except Exception as e:
         log(f"[ERROR] Image generation failed: {str(e)[:200]}")
         return None
+
+
+# Concurrent generation: one lane (in-flight request) per API key
+def _image_cfg() -> dict:
+    try:
+        from utils import config as cfg
+        return cfg.get_section("image_gen")
+    except Exception:
+        return {}
+
+
+class ImageBatchGenerator:
+    """
+    Generate many Gemini images at once, one request in flight per API key
+
+    Each key is a lane: a free lane takes the next prompt, so with 8 keys up to
+    8 images are generated together (capped by max_workers). Keys come from the
+    shared "google" rotation registry: a key that gets a 429 backs off (2s, 4s,
+    8s, then a 60s cooldown) for every caller, and its prompt goes back to the
+    queue for another key; 401/403 keys are dropped for the batch. Results are
+    reported as they arrive, not in order.
+
+    Usage:
+        gen = ImageBatchGenerator(api_keys, log_callback=log)
+        images = gen.run([(scene_idx, prompt, "9:16"), ...],
+                         on_result=lambda idx, img, err: ...)
+    """
+
+    def __init__(self, api_keys: List[str], max_workers: Optional[int] = None,
+                 max_attempts: Optional[int] = None, log_callback: Optional[Callable[[str], None]] = None):
+        c = _image_cfg()
+        self.api_keys = list(dict.fromkeys(k for k in api_keys if k and k.strip()))
+        self.registry = get_key_registry('google')
+        self.max_workers = max(1, int(max_workers or c.get("max_workers", 8)))
+        self.max_attempts = max(1, int(max_attempts or c.get("max_attempts", 3)))
+        self.log_callback = log_callback
+        self._disabled = set()
+
+    def _log(self, msg: str):
+        if self.log_callback:
+            self.log_callback(msg)
+
+    def _acquire(self, should_stop) -> Optional[str]:
+        """Free key (no call in flight) out of cooldown; None if stopped or no key is usable."""
+        # Keys rejected with 401/403 (this batch or a recent one) are not waited for
+        usable = self.registry.valid([k for k in self.api_keys if k not in self._disabled])
+        if not usable:
+            return None
+        return self.registry.acquire(usable, exclusive=True, should_stop=should_stop)
+
+    def _release(self, key: str, outcome: str):
+        delay = self.registry.release(key, outcome)
+        if outcome == INVALID:
+            self._disabled.add(key)
+            self._log(f"[FAIL] Key ...{key[-6:]} không hợp lệ (401/403), bỏ qua")
+        elif delay:
+            self._log(f"[RATE LIMIT] Key ...{key[-6:]} bị giới hạn, nghỉ {delay:.0f}s")
+
+    def run(self, jobs: List[Tuple[Any, str, str]],
+            on_result: Optional[Callable[[Any, Optional[bytes], Optional[str]], None]] = None,
+            on_start: Optional[Callable[[Any], None]] = None,
+            should_stop: Optional[Callable[[], bool]] = None) -> Dict[Any, Optional[bytes]]:
+        """
+        Generate every job's image
+
+        Args:
+            jobs: (job_id, prompt, aspect_ratio) tuples
+            on_result: Called as each job finishes with (job_id, image bytes or None, error or None)
+            on_start: Called when a job is first sent
+            should_stop: Polled between requests; pending jobs fail with "Đã dừng" once it returns True
+
+        Returns:
+            {job_id: image bytes or None}
+        """
+        queue = deque({"id": j, "payload": _gemini_image_payload(p, r), "attempts": 0, "limited": 0,
+                       "started": False} for j, p, r in jobs)
+        results: Dict[Any, Optional[bytes]] = {}
+        lock = threading.Lock()
+        max_limited = len(self.api_keys) * (self.registry.max_backoffs + 1)
+
+        def finish(job, image, error):
+            with lock:
+                results[job["id"]] = image
+            if on_result:
+                try:
+                    on_result(job["id"], image, error)
+                except Exception:
+                    pass
+
+        def lane():
+            while True:
+                with lock:
+                    if not queue:
+                        return
+                    job = queue.popleft()
+                key = self._acquire(should_stop)
+                if key is None:
+                    stopped = bool(should_stop and should_stop())
+                    finish(job, None, "Đã dừng" if stopped else "Không còn API key hợp lệ")
+                    continue
+                if not job["started"] and on_start:
+                    job["started"] = True
+                    try:
+                        on_start(job["id"])
+                    except Exception:
+                        pass
+                outcome, image, error = self._request(key, job["payload"])
+                self._release(key, outcome)
+                if outcome == OK:
+                    finish(job, image, None)
+                    continue
+                if outcome == RATE_LIMITED:
+                    job["limited"] += 1
+                    retry = job["limited"] < max_limited
+                elif outcome == INVALID:
+                    retry = True
+                else:
+                    job["attempts"] += 1
+                    retry = job["attempts"] < self.max_attempts
+                if retry:
+                    with lock:
+                        queue.append(job)
+                else:
+                    finish(job, None, error)
+
+        lanes = min(self.max_workers, len(self.api_keys), len(queue))
+        if lanes:
+            self._log(f"[IMAGE GEN] {len(queue)} ảnh, {lanes} luồng song song ({len(self.api_keys)} keys)")
+            with ThreadPoolExecutor(max_workers=lanes, thread_name_prefix="ImageLane") as pool:
+                for f in [pool.submit(lane) for _ in range(lanes)]:
+                    f.result()
+        return results
+
+    @staticmethod
+    def _request(api_key: str, payload: dict) -> Tuple[str, Optional[bytes], Optional[str]]:
+        """One generateContent call; returns (registry outcome, image, error)."""
+        try:
+            response = get_pooled_session("gemini").post(
+                gemini_image_endpoint(api_key), json=payload, timeout=IMAGE_GEN_TIMEOUT)
+        except requests.RequestException as e:
+            return ERROR, None, f"Request failed: {str(e)[:200]}"
+        outcome = outcome_for_status(response.status_code)
+        if outcome == RATE_LIMITED:
+            return outcome, None, "All API keys are rate limited (429)"
+        if outcome == INVALID:
+            return outcome, None, f"HTTP {response.status_code}"
+        if response.status_code >= 400:
+            return ERROR, None, f"HTTP {response.status_code}: {response.text[:200]}"
+        try:
+            return OK, _extract_image_from_response(response.json()), None
+        except (ImageGenError, ValueError) as e:
+            return ERROR, None, str(e)
+
+
+def generate_images_concurrently(
+    jobs: List[Tuple[Any, str, str]],
+    api_keys: list = None,
+    on_result: Optional[Callable[[Any, Optional[bytes], Optional[str]], None]] = None,
+    on_start: Optional[Callable[[Any], None]] = None,
+    should_stop: Optional[Callable[[], bool]] = None,
+    log_callback=None,
+) -> Dict[Any, Optional[bytes]]:
+    """
+    Generate several Gemini images in parallel (see ImageBatchGenerator)
+
+    Args:
+        jobs: (job_id, prompt, aspect_ratio) tuples
+        api_keys: Keys to use (default: Google keys from config)
+        on_result: Called per job as it finishes, in completion order
+
+    Returns:
+        {job_id: image bytes or None}
+    """
+    if not api_keys:
+        refresh()
+        api_keys = get_all_keys('google')
+    if not api_keys:
+        raise ImageGenError("No Google API keys available")
+    generator = ImageBatchGenerator(api_keys, log_callback=log_callback)
+    return generator.run(jobs, on_result=on_result, on_start=on_start, should_stop=should_stop)
@@ -1,6 +1,8 @@
 # -*- coding: utf-8 -*-
-import json, requests
+import copy, json, os, requests, threading
+from concurrent.futures import Future
 from services.core.key_manager import get_key
+from services.utils.json_stream import ArrayItemStream
 
 # Constants for validation
 IDEA_RELEVANCE_THRESHOLD = 0.15  # Minimum word overlap ratio (15%)
@@ -18,6 +20,109 @@ STOP_WORDS = {
     'of', 'with', 'by', 'from', 'as', 'is', 'was', 'are', 'be', 'been'
 }
 
+# LLM response cache (optional "llm_cache" config section)
+_llm_cache = None
+_llm_cache_lock = threading.Lock()
+_inflight = {}  # cache key -> Future of the request already running for it
+
+def _llm_cache_cfg():
+    try:
+        from utils import config as cfg
+        return cfg.get_section("llm_cache")
+    except Exception:
+        return {}
+
+def _get_llm_cache():
+    """Disk cache for LLM responses, or None when disabled."""
+    global _llm_cache
+    c = _llm_cache_cfg()
+    if not c.get("enabled", True):
+        return None
+    with _llm_cache_lock:
+        if _llm_cache is None:
+            from utils.performance import DiskCache
+            cache_dir = c.get("cache_dir") or os.path.join(
+                os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "cache", "llm")
+            _llm_cache = DiskCache(
+                cache_dir=cache_dir,
+                max_age_days=float(c.get("ttl_hours", 72)) / 24.0,
+                max_size_mb=float(c.get("max_size_mb", 50)),
+            )
+        return _llm_cache
+
+def _stream_enabled():
+    try:
+        from utils import config as cfg
+        return bool(cfg.get_section("llm_stream").get("enabled", True))
+    except Exception:
+        return True
+
+def _call_llm(provider, prompt, api_key, model, use_cache=True, on_item=None, item_field="scenes"):
+    """
+    Call Gemini/OpenAI through the response cache
+
+    The cache key is the fully built prompt, provider, model and generation
+    parameters (not the API key). Identical requests already in flight are
+    coalesced: later callers wait for the first one instead of sending their own.
+    use_cache=False skips the cache lookup but still stores the fresh response.
+
+    With ``on_item``, the response is streamed and each element of its
+    ``item_field`` array is passed to ``on_item`` as soon as it is complete
+    (cached or coalesced responses replay their elements the same way).
+
+    Returns:
+        A private copy of the parsed JSON response
+    """
+    def replay(res):
+        if on_item:
+            for item in (res.get(item_field) or [] if isinstance(res, dict) else []):
+                on_item(copy.deepcopy(item))
+        return res
+
+    if provider == "gemini":
+        call, params = _call_gemini, {"temperature": 0.9, "response_mime_type": "application/json"}
+        stream_call = _call_gemini_stream
+    else:
+        call, params = _call_openai, {"temperature": 0.9, "response_format": "json_object"}
+        stream_call = _call_openai_stream
+    if on_item and _stream_enabled():
+        def fetch():
+            return stream_call(prompt, api_key, model, lambda item: on_item(copy.deepcopy(item)), item_field)
+    else:
+        def fetch():
+            return replay(call(prompt, api_key, model))
+    ident = json.dumps({"provider": provider, "model": model, "params": params, "prompt": prompt},
+                       sort_keys=True, ensure_ascii=False)
+    cache = _get_llm_cache()
+
+    if use_cache and cache is not None:
+        hit = cache.get(ident)
+        if hit is not None:
+            print(f"[INFO] LLM cache hit ({provider}/{model})")
+            return replay(hit)
+
+    with _llm_cache_lock:
+        fut = _inflight.get(ident)
+        leader = fut is None
+        if leader:
+            fut = _inflight[ident] = Future()
+    if not leader:
+        print(f"[INFO] Đang chờ yêu cầu LLM giống hệt đang chạy ({provider}/{model})")
+        return replay(copy.deepcopy(fut.result()))
+
+    try:
+        res = fetch()
+        if cache is not None:
+            cache.set(ident, res)
+        fut.set_result(res)
+        return copy.deepcopy(res)
+    except BaseException as e:
+        fut.set_exception(e)
+        raise
+    finally:
+        with _llm_cache_lock:
+            _inflight.pop(ident, None)
+
 def _load_keys():
     """Load keys using unified key manager"""
     gk = get_key('google')
@@ -481,70 +586,63 @@ def _call_gemini(prompt, api_key, model="gemini-2.5-flash"):
     Call Gemini API with retry logic for 503 errors
     
     Strategy:
-    1. Try primary API key
-    2. If 503 error, try up to 2 additional keys from config
-    3. Add exponential backoff (1s, 2s, 4s)
+    1. Try the key the shared rotation state says is ready (primary key first among equals)
+    2. If 503 or 429, try up to 2 additional keys from config
+    3. Add exponential backoff (1s, 2s, 4s) on 503
     """
     from services.core.api_config import gemini_text_endpoint
-    from services.core.key_manager import get_all_keys
+    from services.core.key_manager import ERROR, RATE_LIMITED, get_all_keys, get_key_registry, outcome_for_status
     import time
 
-    # Build key rotation list
-    keys = [api_key]
-    all_keys = get_all_keys('google')
-    keys.extend([k for k in all_keys if k != api_key])
+    # Build key rotation list; keys throttled by any other caller go last
+    registry = get_key_registry('google')
+    keys = registry.order([api_key] + [k for k in get_all_keys('google') if k != api_key])
 
     last_error = None
 
     for attempt, key in enumerate(keys[:3]):  # Try up to 3 keys
+        # Build endpoint
+        url = gemini_text_endpoint(key) if model == "gemini-2.5-flash" else \
+              f"https://generativelanguage.googleapis.com/v1beta/models/{model}:generateContent?key={key}"
+
+        headers = {"Content-Type": "application/json"}
+        data = {
+            "contents": [{"role": "user", "parts": [{"text": prompt}]}],
+            "generationConfig": {"temperature": 0.9, "response_mime_type": "application/json"}
+        }
+
+        # Make request
+        registry.begin(key)
         try:
-            # Build endpoint
-            url = gemini_text_endpoint(key) if model == "gemini-2.5-flash" else \
-                  f"https://generativelanguage.googleapis.com/v1beta/models/{model}:generateContent?key={key}"
-
-            headers = {"Content-Type": "application/json"}
-            data = {
-                "contents": [{"role": "user", "parts": [{"text": prompt}]}],
-                "generationConfig": {"temperature": 0.9, "response_mime_type": "application/json"}
-            }
-
-            # Make request
             r = requests.post(url, headers=headers, json=data, timeout=240)
-
-            # Check for 503 specifically
-            if r.status_code == 503:
-                last_error = requests.HTTPError(f"503 Service Unavailable (Key attempt {attempt+1})", response=r)
-                if attempt < 2:  # Don't sleep on last attempt
-                    backoff = 2 ** attempt  # 1s, 2s, 4s
-                    print(f"[WARN] Gemini 503 error, retrying in {backoff}s with next key...")
-                    time.sleep(backoff)
-                continue  # Try next key
-
-            # Raise for other HTTP errors
-            r.raise_for_status()
-
-            # Parse response
-            out = r.json()
-            txt = out["candidates"][0]["content"]["parts"][0]["text"]
-            return json.loads(txt)
-
-        except requests.exceptions.HTTPError as e:
-            # Only retry 503 errors
-            if hasattr(e, 'response') and e.response.status_code == 503:
-                last_error = e
-                if attempt < 2:
-                    backoff = 2 ** attempt
-                    print(f"[WARN] HTTP 503, trying key {attempt+2}/{min(3, len(keys))} in {backoff}s...")
-                    time.sleep(backoff)
-                continue
-            else:
-                # Other HTTP errors (429, 400, 401, etc.) - raise immediately
-                raise
-
-        except Exception as e:
-            # Non-HTTP errors - raise immediately
-            last_error = e
+        except Exception:
+            registry.release(key, ERROR)
             raise
+        outcome = outcome_for_status(r.status_code)
+        registry.release(key, outcome)
+
+        # Check for 503 specifically
+        if r.status_code == 503:
+            last_error = requests.HTTPError(f"503 Service Unavailable (Key attempt {attempt+1})", response=r)
+            if attempt < 2:  # Don't sleep on last attempt
+                backoff = 2 ** attempt  # 1s, 2s, 4s
+                print(f"[WARN] Gemini 503 error, retrying in {backoff}s with next key...")
+                time.sleep(backoff)
+            continue  # Try next key
+
+        # 429: this key is backing off now, the next one may not be
+        if outcome == RATE_LIMITED:
+            last_error = requests.HTTPError(f"429 Too Many Requests (Key attempt {attempt+1})", response=r)
+            print(f"[WARN] Gemini 429, trying key {attempt+2}/{min(3, len(keys))}...")
+            continue
+
+        # Raise for other HTTP errors (400, 401, etc.)
+        r.raise_for_status()
+
+        # Parse response
+        out = r.json()
+        txt = out["candidates"][0]["content"]["parts"][0]["text"]
+        return json.loads(txt)
 
     # All retries exhausted
     if last_error:
@@ -552,6 +650,92 @@ def _call_gemini(prompt, api_key, model="gemini-2.5-flash"):
     else:
         raise RuntimeError("Gemini API failed with unknown error")
 
+def _iter_sse(response):
+    """JSON payloads of a server-sent events response ("data: ..." lines)."""
+    for line in response.iter_lines(decode_unicode=True):
+        if not line or not line.startswith("data:"):
+            continue
+        payload = line[5:].strip()
+        if payload == "[DONE]":
+            return
+        yield json.loads(payload)
+
+def _stream_json(events, on_item, item_field, fallback, label):
+    """
+    Feed streamed text chunks to an incremental parser and return the full JSON
+
+    ``events`` yields text chunks. If the stream fails before any item was
+    delivered, ``fallback()`` (the non-streaming call, with its retries) is used.
+    """
+    parser = ArrayItemStream(item_field)
+    try:
+        for chunk in events():
+            for item in parser.feed(chunk):
+                on_item(item)
+        return json.loads(parser.text)
+    except (requests.RequestException, ValueError, KeyError) as e:
+        if parser.count:
+            raise RuntimeError(f"{label} stream failed after {parser.count} items: {e}")
+        print(f"[WARN] {label} streaming failed ({e}), retrying without streaming...")
+        return fallback()
+
+def _call_gemini_stream(prompt, api_key, model, on_item, item_field="scenes"):
+    """Streaming variant of _call_gemini (streamGenerateContent over SSE)."""
+    from services.core.key_manager import ERROR, OK, get_all_keys, get_key_registry, outcome_for_status
+
+    registry = get_key_registry('google')
+    key = registry.order([api_key] + [k for k in get_all_keys('google') if k != api_key])[0]
+    url = f"https://generativelanguage.googleapis.com/v1beta/models/{model}:streamGenerateContent"
+    data = {
+        "contents": [{"role": "user", "parts": [{"text": prompt}]}],
+        "generationConfig": {"temperature": 0.9, "response_mime_type": "application/json"}
+    }
+
+    def events():
+        registry.begin(key)
+        outcome = ERROR
+        try:
+            with requests.post(url, params={"key": key, "alt": "sse"}, json=data,
+                               headers={"Content-Type": "application/json"},
+                               timeout=(30, 240), stream=True) as r:
+                outcome = outcome_for_status(r.status_code)
+                r.raise_for_status()
+                for event in _iter_sse(r):
+                    for cand in event.get("candidates") or []:
+                        for part in (cand.get("content") or {}).get("parts") or []:
+                            yield part.get("text", "")
+            outcome = OK
+        finally:
+            registry.release(key, outcome)
+
+    return _stream_json(events, on_item, item_field,
+                        lambda: _call_gemini(prompt, api_key, model), "Gemini")
+
+def _call_openai_stream(prompt, api_key, model, on_item, item_field="scenes"):
+    """Streaming variant of _call_openai (chat completions with stream=true)."""
+    url = "https://api.openai.com/v1/chat/completions"
+    headers = {"Authorization": f"Bearer {api_key}", "Content-Type": "application/json"}
+    data = {
+        "model": model,
+        "messages": [
+            {"role": "system", "content": "You output strictly JSON when asked."},
+            {"role": "user", "content": prompt}
+        ],
+        "response_format": {"type": "json_object"},
+        "temperature": 0.9,
+        "stream": True
+    }
+
+    def events():
+        with requests.post(url, headers=headers, json=data, timeout=(30, 240), stream=True) as r:
+            r.raise_for_status()
+            for event in _iter_sse(r):
+                for choice in event.get("choices") or []:
+                    yield (choice.get("delta") or {}).get("content") or ""
+
+    return _stream_json(events, on_item, item_field,
+                        lambda: _call_openai(prompt, api_key, model), "OpenAI")
+
 def _calculate_text_similarity(text1, text2):
     """
     Calculate similarity between two texts using Jaccard similarity algorithm.
@@ -587,6 +771,9 @@ def _validate_scene_uniqueness(scenes, similarity_threshold=0.8):
     Validate that scenes are unique (not duplicates).
     Checks both prompt_vi and prompt_tgt for similarity.
     
+    Uses a MinHash/LSH index, so only likely pairs are compared; each candidate is
+    scored with the same Jaccard similarity as _calculate_text_similarity.
+    
     Args:
         scenes: List of scene dicts with prompt_vi/prompt_tgt
         similarity_threshold: Maximum allowed similarity (default 0.8 = 80%)
@@ -594,30 +781,8 @@ def _validate_scene_uniqueness(scenes, similarity_threshold=0.8):
     Returns:
         List of duplicate pairs found: [(scene1_idx, scene2_idx, similarity), ...]
     """
-    duplicates = []
-
-    for i in range(len(scenes)):
-        for j in range(i + 1, len(scenes)):
-            scene1 = scenes[i]
-            scene2 = scenes[j]
-
-            # Check both Vietnamese and target prompts
-            prompt1_vi = scene1.get("prompt_vi", "")
-            prompt2_vi = scene2.get("prompt_vi", "")
-            prompt1_tgt = scene1.get("prompt_tgt", "")
-            prompt2_tgt = scene2.get("prompt_tgt", "")
-
-            # Calculate similarity for both language versions
-            sim_vi = _calculate_text_similarity(prompt1_vi, prompt2_vi)
-            sim_tgt = _calculate_text_similarity(prompt1_tgt, prompt2_tgt)
-
-            # Use the higher similarity score
-            max_sim = max(sim_vi, sim_tgt)
-
-            if max_sim >= similarity_threshold:
-                duplicates.append((i + 1, j + 1, max_sim))  # 1-based indexing for display
-
-    return duplicates
+    from services.utils.scene_similarity import SceneSimilarityIndex
+    return SceneSimilarityIndex(similarity_threshold).find_duplicates(scenes)
 
 def _enforce_character_consistency(scenes, character_bible):
     """
@@ -744,7 +909,7 @@ def _validate_dialogue_language(scenes, target_lang):
     
     return True, None
 
-def generate_script(idea, style, duration_seconds, provider='Gemini 2.5', api_key=None, output_lang='vi', domain=None, topic=None, voice_config=None, progress_callback=None):
+def generate_script(idea, style, duration_seconds, provider='Gemini 2.5', api_key=None, output_lang='vi', domain=None, topic=None, voice_config=None, progress_callback=None, use_cache=False, scene_callback=None):
     """
     Generate video script with optional domain/topic expertise and voice settings
     
@@ -759,6 +924,9 @@ def generate_script(idea, style, duration_seconds, provider='Gemini 2.5', api_ke
         topic: Optional topic within domain (e.g., "Giới thiệu sản phẩm")
         voice_config: Optional voice configuration dict with provider, voice_id, language_code
         progress_callback: Optional function(message: str, percent: int) for progress updates
+        use_cache: True to reuse a cached response for the same prompt (default: ask the LLM again)
+        scene_callback: Optional function(scene_index: int, scene: dict), called for each
+            scene as soon as it has streamed in (before validation of the full script)
     
     Returns:
         Script data dict with scenes, character_bible, etc.
@@ -792,19 +960,31 @@ def generate_script(idea, style, duration_seconds, provider='Gemini 2.5', api_ke
             # Log but don't fail if domain prompt loading fails
             print(f"[WARN] Could not load domain prompt: {e}")
 
+    # Stream scenes out as they arrive (progress moves 25% -> 50% scene by scene)
+    streamed = [0]
+    def on_scene(scene):
+        i = streamed[0]
+        streamed[0] += 1
+        if i < len(per):
+            scene["duration"] = int(per[i])
+        report_progress(f"Đã nhận cảnh {i+1}/{n}", 25 + int(25 * min(i + 1, n) / n))
+        if scene_callback:
+            scene_callback(i + 1, scene)
+    on_item = on_scene if (scene_callback or progress_callback) else None
+
     # Call LLM
     if provider.lower().startswith("gemini"):
         key=api_key or gk
         if not key: raise RuntimeError("Chưa cấu hình Google API Key cho Gemini.")
         report_progress("Đang chờ phản hồi từ Gemini... (có thể mất 1-3 phút)", 25)
-        res=_call_gemini(prompt,key,"gemini-2.5-flash")
+        res=_call_llm("gemini",prompt,key,"gemini-2.5-flash",use_cache,on_item)
         report_progress("Đã nhận phản hồi từ Gemini", 50)
     else:
         key=api_key or ok
         if not key: raise RuntimeError("Chưa cấu hình OpenAI API Key cho GPT-4 Turbo.")
         report_progress("Đang chờ phản hồi từ OpenAI... (có thể mất 1-3 phút)", 25)
         # FIXED: Use gpt-4-turbo instead of gpt-5
-        res=_call_openai(prompt,key,"gpt-4-turbo")
+        res=_call_llm("openai",prompt,key,"gpt-4-turbo",use_cache,on_item)
         report_progress("Đã nhận phản hồi từ OpenAI", 50)
     if "scenes" not in res: raise RuntimeError("LLM không trả về đúng schema.")
     
@@ -863,7 +1043,7 @@ def generate_script(idea, style, duration_seconds, provider='Gemini 2.5', api_ke
     return res
 
 
-def generate_social_media(script_data, provider='Gemini 2.5', api_key=None):
+def generate_social_media(script_data, provider='Gemini 2.5', api_key=None, use_cache=True):
     """
     Generate social media content in 3 different tones
     
@@ -871,6 +1051,7 @@ def generate_social_media(script_data, provider='Gemini 2.5', api_key=None):
         script_data: Script data dictionary with title, outline, screenplay
         provider: LLM provider (Gemini/OpenAI)
         api_key: Optional API key
+        use_cache: False to ignore a cached response for this script and ask the LLM again
     
     Returns:
         Dictionary with 3 social media versions (casual, professional, funny)
@@ -936,17 +1117,17 @@ Trả về JSON với format:
         key = api_key or gk
         if not key:
             raise RuntimeError("Chưa cấu hình Google API Key cho Gemini.")
-        res = _call_gemini(prompt, key, "gemini-2.5-flash")
+        res = _call_llm("gemini", prompt, key, "gemini-2.5-flash", use_cache)
     else:
         key = api_key or ok
         if not key:
             raise RuntimeError("Chưa cấu hình OpenAI API Key cho GPT-4 Turbo.")
-        res = _call_openai(prompt, key, "gpt-4-turbo")
+        res = _call_llm("openai", prompt, key, "gpt-4-turbo", use_cache)
 
     return res
 
 
-def generate_thumbnail_design(script_data, provider='Gemini 2.5', api_key=None):
+def generate_thumbnail_design(script_data, provider='Gemini 2.5', api_key=None, use_cache=True):
     """
     Generate detailed thumbnail design specifications
     
@@ -954,6 +1135,7 @@ def generate_thumbnail_design(script_data, provider='Gemini 2.5', api_key=None):
         script_data: Script data dictionary with title, outline, screenplay
         provider: LLM provider (Gemini/OpenAI)
         api_key: Optional API key
+        use_cache: False to ignore a cached response for this script and ask the LLM again
     
     Returns:
         Dictionary with thumbnail design specifications
@@ -1029,11 +1211,11 @@ Trả về JSON với format:
         key = api_key or gk
         if not key:
             raise RuntimeError("Chưa cấu hình Google API Key cho Gemini.")
-        res = _call_gemini(prompt, key, "gemini-2.5-flash")
+        res = _call_llm("gemini", prompt, key, "gemini-2.5-flash", use_cache)
     else:
         key = api_key or ok
         if not key:
             raise RuntimeError("Chưa cấu hình OpenAI API Key cho GPT-4 Turbo.")
-        res = _call_openai(prompt, key, "gpt-4-turbo")
+        res = _call_llm("openai", prompt, key, "gpt-4-turbo", use_cache)
 
-    return res
\ No newline at end of file
+    return res
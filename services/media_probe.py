@@ -0,0 +1,213 @@
+# services/media_probe.py
+"""
+Media Probe Service - Metadata, thumbnails and frames with one ffmpeg run per file
+
+Every frame a caller needs from a video (thumbnail, scene key frames) is
+extracted by a single ffmpeg invocation: each timestamp becomes its own
+fast-seeking input, so only a few frames around each point are decoded instead
+of one process (and one decode) per frame. Metadata comes from one ffprobe call.
+
+Results are cached by file fingerprint (size + SHA-256 of the first and last
+MiB), so re-analysing the same video, or a copy of it, runs no ffmpeg at all.
+At most one ffmpeg/ffprobe process per CPU core runs at a time, whichever
+thread asks; submit() queues work on a pool of the same size.
+"""
+
+import hashlib
+import json
+import os
+import shutil
+import subprocess
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Dict, Iterable, Optional
+
+_FINGERPRINT_BLOCK = 1024 * 1024
+
+
+def _cfg() -> dict:
+    try:
+        from utils import config as cfg
+        return cfg.get_section("media_probe")
+    except Exception:
+        return {}
+
+
+def _parse_fps(rate: str) -> float:
+    try:
+        num, den = rate.split("/")
+        return float(num) / float(den) if float(den) else 0.0
+    except (ValueError, AttributeError):
+        return 0.0
+
+
+class MediaProbe:
+    """
+    Usage:
+        probe = get_media_probe()
+        meta = probe.probe(video_path)                     # {'duration', 'width', 'height', 'fps'}
+        info = probe.analyze(video_path, timestamps=[1.5, 4.0], thumb_path=thumb)
+        info["frames"][1.5]                                # cached JPEG path
+    """
+
+    def __init__(self, cache_dir: str, max_workers: Optional[int] = None, ttl_days: float = 7.0):
+        self.cache_dir = cache_dir
+        os.makedirs(cache_dir, exist_ok=True)
+        workers = max(1, max_workers or os.cpu_count() or 2)
+        self._pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="MediaProbe")
+        self._slots = threading.BoundedSemaphore(workers)  # concurrent ffmpeg/ffprobe processes
+        self._meta: Dict[str, Dict] = {}
+        self._locks: Dict[str, threading.Lock] = {}
+        self._lock = threading.Lock()
+        self._prune(ttl_days)
+
+    def _prune(self, ttl_days: float):
+        """Drop cache entries not used for ``ttl_days``."""
+        cutoff = time.time() - ttl_days * 86400
+        try:
+            for name in os.listdir(self.cache_dir):
+                path = os.path.join(self.cache_dir, name)
+                if os.path.isdir(path) and os.path.getmtime(path) < cutoff:
+                    shutil.rmtree(path, ignore_errors=True)
+        except OSError:
+            pass
+
+    @staticmethod
+    def fingerprint(path: str) -> str:
+        """Content fingerprint: size plus SHA-256 of the first and last MiB."""
+        size = os.path.getsize(path)
+        h = hashlib.sha256(str(size).encode("ascii"))
+        with open(path, "rb") as f:
+            h.update(f.read(_FINGERPRINT_BLOCK))
+            if size > _FINGERPRINT_BLOCK:
+                f.seek(max(_FINGERPRINT_BLOCK, size - _FINGERPRINT_BLOCK))
+                h.update(f.read(_FINGERPRINT_BLOCK))
+        return h.hexdigest()[:32]
+
+    def _entry_lock(self, key: str) -> threading.Lock:
+        with self._lock:
+            lock = self._locks.get(key)
+            if lock is None:
+                lock = self._locks[key] = threading.Lock()
+            return lock
+
+    def probe(self, path: str) -> Dict:
+        """Duration/resolution/fps of a video (cached). Raises RuntimeError if ffprobe fails."""
+        return self.analyze(path)["metadata"]
+
+    def submit(self, path: str, timestamps: Iterable[float] = (), thumb_path: Optional[str] = None) -> Future:
+        """Queue analyze() on the pool."""
+        return self._pool.submit(self.analyze, path, timestamps, thumb_path)
+
+    def analyze(self, path: str, timestamps: Iterable[float] = (),
+                thumb_path: Optional[str] = None, with_metadata: bool = True) -> Dict:
+        """
+        Metadata plus a JPEG per timestamp, from cache or one ffmpeg run.
+
+        Args:
+            timestamps: Seconds to extract frames at
+            thumb_path: If given, the frame at 0s is also copied here
+            with_metadata: Set False to skip ffprobe when only frames are needed
+
+        Returns:
+            {"metadata": dict or {}, "frames": {timestamp: jpeg path}, "thumb": path or ""}
+        """
+        key = self.fingerprint(path)
+        entry_dir = os.path.join(self.cache_dir, key)
+        wanted = sorted({round(float(t), 3) for t in timestamps} | ({0.0} if thumb_path else set()))
+
+        with self._entry_lock(key):
+            os.makedirs(entry_dir, exist_ok=True)
+            os.utime(entry_dir)  # keep recently used entries out of _prune
+            metadata = self._metadata(path, key, entry_dir) if with_metadata else {}
+            frames = {t: os.path.join(entry_dir, f"{int(round(t * 1000))}.jpg") for t in wanted}
+            missing = [t for t in wanted if not os.path.exists(frames[t])]
+            if missing:
+                self._extract(path, {t: frames[t] for t in missing})
+
+        result = {"metadata": metadata, "thumb": "",
+                  "frames": {t: p for t, p in frames.items() if os.path.exists(p)}}
+        if thumb_path and 0.0 in result["frames"]:
+            os.makedirs(os.path.dirname(thumb_path) or ".", exist_ok=True)
+            shutil.copyfile(result["frames"][0.0], thumb_path)
+            result["thumb"] = thumb_path
+        return result
+
+    def _metadata(self, path: str, key: str, entry_dir: str) -> Dict:
+        meta = self._meta.get(key)
+        if meta is not None:
+            return meta
+        meta_file = os.path.join(entry_dir, "meta.json")
+        try:
+            with open(meta_file, "r", encoding="utf-8") as f:
+                meta = json.load(f)
+        except (OSError, ValueError):
+            meta = self._ffprobe(path)
+            with open(meta_file, "w", encoding="utf-8") as f:
+                json.dump(meta, f)
+        self._meta[key] = meta
+        return meta
+
+    def _ffprobe(self, path: str) -> Dict:
+        cmd = [
+            "ffprobe", "-v", "error",
+            "-select_streams", "v:0",
+            "-show_entries", "stream=width,height,r_frame_rate,avg_frame_rate,duration",
+            "-show_entries", "format=duration",
+            "-of", "json",
+            path,
+        ]
+        with self._slots:
+            result = subprocess.run(cmd, capture_output=True, text=True, timeout=30)
+        if result.returncode != 0:
+            raise RuntimeError(f"ffprobe failed: {result.stderr.strip()[:200]}")
+        data = json.loads(result.stdout or "{}")
+        stream = (data.get("streams") or [{}])[0]
+        fmt = data.get("format") or {}
+        return {
+            "width": int(stream.get("width") or 0),
+            "height": int(stream.get("height") or 0),
+            "fps": _parse_fps(stream.get("avg_frame_rate", "")) or _parse_fps(stream.get("r_frame_rate", "")),
+            "duration": float(fmt.get("duration") or stream.get("duration") or 0.0),
+        }
+
+    def _extract(self, path: str, outputs: Dict[float, str]):
+        """Write one JPEG per timestamp with a single ffmpeg process (one seeking input each)."""
+        if not shutil.which("ffmpeg"):
+            raise RuntimeError("ffmpeg not found in PATH")
+        cmd = ["ffmpeg", "-v", "error", "-y"]
+        for t in outputs:
+            cmd += ["-ss", f"{t:.3f}", "-i", path]
+        for idx, out in enumerate(outputs.values()):
+            cmd += ["-map", f"{idx}:v:0", "-frames:v", "1", "-q:v", "2", out]
+        with self._slots:
+            subprocess.run(cmd, capture_output=True, timeout=60 + 5 * len(outputs))
+
+
+# Global service instance
+_global_probe: Optional[MediaProbe] = None
+_probe_lock = threading.Lock()
+
+
+def get_media_probe() -> MediaProbe:
+    """
+    Get the process-wide media probe service
+    Pool size and cache location come from the optional "media_probe" config section
+
+    Returns:
+        MediaProbe instance
+    """
+    global _global_probe
+
+    with _probe_lock:
+        if _global_probe is None:
+            c = _cfg()
+            cache_dir = c.get("cache_dir") or os.path.join(
+                os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "cache", "media")
+            _global_probe = MediaProbe(
+                cache_dir=cache_dir,
+                max_workers=int(c.get("max_workers") or 0) or None,
+                ttl_days=float(c.get("ttl_days", 7.0)),
+            )
+        return _global_probe
@@ -1,17 +1,12 @@
 # -*- coding: utf-8 -*-
 import threading
+import time
 from contextlib import contextmanager
 
-def _cfg():
-    try:
-        from utils import config as cfg
-        return cfg.load() if hasattr(cfg,'load') else {}
-    except Exception:
-        return {}
+from utils import config as cfg
 
 def _limit(name:str, default:int):
-    c=_cfg()
-    return int(c.get('resilience', {}).get('concurrency', {}).get(name, default))
+    return cfg.get_int(f'resilience.concurrency.{name}', default)
 
 _SEMAPHORES = {
     'labs': threading.Semaphore(_limit('labs', 3)),
@@ -31,3 +26,53 @@ def acquire(provider:str):
         yield
     finally:
         sem.release()
+
+class TokenBucket:
+    """Thread-safe token bucket: ``rate`` tokens/sec, bursts of up to ``burst``."""
+
+    def __init__(self, rate: float, burst: float):
+        self.rate = max(0.001, float(rate))
+        self.burst = max(1.0, float(burst))
+        self._tokens = self.burst
+        self._stamp = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self, now: float):
+        self._tokens = min(self.burst, self._tokens + (now - self._stamp) * self.rate)
+        self._stamp = now
+
+    def acquire(self, tokens: float = 1.0):
+        """Block until ``tokens`` are available, then take them."""
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._refill(now)
+                if self._tokens >= tokens:
+                    self._tokens -= tokens
+                    return
+                wait = (tokens - self._tokens) / self.rate
+            time.sleep(wait)
+
+    def try_acquire(self, tokens: float = 1.0) -> bool:
+        with self._lock:
+            self._refill(time.monotonic())
+            if self._tokens >= tokens:
+                self._tokens -= tokens
+                return True
+            return False
+
+_BUCKETS = {}
+_BUCKETS_LOCK = threading.Lock()
+
+def rate_limiter(name: str, key: str = "", rate: float = 1.0, burst: float = 2.0) -> TokenBucket:
+    """
+    Shared token bucket for ``name`` (e.g. 'labs_submit'), one per ``key`` (e.g. account).
+    Rate/burst come from resilience.rate_limit.<name> = {"per_sec": .., "burst": ..}.
+    """
+    with _BUCKETS_LOCK:
+        bucket = _BUCKETS.get((name, key))
+        if bucket is None:
+            c = cfg.get_section(f'resilience.rate_limit.{name}')
+            bucket = TokenBucket(float(c.get('per_sec', rate)), float(c.get('burst', burst)))
+            _BUCKETS[(name, key)] = bucket
+        return bucket
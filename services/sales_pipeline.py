@@ -1,8 +1,10 @@
 # -*- coding: utf-8 -*-
-import os, time
+import os, queue
 from typing import List, Dict, Any
 from utils import config as cfg
 from services.labs_flow_service import LabsClient, DEFAULT_PROJECT_ID
+from services.google.operation_poller import get_operation_poller
+from services.utils.download_pipeline import get_download_pipeline
 
 _RATIO_MAP = {
     '16:9': 'VIDEO_ASPECT_RATIO_LANDSCAPE',
@@ -46,35 +48,48 @@ def start_pipeline(project_name:str, ratio_str:str, scenes:List[Dict[str,Any]],
     return {"jobs": jobs, "project_id": proj_id}
 
 def poll_and_download(client:LabsClient, jobs:List[Dict[str,Any]], out_dir:str, on_progress=None, sleep_sec:int=5)->List[Dict[str,Any]]:
+    """Wait for every job via the shared operation poller and download finished videos.
+
+    ``sleep_sec`` is kept for backward compatibility; check intervals are adaptive now.
+    """
     os.makedirs(out_dir, exist_ok=True)
     done = []
-    ops = [j["op"] for j in jobs]
-    while ops:
-        rs = client.batch_check_operations(ops) or {}
-        new_ops = []
-        for j in jobs:
-            info = rs.get(j["op"]) or {}
+    events = queue.Queue()
+    pending = {}
+    downloading = 0
+    poller = get_operation_poller()
+    pipeline = get_download_pipeline()
+
+    def finish(j, info):
+        done.append(j)
+        if callable(on_progress):
+            try: on_progress(j, info)
+            except Exception: pass
+
+    for j in jobs:
+        pending.setdefault(j["op"], []).append(j)
+        poller.watch(client, j["op"], lambda nm, info: events.put(("op", nm, info)))
+    while pending or downloading:
+        kind, key, info = events.get()
+        if kind == "downloaded":
+            j, result = key
+            downloading -= 1
+            if result["ok"]:
+                j["path"] = result["path"]
+            finish(j, info)
+            continue
+        for j in pending.pop(key, []):
             st = info.get("status") or "PROCESSING"
-            if st in ("DONE","COMPLETED","DONE_NO_URL","FAILED","ERROR"):
-                url = (info.get("video_urls") or [None])[0]
-                if url and st in ("DONE","COMPLETED"):
-                    import requests
-                    fp = os.path.join(out_dir, f"scene_{j['scene']}_copy_{j['copy']}.mp4")
-                    try:
-                        r = requests.get(url, timeout=600); r.raise_for_status()
-                        with open(fp, "wb") as f: f.write(r.content)
-                        j["path"] = fp
-                    except Exception:
-                        pass
-                j["status"] = st
-                done.append(j)
+            url = (info.get("video_urls") or [None])[0]
+            raw = info.get("raw") or {}
+            if raw.get("status") == "MEDIA_GENERATION_STATUS_SUCCESSFUL":
+                st = "COMPLETED"
+                url = url or ((raw.get("operation") or {}).get("metadata") or {}).get("video", {}).get("fifeUrl")
+            j["status"] = st
+            if url and st in ("DONE","COMPLETED"):
+                fp = os.path.join(out_dir, f"scene_{j['scene']}_copy_{j['copy']}.mp4")
+                downloading += 1
+                pipeline.submit(url, fp, lambda result, j=j, info=info: events.put(("downloaded", (j, result), info)))
             else:
-                new_ops.append(j["op"])
-            if callable(on_progress):
-                try: on_progress(j, info)
-                except Exception: pass
-        ops = new_ops
-        if ops:
-            try: time.sleep(sleep_sec)
-            except Exception: pass
+                finish(j, info)
     return done
@@ -6,7 +6,7 @@ from typing import Dict
 def _cfg():
     try:
         from utils import config as cfg
-        return cfg.load() if hasattr(cfg,'load') else {}
+        return cfg.snapshot()
     except Exception:
         return {}
 
@@ -2,27 +2,93 @@
 """
 Scene Detection Service
 Extract key frames from video using ffmpeg scene detection
+
+Metadata and frame extraction go through the shared media probe service: one
+ffprobe and one ffmpeg run per video, cached by file content.
+
+The default "fast" engine has ffmpeg decode only key frames (or a few frames per
+second), scaled down to a tiny grayscale image, and streams them as raw video;
+cuts are scored on that stream (vectorised with NumPy when installed), so the
+cost follows the analysis resolution rather than the source resolution. The
+"ffmpeg" engine is the original full-decode select=gt(scene) filter pass.
 """
 
 import os
+import re
 import shutil
 import subprocess
 import tempfile
-from typing import List, Dict
-import json
+import threading
+from typing import List, Dict, Optional
+
+from services.media_probe import get_media_probe
+
+try:
+    import numpy as np
+    NUMPY_AVAILABLE = True
+except ImportError:
+    NUMPY_AVAILABLE = False
+    np = None
+
+# Analysis frame size for the fast engine (grayscale)
+_FAST_W, _FAST_H = 64, 36
+_HIST_BINS = 16
+_PTS_RE = re.compile(rb"pts_time:\s*(-?[\d.]+)")
+
+
+def _cfg() -> dict:
+    try:
+        from utils import config as cfg
+        return cfg.get_section("scene_detection")
+    except Exception:
+        return {}
+
+
+def _score_frames_numpy(frames: List[bytes]) -> List[float]:
+    """Cut score between each frame and the previous one (vectorised)."""
+    arr = np.frombuffer(b"".join(frames), dtype=np.uint8).reshape(len(frames), -1)
+    n, px = arr.shape
+    # Histogram of every frame at once: offset each row's bin indices by row * bins
+    bins = (arr >> 4).astype(np.int64) + (np.arange(n, dtype=np.int64) * _HIST_BINS)[:, None]
+    hist = np.bincount(bins.ravel(), minlength=n * _HIST_BINS).reshape(n, _HIST_BINS) / px
+    hist_dist = np.abs(hist[1:] - hist[:-1]).sum(axis=1) / 2.0
+    mad = np.abs(arr[1:].astype(np.int16) - arr[:-1].astype(np.int16)).mean(axis=1) / 255.0
+    return (0.5 * hist_dist + 0.5 * mad).tolist()
+
+
+def _score_frames_python(frames: List[bytes]) -> List[float]:
+    """Same metric as _score_frames_numpy without NumPy."""
+    to_bin = bytes(v >> 4 for v in range(256))
+    hists = []
+    for f in frames:
+        binned = f.translate(to_bin)
+        hists.append([binned.count(b) / len(f) for b in range(_HIST_BINS)])
+    scores = []
+    for i in range(1, len(frames)):
+        hist_dist = sum(abs(a - b) for a, b in zip(hists[i], hists[i - 1])) / 2.0
+        mad = sum(abs(a - b) for a, b in zip(frames[i], frames[i - 1])) / (255.0 * len(frames[i]))
+        scores.append(0.5 * hist_dist + 0.5 * mad)
+    return scores
 
 
 class SceneDetector:
     """Detect scenes in video and extract key frames"""
 
-    def __init__(self, log_callback=None):
+    def __init__(self, log_callback=None, engine: Optional[str] = None, mode: Optional[str] = None):
         """
         Initialize scene detector
         
         Args:
             log_callback: Optional callback for logging
+            engine: "fast" (default) or "ffmpeg" (full-decode scene filter)
+            mode: Fast engine input: "keyframes" (default) or "sampled" (sample_fps frames/s)
         """
         self.log = log_callback or print
+        c = _cfg()
+        self.engine = engine or c.get("engine", "fast")
+        self.mode = mode or c.get("mode", "keyframes")
+        self.sample_fps = float(c.get("sample_fps", 4.0))
+        self.timeout = float(c.get("timeout_sec", 120.0))
 
     def extract_scenes(
         self, 
@@ -66,12 +132,16 @@ class SceneDetector:
                 self.log("[SceneDetector] No scenes detected, using evenly spaced frames")
                 scene_times = self._get_evenly_spaced_times(duration, num_scenes)
 
-            # Extract frames at scene times
+            # Extract all frames at scene times in one ffmpeg run
+            scene_times = scene_times[:num_scenes]
+            frames = self._extract_frames(video_path, scene_times)
             scenes = []
-            for i, timestamp in enumerate(scene_times[:num_scenes]):
+            for i, timestamp in enumerate(scene_times):
                 frame_path = os.path.join(temp_dir, f"scene_{i:03d}.jpg")
 
-                if self._extract_frame(video_path, timestamp, frame_path):
+                src = frames.get(round(float(timestamp), 3))
+                if src:
+                    shutil.copyfile(src, frame_path)
                     scenes.append({
                         'scene_index': i,
                         'timestamp': timestamp,
@@ -90,28 +160,9 @@ class SceneDetector:
             raise RuntimeError(f"Scene extraction failed: {e}")
 
     def _get_video_duration(self, video_path: str) -> float:
-        """Get video duration using ffprobe"""
+        """Get video duration using ffprobe (cached by the media probe service)"""
         try:
-            cmd = [
-                'ffprobe',
-                '-v', 'error',
-                '-show_entries', 'format=duration',
-                '-of', 'json',
-                video_path
-            ]
-
-            result = subprocess.run(
-                cmd,
-                capture_output=True,
-                text=True,
-                timeout=30
-            )
-
-            if result.returncode != 0:
-                raise RuntimeError(f"ffprobe failed: {result.stderr}")
-
-            data = json.loads(result.stdout)
-            return float(data['format']['duration'])
+            return float(get_media_probe().probe(video_path)['duration'])
 
         except Exception as e:
             self.log(f"[SceneDetector] Warning: Could not get duration: {e}")
@@ -124,8 +175,100 @@ class SceneDetector:
         max_scenes: int
     ) -> List[float]:
         """
-        Detect scene changes using ffmpeg's scene detection filter
+        Detect scene changes with the configured engine
         
+        Returns:
+            List of timestamps where scenes change
+        """
+        if self.engine == "ffmpeg":
+            return self._detect_scene_changes_filter(video_path, threshold, max_scenes)
+        return self._detect_scene_changes_fast(video_path, threshold, max_scenes)
+
+    def _detect_scene_changes_fast(
+        self,
+        video_path: str,
+        threshold: float,
+        max_scenes: int
+    ) -> List[float]:
+        """
+        Detect scene changes on a downscaled raw video stream
+
+        Only key frames (mode "keyframes") or sample_fps frames per second (mode
+        "sampled") are decoded; each is scaled to 64x36 grayscale and piped out as
+        raw bytes, with its timestamp read from showinfo on stderr.
+
+        Returns:
+            Up to max_scenes cut timestamps (the strongest cuts, in time order)
+        """
+        if self.mode == "sampled":
+            pre_input = []
+            vf = f"fps={self.sample_fps},scale={_FAST_W}:{_FAST_H},format=gray,showinfo"
+        else:
+            pre_input = ['-skip_frame', 'nokey']
+            vf = f"scale={_FAST_W}:{_FAST_H},format=gray,showinfo"
+        cmd = [
+            'ffmpeg', '-hide_banner', '-nostats',
+            *pre_input,
+            '-i', video_path,
+            '-an', '-sn',
+            '-vf', vf,
+            '-vsync', 'passthrough',
+            '-f', 'rawvideo', '-pix_fmt', 'gray',
+            '-'
+        ]
+        frame_size = _FAST_W * _FAST_H
+        frames: List[bytes] = []
+        times: List[float] = []
+
+        try:
+            proc = subprocess.Popen(cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+        except OSError as e:
+            self.log(f"[SceneDetector] Warning: Scene detection failed: {e}")
+            return []
+
+        def read_times():
+            for line in iter(proc.stderr.readline, b""):
+                m = _PTS_RE.search(line)
+                if m:
+                    times.append(float(m.group(1)))
+
+        reader = threading.Thread(target=read_times, daemon=True)
+        reader.start()
+        # Keep what was analysed so far if a very long video hits the timeout
+        killer = threading.Timer(self.timeout, proc.kill)
+        killer.start()
+        try:
+            while True:
+                buf = proc.stdout.read(frame_size)
+                if len(buf) < frame_size:
+                    break
+                frames.append(buf)
+        finally:
+            killer.cancel()
+            proc.stdout.close()
+            proc.wait()
+            reader.join(timeout=5)
+
+        n = min(len(frames), len(times))
+        if n < 2:
+            return []
+        frames, times = frames[:n], times[:n]
+        scores = _score_frames_numpy(frames) if NUMPY_AVAILABLE else _score_frames_python(frames)
+
+        cuts = [(score, times[i + 1]) for i, score in enumerate(scores) if score > threshold]
+        strongest = sorted(cuts, reverse=True)[:max_scenes]
+        self.log(f"[SceneDetector] Analysed {n} frames ({self.mode}), {len(cuts)} cuts")
+        return sorted({t for _, t in strongest})
+
+    def _detect_scene_changes_filter(
+        self,
+        video_path: str,
+        threshold: float,
+        max_scenes: int
+    ) -> List[float]:
+        """
+        Detect scene changes using ffmpeg's scene detection filter (full decode)
+
         Returns:
             List of timestamps where scenes change
         """
@@ -143,7 +286,7 @@ class SceneDetector:
                 cmd,
                 capture_output=True,
                 text=True,
-                timeout=120
+                timeout=self.timeout
             )
 
             # Parse scene times from stderr (ffmpeg outputs to stderr)
@@ -172,40 +315,23 @@ class SceneDetector:
         interval = duration / (num_scenes + 1)
         return [interval * (i + 1) for i in range(num_scenes)]
 
-    def _extract_frame(self, video_path: str, timestamp: float, output_path: str) -> bool:
+    def _extract_frames(self, video_path: str, timestamps: List[float]) -> Dict[float, str]:
         """
-        Extract a single frame at given timestamp
-        
+        Extract frames at the given timestamps with a single ffmpeg run
+
         Args:
             video_path: Input video path
-            timestamp: Time in seconds
-            output_path: Output image path
-        
+            timestamps: Times in seconds
+
         Returns:
-            True if successful, False otherwise
+            Dict of timestamp (rounded to ms) -> cached JPEG path; failed frames are missing
         """
         try:
-            cmd = [
-                'ffmpeg',
-                '-ss', str(timestamp),
-                '-i', video_path,
-                '-vframes', '1',
-                '-q:v', '2',  # High quality
-                '-y',  # Overwrite
-                output_path
-            ]
-
-            result = subprocess.run(
-                cmd,
-                capture_output=True,
-                timeout=30
-            )
-
-            return result.returncode == 0 and os.path.exists(output_path)
+            return get_media_probe().analyze(video_path, timestamps, with_metadata=False)["frames"]
 
         except Exception as e:
             self.log(f"[SceneDetector] Warning: Frame extraction failed: {e}")
-            return False
+            return {}
 
     def get_video_metadata(self, video_path: str) -> Dict:
         """
@@ -218,45 +344,7 @@ class SceneDetector:
             Dict with metadata
         """
         try:
-            cmd = [
-                'ffprobe',
-                '-v', 'error',
-                '-select_streams', 'v:0',
-                '-show_entries', 'stream=width,height,r_frame_rate,duration',
-                '-show_entries', 'format=duration',
-                '-of', 'json',
-                video_path
-            ]
-
-            result = subprocess.run(
-                cmd,
-                capture_output=True,
-                text=True,
-                timeout=30
-            )
-
-            if result.returncode != 0:
-                raise RuntimeError(f"ffprobe failed: {result.stderr}")
-
-            data = json.loads(result.stdout)
-            stream = data.get('streams', [{}])[0]
-            format_info = data.get('format', {})
-
-            # Parse frame rate
-            fps_str = stream.get('r_frame_rate', '30/1')
-            try:
-                num, den = map(int, fps_str.split('/'))
-                fps = num / den if den != 0 else 30.0
-            except (ValueError, ZeroDivisionError, AttributeError) as e:
-                self.log(f"[SceneDetector] Warning: Could not parse FPS '{fps_str}': {e}")
-                fps = 30.0
-
-            return {
-                'width': stream.get('width', 0),
-                'height': stream.get('height', 0),
-                'fps': fps,
-                'duration': float(format_info.get('duration', stream.get('duration', 0)))
-            }
+            return dict(get_media_probe().probe(video_path))
 
         except Exception as e:
             self.log(f"[SceneDetector] Warning: Could not get metadata: {e}")
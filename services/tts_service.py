@@ -2,17 +2,131 @@
 """
 TTS Service - Text-to-Speech Audio Generation
 Supports Google TTS, ElevenLabs, and OpenAI TTS providers
+
+Synthesised audio is cached on disk by content: the provider, voice, language,
+prosody/voice settings and text or SSML. Regenerating a script therefore only
+calls the API for the lines that changed. Each provider has a concurrency limit
+shared by every caller, and a key that is rate limited or rejected is skipped in
+favour of the next one. Settings come from the optional "tts" config section.
 """
-import os, base64, requests
+import os, base64, hashlib, json, requests, threading
 from typing import List, Tuple, Dict, Any, Optional
 from pathlib import Path
 import logging
 
 from services.core.config import load as load_config
-from services.core.key_manager import refresh, rotated_list
+from services.core.key_manager import ERROR, get_key_registry, outcome_for_status, refresh, rotated_list
+from utils.performance import get_pooled_session
 
 logger = logging.getLogger(__name__)
 
+# Responses that mean "this key cannot be used right now": try the next key
+_KEY_RETRY_STATUSES = (401, 403, 429)
+
+_DEFAULT_CONCURRENCY = {"google": 4, "elevenlabs": 2, "openai": 3}
+_provider_slots: Dict[str, threading.BoundedSemaphore] = {}
+_slots_lock = threading.Lock()
+# Cloud TTS quotas are separate from Gemini's, so Google TTS keys rotate on their own
+_TTS_REGISTRIES = {"Google": "google_tts", "ElevenLabs": "elevenlabs", "OpenAI": "openai"}
+
+
+def _cfg() -> dict:
+    try:
+        from utils import config as cfg
+        return cfg.get_section("tts")
+    except Exception:
+        return {}
+
+
+def _slots(provider: str) -> threading.BoundedSemaphore:
+    """Process-wide limit on concurrent requests to one TTS provider."""
+    with _slots_lock:
+        sem = _provider_slots.get(provider)
+        if sem is None:
+            limits = dict(_DEFAULT_CONCURRENCY, **(_cfg().get("concurrency") or {}))
+            sem = _provider_slots[provider] = threading.BoundedSemaphore(max(1, int(limits.get(provider, 2))))
+        return sem
+
+
+def _post_with_keys(keys: List[str], send, provider: str):
+    """
+    Call ``send(api_key)`` with each key in turn until one is accepted
+
+    Returns:
+        The first response whose status is not 401/403/429 (or the last response)
+    """
+    registry = get_key_registry(_TTS_REGISTRIES.get(provider, provider.lower()))
+    response = None
+    # Keys held back by the shared rotation state (429/401/403) go last
+    for api_key in registry.order(keys):
+        registry.begin(api_key)
+        try:
+            response = send(api_key)
+        except Exception:
+            registry.release(api_key, ERROR)
+            raise
+        registry.release(api_key, outcome_for_status(response.status_code))
+        if response.status_code not in _KEY_RETRY_STATUSES:
+            break
+        logger.warning(f"{provider} TTS key ...{api_key[-4:]} returned {response.status_code}, trying next key")
+    return response
+
+
+def _cache_dir() -> Optional[str]:
+    c = _cfg()
+    if not c.get("cache_enabled", True):
+        return None
+    return c.get("cache_dir") or os.path.join(
+        os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "cache", "tts")
+
+
+def audio_cache_key(voiceover_config: Dict[str, Any]) -> str:
+    """Content address of a voiceover: everything that changes the synthesised audio."""
+    provider = voiceover_config.get("tts_provider", "google")
+    ident = {
+        "provider": provider,
+        "voice": voiceover_config.get("voice_id", ""),
+        "language": voiceover_config.get("language", "vi"),
+        "text": voiceover_config.get("text", ""),
+        "prosody": voiceover_config.get("prosody") or {},
+    }
+    if provider == "google":
+        ident["ssml"] = voiceover_config.get("ssml_markup") or ""
+    elif provider == "elevenlabs":
+        ident["settings"] = voiceover_config.get("elevenlabs_settings") or {}
+    blob = json.dumps(ident, sort_keys=True, ensure_ascii=False)
+    return hashlib.sha256(blob.encode("utf-8")).hexdigest()
+
+
+def _cache_path(key: str) -> Optional[str]:
+    root = _cache_dir()
+    return os.path.join(root, key[:2], f"{key}.mp3") if root else None
+
+
+def _cache_get(key: str) -> Optional[bytes]:
+    path = _cache_path(key)
+    if not path or not os.path.exists(path):
+        return None
+    try:
+        with open(path, "rb") as f:
+            return f.read() or None
+    except OSError:
+        return None
+
+
+def _cache_put(key: str, audio_bytes: bytes):
+    path = _cache_path(key)
+    if not path:
+        return
+    try:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp = f"{path}.{threading.get_ident()}.tmp"
+        with open(tmp, "wb") as f:
+            f.write(audio_bytes)
+        os.replace(tmp, path)
+    except OSError as e:
+        logger.warning(f"Could not cache TTS audio: {e}")
+
 def _tokens_of(kinds:Tuple[str,...])->List[str]:
     out=[]; c=load_config(); refresh()
     # New structured lists
@@ -64,16 +178,14 @@ def synthesize_speech_google(text: str, voice_id: str, language_code: str = "vi-
     Returns:
         Audio content as bytes (MP3 format), or None if failed
     """
-    # Get API key
-    if not api_key:
-        keys = _tokens_of(("google_tts", "google", "gemini"))
-        if not keys:
-            logger.error("No Google API key found for TTS")
-            return None
-        api_key = keys[0]
+    # Get API keys (explicit key only, or every configured key in rotation order)
+    keys = [api_key] if api_key else _tokens_of(("google_tts", "google", "gemini"))
+    if not keys:
+        logger.error("No Google API key found for TTS")
+        return None
 
     # Build request
-    url = f"https://texttospeech.googleapis.com/v1/text:synthesize?key={api_key}"
+    url = "https://texttospeech.googleapis.com/v1/text:synthesize"
 
     # Determine input type
     if ssml_markup:
@@ -103,7 +215,10 @@ def synthesize_speech_google(text: str, voice_id: str, language_code: str = "vi-
 
     try:
         logger.info(f"Synthesizing speech with Google TTS: voice={voice_id}, lang={language_code}")
-        response = requests.post(url, json=request_body, timeout=30)
+        response = _post_with_keys(
+            keys,
+            lambda key: get_pooled_session("tts").post(url, params={"key": key}, json=request_body, timeout=30),
+            "Google")
         response.raise_for_status()
 
         result = response.json()
@@ -145,21 +260,14 @@ def synthesize_speech_elevenlabs(text: str, voice_id: str,
     Returns:
         Audio content as bytes (MP3 format), or None if failed
     """
-    # Get API key
-    if not api_key:
-        keys = _tokens_of(("elevenlabs",))
-        if not keys:
-            logger.error("No ElevenLabs API key found")
-            return None
-        api_key = keys[0]
+    # Get API keys
+    keys = [api_key] if api_key else _tokens_of(("elevenlabs",))
+    if not keys:
+        logger.error("No ElevenLabs API key found")
+        return None
 
     url = f"https://api.elevenlabs.io/v1/text-to-speech/{voice_id}"
 
-    headers = {
-        "xi-api-key": api_key,
-        "Content-Type": "application/json"
-    }
-
     request_body = {
         "text": text,
         "model_id": "eleven_multilingual_v2",
@@ -173,7 +281,12 @@ def synthesize_speech_elevenlabs(text: str, voice_id: str,
 
     try:
         logger.info(f"Synthesizing speech with ElevenLabs: voice={voice_id}")
-        response = requests.post(url, headers=headers, json=request_body, timeout=30)
+        response = _post_with_keys(
+            keys,
+            lambda key: get_pooled_session("tts").post(
+                url, headers={"xi-api-key": key, "Content-Type": "application/json"},
+                json=request_body, timeout=30),
+            "ElevenLabs")
         response.raise_for_status()
 
         audio_bytes = response.content
@@ -205,21 +318,14 @@ def synthesize_speech_openai(text: str, voice: str = "alloy",
     Returns:
         Audio content as bytes (MP3 format), or None if failed
     """
-    # Get API key
-    if not api_key:
-        keys = _tokens_of(("openai",))
-        if not keys:
-            logger.error("No OpenAI API key found")
-            return None
-        api_key = keys[0]
+    # Get API keys
+    keys = [api_key] if api_key else _tokens_of(("openai",))
+    if not keys:
+        logger.error("No OpenAI API key found")
+        return None
 
     url = "https://api.openai.com/v1/audio/speech"
 
-    headers = {
-        "Authorization": f"Bearer {api_key}",
-        "Content-Type": "application/json"
-    }
-
     request_body = {
         "model": model,
         "input": text,
@@ -229,7 +335,12 @@ def synthesize_speech_openai(text: str, voice: str = "alloy",
 
     try:
         logger.info(f"Synthesizing speech with OpenAI TTS: voice={voice}, model={model}")
-        response = requests.post(url, headers=headers, json=request_body, timeout=30)
+        response = _post_with_keys(
+            keys,
+            lambda key: get_pooled_session("tts").post(
+                url, headers={"Authorization": f"Bearer {key}", "Content-Type": "application/json"},
+                json=request_body, timeout=30),
+            "OpenAI")
         response.raise_for_status()
 
         audio_bytes = response.content
@@ -263,6 +374,39 @@ def synthesize_speech(voiceover_config: Dict[str, Any],
     Returns:
         Audio content as bytes, or None if failed
     """
+    audio_bytes = _synthesize_cached(voiceover_config)
+
+    # Save to file if output path provided
+    if audio_bytes and output_path:
+        try:
+            output_file = Path(output_path)
+            output_file.parent.mkdir(parents=True, exist_ok=True)
+            output_file.write_bytes(audio_bytes)
+            logger.info(f"Saved audio to {output_path}")
+        except Exception as e:
+            logger.error(f"Failed to save audio to {output_path}: {e}")
+
+    return audio_bytes
+
+
+def _synthesize_cached(voiceover_config: Dict[str, Any]) -> Optional[bytes]:
+    """Audio from the disk cache, or from the provider (within its concurrency limit)."""
+    key = audio_cache_key(voiceover_config)
+    audio_bytes = _cache_get(key)
+    if audio_bytes:
+        logger.info(f"TTS cache hit ({key[:12]})")
+        return audio_bytes
+
+    provider = voiceover_config.get("tts_provider", "google")
+    with _slots(provider):
+        audio_bytes = _synthesize_provider(voiceover_config)
+    if audio_bytes:
+        _cache_put(key, audio_bytes)
+    return audio_bytes
+
+
+def _synthesize_provider(voiceover_config: Dict[str, Any]) -> Optional[bytes]:
+    """Call the configured provider for one voiceover (no cache)."""
     provider = voiceover_config.get("tts_provider", "google")
     text = voiceover_config.get("text", "")
     voice_id = voiceover_config.get("voice_id", "")
@@ -335,16 +479,6 @@ def synthesize_speech(voiceover_config: Dict[str, Any],
         logger.error(f"Unknown TTS provider: {provider}")
         return None
 
-    # Save to file if output path provided
-    if audio_bytes and output_path:
-        try:
-            output_file = Path(output_path)
-            output_file.parent.mkdir(parents=True, exist_ok=True)
-            output_file.write_bytes(audio_bytes)
-            logger.info(f"Saved audio to {output_path}")
-        except Exception as e:
-            logger.error(f"Failed to save audio to {output_path}: {e}")
-
     return audio_bytes
 
 
@@ -0,0 +1,119 @@
+# -*- coding: utf-8 -*-
+"""
+Download Pipeline - Bounded background stages for finished video operations
+
+Polling only enqueues URLs here and keeps checking on schedule. Downloads run on
+a bounded thread pool with a per-host connection limit; thumbnail extraction is
+a separate follow-on stage so a slow ffmpeg call never holds a download slot.
+"""
+
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, Optional
+from urllib.parse import urlparse
+
+from services.utils.video_downloader import VideoDownloader
+
+
+def _cfg() -> dict:
+    try:
+        from utils import config as cfg
+        return cfg.get_section("downloads")
+    except Exception:
+        return {}
+
+
+class DownloadPipeline:
+    """
+    Two-stage executor: download → thumbnail.
+
+    Usage:
+        pipeline = get_download_pipeline()
+        pipeline.submit(url, dest, on_done, thumb_fn=make_thumb, on_thumb=on_thumb)
+
+    ``on_done(result)`` receives ``{"ok": bool, "path": str, "error": Exception|None}``
+    from a download thread. When the download succeeded and ``thumb_fn`` is given,
+    ``thumb_fn(path)`` runs on the thumbnail pool and its return value is passed
+    to ``on_thumb(thumb_path)``.
+    """
+
+    def __init__(self, max_workers: int = 4, per_host: int = 2, thumb_workers: int = 2,
+                 downloader: Optional[VideoDownloader] = None):
+        self.per_host = max(1, per_host)
+        self._downloader = downloader or VideoDownloader(log_callback=lambda msg: None)
+        self._downloads = ThreadPoolExecutor(max_workers=max(1, max_workers),
+                                             thread_name_prefix="VideoDownload")
+        self._thumbs = ThreadPoolExecutor(max_workers=max(1, thumb_workers),
+                                          thread_name_prefix="VideoThumb")
+        self._host_slots: Dict[str, threading.Semaphore] = {}
+        self._lock = threading.Lock()
+
+    def _slot(self, url: str) -> threading.Semaphore:
+        host = urlparse(url).netloc
+        with self._lock:
+            sem = self._host_slots.get(host)
+            if sem is None:
+                sem = self._host_slots[host] = threading.Semaphore(self.per_host)
+            return sem
+
+    def submit(self, url: str, dest: str, on_done: Callable[[Dict[str, Any]], None],
+               thumb_fn: Optional[Callable[[str], str]] = None,
+               on_thumb: Optional[Callable[[str], None]] = None,
+               downloader: Optional[VideoDownloader] = None):
+        """Queue a download; returns immediately."""
+        self._downloads.submit(self._run_download, url, dest, on_done, thumb_fn, on_thumb,
+                               downloader or self._downloader)
+
+    def _run_download(self, url, dest, on_done, thumb_fn, on_thumb, downloader):
+        result = {"ok": False, "path": dest, "error": None}
+        try:
+            with self._slot(url):
+                downloader.download(url, dest)
+            result["ok"] = True
+        except Exception as e:
+            result["error"] = e
+        _safe_call(on_done, result)
+        if result["ok"] and thumb_fn is not None:
+            self._thumbs.submit(self._run_thumb, dest, thumb_fn, on_thumb)
+
+    @staticmethod
+    def _run_thumb(path, thumb_fn, on_thumb):
+        try:
+            thumb = thumb_fn(path) or ""
+        except Exception:
+            thumb = ""
+        if on_thumb is not None:
+            _safe_call(on_thumb, thumb)
+
+
+def _safe_call(fn, arg):
+    try:
+        fn(arg)
+    except Exception:
+        pass
+
+
+# Global pipeline instance
+_global_pipeline: Optional[DownloadPipeline] = None
+_pipeline_lock = threading.Lock()
+
+
+def get_download_pipeline() -> DownloadPipeline:
+    """
+    Get the process-wide download pipeline
+    Sizes come from the optional "downloads" config section
+
+    Returns:
+        DownloadPipeline instance
+    """
+    global _global_pipeline
+
+    with _pipeline_lock:
+        if _global_pipeline is None:
+            c = _cfg()
+            _global_pipeline = DownloadPipeline(
+                max_workers=int(c.get("max_workers", 4)),
+                per_host=int(c.get("per_host", 2)),
+                thumb_workers=int(c.get("thumb_workers", 2)),
+            )
+        return _global_pipeline
@@ -0,0 +1,259 @@
+# -*- coding: utf-8 -*-
+"""
+Job Journal - Append-only on-disk record of video generation operations
+
+Every submitted operation is written to ``<project video dir>/.job_journal.jsonl``
+together with its account, project_id, status and download path. When a run is
+interrupted (app closed, crash, overnight batch killed), the next run of the
+same scenes reattaches to the operations that are still outstanding and skips
+the ones already downloaded, instead of resubmitting (and paying for) them.
+
+Records (one JSON object per line):
+    {"event": "submitted", "op": ..., "batch": ..., "scene": n, "copy": k,
+     "copies": requested copies, "prompt_sha": ..., "account": ..., "project_id": ..., "model_key": ...,
+     "metadata": {...}, "ts": ...}
+    {"event": "status", "op": ..., "status": ..., "ts": ...}
+    {"event": "downloaded", "op": ..., "path": ..., "ts": ...}
+    {"event": "failed", "op": ..., "reason": ..., "ts": ...}
+"""
+
+import hashlib
+import json
+import os
+import threading
+import time
+import uuid
+from typing import Any, Dict, List, Optional
+
+JOURNAL_NAME = ".job_journal.jsonl"
+
+# Operations in these states will never produce a video
+FINAL_FAILED = ("FAILED", "TIMEOUT")
+
+
+def _is_outstanding(entry: Dict[str, Any]) -> bool:
+    """Submitted but neither downloaded nor failed/timed out."""
+    return entry["status"] != "DOWNLOADED" and entry["status"] not in FINAL_FAILED
+
+
+def _cfg() -> dict:
+    try:
+        from utils import config as cfg
+        return cfg.get_section("job_journal")
+    except Exception:
+        return {}
+
+
+def prompt_sha(prompt: Any) -> str:
+    """Stable fingerprint of a scene prompt (dict or string)."""
+    if isinstance(prompt, str):
+        text = prompt
+    else:
+        text = json.dumps(prompt, sort_keys=True, ensure_ascii=False, default=str)
+    return hashlib.sha1(text.encode("utf-8")).hexdigest()
+
+
+class JobJournal:
+    """
+    Per-project operation journal.
+
+    Usage:
+        journal = get_job_journal(dir_videos)
+        plan = journal.resume_plan(scene_num, prompt, copies)   # [] -> submit normally
+        ...
+        journal.record_submitted(scene_num, prompt, body, account, project_id, model_key)
+        journal.record_status(op_name, "READY")
+        journal.record_downloaded(op_name, path)
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+        self._ops: Dict[str, Dict[str, Any]] = {}
+        self._latest_batch: Dict[tuple, str] = {}
+        self._torn = False  # file ends mid-record: start the next append on a new line
+        self._replay()
+
+    def _replay(self):
+        if not os.path.exists(self.path):
+            return
+        records = []
+        with open(self.path, "r", encoding="utf-8") as f:
+            for line in f:
+                self._torn = not line.endswith("\n")
+                try:
+                    rec = json.loads(line)
+                except ValueError:
+                    continue  # torn last line from a crash mid-write
+                records.append(rec)
+                self._apply(rec)
+        if len(records) >= int(_cfg().get("compact_after_records", 2000)):
+            self._compact(records)
+
+    def _live_batches(self) -> set:
+        """Latest batch of each scene/prompt that still has outstanding operations."""
+        latest = set(self._latest_batch.values())
+        return {e.get("batch") for e in self._ops.values()
+                if e.get("batch") in latest and _is_outstanding(e)}
+
+    def _compact(self, records: List[Dict[str, Any]]):
+        """
+        Rewrite the journal with only the records resume_plan() can still use.
+
+        Finished batches and batches superseded by a newer submission of the same
+        scene/prompt are dropped, so the file does not grow forever.
+        """
+        live = self._live_batches()
+        keep = [r for r in records if self._ops.get(r.get("op"), {}).get("batch") in live]
+        if len(keep) == len(records):
+            return
+        tmp = self.path + ".tmp"
+        try:
+            with open(tmp, "w", encoding="utf-8") as f:
+                for rec in keep:
+                    f.write(json.dumps(rec, ensure_ascii=False) + "\n")
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp, self.path)
+        except OSError:
+            return  # keep the full journal; compaction is retried next session
+        self._torn = False
+        self._ops.clear()
+        self._latest_batch.clear()
+        for rec in keep:
+            self._apply(rec)
+
+    def _apply(self, rec: Dict[str, Any]):
+        op = rec.get("op")
+        event = rec.get("event")
+        if not op:
+            return
+        if event == "submitted":
+            entry = {k: v for k, v in rec.items() if k not in ("event", "ts")}
+            entry.update(submitted_ts=rec.get("ts", 0.0), status="PENDING", path="", reason="")
+            self._ops[op] = entry
+            self._latest_batch[(entry.get("scene"), entry.get("prompt_sha"))] = entry.get("batch")
+            return
+        entry = self._ops.get(op)
+        if entry is None:
+            return
+        if event == "status":
+            entry["status"] = rec.get("status", entry["status"])
+        elif event == "downloaded":
+            entry["status"] = "DOWNLOADED"
+            entry["path"] = rec.get("path", "")
+        elif event == "failed":
+            entry["status"] = "FAILED"
+            entry["reason"] = rec.get("reason", "")
+
+    def _append(self, records: List[Dict[str, Any]], sync: bool = False):
+        now = time.time()
+        with self._lock:
+            try:
+                os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+                with open(self.path, "a", encoding="utf-8") as f:
+                    if self._torn:
+                        f.write("\n")
+                        self._torn = False
+                    for rec in records:
+                        rec.setdefault("ts", now)
+                        f.write(json.dumps(rec, ensure_ascii=False) + "\n")
+                        self._apply(rec)
+                    if sync:
+                        f.flush()
+                        os.fsync(f.fileno())
+            except OSError:
+                # Journal is best-effort: generation goes on without resume support
+                for rec in records:
+                    self._apply(rec)
+
+    def record_submitted(self, scene: int, prompt: Any, body: Dict[str, Any],
+                         account: str = "", project_id: Optional[str] = None,
+                         model_key: str = ""):
+        """Record the operations a start_one() call created (fsynced: they cost money)."""
+        op_names = body.get("operation_names") or []
+        if not op_names:
+            return
+        metadata = body.get("operation_metadata") or {}
+        batch = uuid.uuid4().hex[:12]
+        sha = prompt_sha(prompt)
+        requested = int(body.get("copies") or len(op_names))
+        self._append([{
+            "event": "submitted",
+            "op": op,
+            "batch": batch,
+            "scene": scene,
+            "copy": idx,
+            "copies": requested,
+            "prompt_sha": sha,
+            "account": account,
+            "project_id": project_id,
+            "model_key": model_key,
+            "metadata": metadata.get(op),
+        } for idx, op in enumerate(op_names, start=1)], sync=True)
+
+    def record_status(self, op_name: str, status: str):
+        self._append([{"event": "status", "op": op_name, "status": status}])
+
+    def record_downloaded(self, op_name: str, path: str):
+        self._append([{"event": "downloaded", "op": op_name, "path": path}])
+
+    def record_failed(self, op_name: str, reason: str):
+        self._append([{"event": "failed", "op": op_name, "reason": reason}])
+
+    def resume_plan(self, scene: int, prompt: Any, copies: Optional[int] = None) -> List[Dict[str, Any]]:
+        """
+        Operations of an interrupted run of this scene/prompt to reattach to.
+
+        Returns every entry of the latest run (sorted by copy) when at least one of
+        its operations is still outstanding; ``status`` is DOWNLOADED (``path``
+        exists on disk) or outstanding, and ``submitted_ts`` is when it was
+        submitted. Returns [] so the caller submits a new batch when the scene was
+        never submitted, the prompt or the requested number of ``copies`` changed
+        (e.g. retrying only the failed copies), any copy failed or timed out, or
+        every copy was already downloaded (a rerun asks for new takes).
+        """
+        with self._lock:
+            batch = self._latest_batch.get((scene, prompt_sha(prompt)))
+            if not batch:
+                return []
+            entries = [dict(e) for e in self._ops.values() if e.get("batch") == batch]
+        requested = entries[0].get("copies") or len(entries)
+        if copies is not None and requested != copies:
+            return []
+        if any(e["status"] in FINAL_FAILED for e in entries):
+            return []
+        if not any(_is_outstanding(e) for e in entries):
+            return []
+        for entry in entries:
+            if entry["status"] == "DOWNLOADED" and not os.path.exists(entry["path"]):
+                entry["status"] = "PENDING"  # file was removed: fetch it again
+        return sorted(entries, key=lambda e: e.get("copy", 0))
+
+    def outstanding(self) -> List[Dict[str, Any]]:
+        """Every recorded operation that has neither been downloaded nor failed/timed out."""
+        with self._lock:
+            return [dict(e) for e in self._ops.values() if _is_outstanding(e)]
+
+
+# Journals by project directory (shared so concurrent workers append under one lock)
+_journals: Dict[str, JobJournal] = {}
+_journals_lock = threading.Lock()
+
+
+def get_job_journal(dir_videos: str) -> Optional[JobJournal]:
+    """
+    Get the journal for a project's video directory
+    Disabled (returns None) when the "job_journal" config section sets enabled: false
+
+    Returns:
+        JobJournal instance, or None
+    """
+    if not dir_videos or not bool(_cfg().get("enabled", True)):
+        return None
+    path = os.path.abspath(os.path.join(dir_videos, JOURNAL_NAME))
+    with _journals_lock:
+        journal = _journals.get(path)
+        if journal is None:
+            journal = _journals[path] = JobJournal(path)
+        return journal
@@ -0,0 +1,82 @@
+# -*- coding: utf-8 -*-
+"""
+Incremental JSON parsing for streamed LLM responses
+
+The script schema returns one JSON object whose ``"scenes"`` key is an array of
+scene objects. While the response is still streaming, ArrayItemStream picks out
+each element of that array as soon as its closing brace arrives, so callers can
+show (or start working on) early scenes before the whole document is complete.
+"""
+
+import json
+from typing import Any, Dict, List
+
+
+class ArrayItemStream:
+    """
+    Yield the objects of a top-level array field while its JSON text is still arriving.
+
+    Usage:
+        parser = ArrayItemStream("scenes")
+        for chunk in stream:
+            for scene in parser.feed(chunk):
+                show(scene)
+        data = json.loads(parser.text)
+    """
+
+    def __init__(self, field: str):
+        self.field = field
+        self.text = ""
+        self._pos = 0              # characters consumed so far
+        self._depth = 0            # current {}/[] nesting depth
+        self._in_string = False
+        self._escape = False
+        self._string_start = -1
+        self._last_key = None      # last string seen at depth 1 (candidate key)
+        self._array_depth = 0      # depth inside the target array (0 = not in it)
+        self._item_start = -1
+        self.count = 0
+
+    def feed(self, chunk: str) -> List[Dict[str, Any]]:
+        """Add streamed text; returns the array items completed by it."""
+        if not chunk:
+            return []
+        self.text += chunk
+        text = self.text
+        items = []
+        for i in range(self._pos, len(text)):
+            ch = text[i]
+            if self._in_string:
+                if self._escape:
+                    self._escape = False
+                elif ch == "\\":
+                    self._escape = True
+                elif ch == '"':
+                    self._in_string = False
+                    if self._depth == 1:
+                        self._last_key = text[self._string_start + 1:i]
+                continue
+            if ch == '"':
+                self._in_string = True
+                self._string_start = i
+            elif ch in "{[":
+                self._depth += 1
+                if ch == "[" and self._depth == 2 and self._last_key == self.field and not self._array_depth:
+                    self._array_depth = 2
+                elif ch == "{" and self._array_depth and self._depth == self._array_depth + 1:
+                    self._item_start = i
+            elif ch in "}]":
+                if ch == "}" and self._array_depth and self._depth == self._array_depth + 1 and self._item_start >= 0:
+                    try:
+                        items.append(json.loads(text[self._item_start:i + 1]))
+                        self.count += 1
+                    except ValueError:
+                        pass  # leave malformed items to the final full parse
+                    self._item_start = -1
+                elif ch == "]" and self._array_depth and self._depth == self._array_depth:
+                    self._array_depth = 0
+                self._depth -= 1
+            elif ch == "," and self._depth == 1:
+                self._last_key = None
+        self._pos = len(text)
+        return items
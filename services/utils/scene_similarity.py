@@ -0,0 +1,200 @@
+# -*- coding: utf-8 -*-
+"""
+Scene Similarity Index - Near-duplicate scene detection without comparing every pair
+
+Each scene prompt is tokenised once (lowercased word set, the same tokens the
+Jaccard check in llm_story_service uses) and summarised by a MinHash signature
+(one-permutation hashing: one hash per word, split into NUM_PERM bins).
+Signatures are split into LSH bands; only scenes that share a band bucket are
+compared, and every candidate is confirmed with the exact Jaccard similarity,
+so reported pairs and scores match the old all-pairs check. Bands are chosen so
+that pairs at the threshold collide with probability above 99.9%.
+
+SceneHistory keeps the prompts of a project's earlier scripts on disk, so a
+regenerated script can be checked against what the project already produced.
+"""
+
+import hashlib
+import json
+import os
+import threading
+from typing import Dict, Iterable, List, Sequence, Tuple
+
+FIELDS = ("prompt_vi", "prompt_tgt")
+NUM_PERM = 64
+_EMPTY = 1 << 64
+
+
+def tokens(text: str) -> frozenset:
+    """Word set used for similarity (lowercase, whitespace split)."""
+    return frozenset((text or "").lower().split())
+
+
+def jaccard(a: frozenset, b: frozenset) -> float:
+    if not a or not b:
+        return 0.0
+    return len(a & b) / len(a | b)
+
+
+def minhash(words: Iterable[str]) -> Tuple[int, ...]:
+    """
+    MinHash signature (NUM_PERM values) of a token set.
+
+    Each word is hashed once; the hash picks a bin and the rest of it competes for
+    that bin's minimum. Empty bins borrow the next filled bin's value (densification)
+    so short prompts still get a full signature.
+    """
+    bins = [_EMPTY] * NUM_PERM
+    for w in words:
+        h = int.from_bytes(hashlib.blake2b(w.encode("utf-8"), digest_size=8).digest(), "little")
+        idx = h % NUM_PERM
+        v = h // NUM_PERM
+        if v < bins[idx]:
+            bins[idx] = v
+    filled = [i for i, v in enumerate(bins) if v != _EMPTY]
+    if not filled:
+        return ()
+    sig = list(bins)
+    for i in range(NUM_PERM):
+        if sig[i] == _EMPTY:
+            # Nearest filled bin to the right (wrapping); offset keeps borrowed values distinct
+            j = next((f for f in filled if f > i), filled[0])
+            sig[i] = (bins[j], (j - i) % NUM_PERM)
+    return tuple(sig)
+
+
+def _choose_bands(threshold: float, num_perm: int = NUM_PERM) -> int:
+    """Most selective band count whose collision probability at ``threshold`` stays above 99.9%."""
+    best = num_perm  # one row per band: always a candidate when any value matches
+    for bands in range(1, num_perm + 1):
+        if num_perm % bands:
+            continue
+        rows = num_perm // bands
+        if 1.0 - (1.0 - threshold ** rows) ** bands >= 0.999:
+            best = bands
+            break
+    return best
+
+
+class SceneSimilarityIndex:
+    """
+    Usage:
+        index = SceneSimilarityIndex(threshold=0.8)
+        for i, scene in enumerate(scenes, 1):
+            matches = index.query(scene)        # [(key, similarity), ...] above threshold
+            index.add(i, scene)
+    """
+
+    def __init__(self, threshold: float = 0.8, fields: Sequence[str] = FIELDS):
+        self.threshold = threshold
+        self.fields = tuple(fields)
+        self.bands = _choose_bands(max(0.01, min(threshold, 1.0)))
+        self.rows = NUM_PERM // self.bands
+        self._tokens: Dict[object, Dict[str, frozenset]] = {}
+        self._buckets: Dict[tuple, List[object]] = {}
+
+    def __len__(self):
+        return len(self._tokens)
+
+    def _prepare(self, scene: dict) -> Tuple[Dict[str, frozenset], List[tuple]]:
+        toks = {f: tokens(scene.get(f, "")) for f in self.fields}
+        band_keys = []
+        for f, words in toks.items():
+            sig = minhash(words)
+            if not sig:
+                continue
+            for band in range(self.bands):
+                band_keys.append((f, band, sig[band * self.rows:(band + 1) * self.rows]))
+        return toks, band_keys
+
+    def add(self, key, scene: dict, _prepared=None):
+        toks, band_keys = _prepared or self._prepare(scene)
+        self._tokens[key] = toks
+        for bk in band_keys:
+            self._buckets.setdefault(bk, []).append(key)
+
+    def query(self, scene: dict, _prepared=None) -> List[Tuple[object, float]]:
+        """Indexed scenes whose similarity (max over fields) is at least the threshold."""
+        toks, band_keys = _prepared or self._prepare(scene)
+        candidates = []
+        seen = set()
+        for bk in band_keys:
+            for key in self._buckets.get(bk, ()):
+                if key not in seen:
+                    seen.add(key)
+                    candidates.append(key)
+        matches = []
+        for key in candidates:
+            other = self._tokens[key]
+            sim = max(jaccard(toks[f], other[f]) for f in self.fields)
+            if sim >= self.threshold:
+                matches.append((key, sim))
+        return matches
+
+    def find_duplicates(self, scenes: List[dict]) -> List[Tuple[int, int, float]]:
+        """Duplicate pairs within ``scenes`` as (i, j, similarity), 1-based, i < j."""
+        pairs = []
+        for j, scene in enumerate(scenes, 1):
+            prepared = self._prepare(scene)
+            for i, sim in self.query(scene, prepared):
+                pairs.append((i, j, sim))
+            self.add(j, scene, prepared)
+        return sorted(pairs)
+
+
+class SceneHistory:
+    """
+    Prompts of the scenes a project generated before, stored as JSON.
+
+    Usage:
+        history = SceneHistory(os.path.join(dir_script, SceneHistory.FILE_NAME))
+        repeats = history.check(scenes)          # [(scene_no, "run 2 / scene 5", sim), ...]
+        history.record(scenes)
+    """
+
+    FILE_NAME = "scene_history.json"
+    MAX_SCENES = 1000
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+
+    def _load(self) -> List[dict]:
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+            return data if isinstance(data, list) else []
+        except (OSError, ValueError):
+            return []
+
+    def check(self, scenes: List[dict], threshold: float = 0.8) -> List[Tuple[int, str, float]]:
+        """New scenes that repeat an earlier one: (scene number, earlier label, similarity)."""
+        with self._lock:
+            past = self._load()
+        if not past:
+            return []
+        index = SceneSimilarityIndex(threshold)
+        for entry in past:
+            index.add(f"lần {entry.get('run', '?')} / cảnh {entry.get('scene', '?')}", entry)
+        repeats = []
+        for j, scene in enumerate(scenes, 1):
+            for label, sim in index.query(scene):
+                repeats.append((j, label, sim))
+        return repeats
+
+    def record(self, scenes: List[dict]):
+        """Append this script's scenes as a new run (oldest runs are dropped past MAX_SCENES)."""
+        with self._lock:
+            past = self._load()
+            run = max((e.get("run", 0) for e in past), default=0) + 1
+            past += [{"run": run, "scene": i, **{f: s.get(f, "") for f in FIELDS}}
+                     for i, s in enumerate(scenes, 1)]
+            past = past[-self.MAX_SCENES:]
+            try:
+                os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+                tmp = self.path + ".tmp"
+                with open(tmp, "w", encoding="utf-8") as f:
+                    json.dump(past, f, ensure_ascii=False)
+                os.replace(tmp, self.path)
+            except OSError:
+                pass
@@ -0,0 +1,182 @@
+# -*- coding: utf-8 -*-
+"""
+Upscale Pipeline - 4K upscaling as a per-clip background stage
+
+A clip is queued for upscaling as soon as it is downloaded, instead of after
+every video of the run has finished polling. Encodes are separate ffmpeg
+processes; the pool runs as many at once as the CPU cores allow for the thread
+budget each encode gets (``threads``), so a machine with 16 cores upscales four
+clips at a time with 4 encoder threads each rather than one clip with all 16.
+
+The encoder profile (encoder, preset, CRF, target width) comes from the optional
+"upscale" config section. ``encoder: "auto"`` uses a hardware H.264 encoder when
+ffmpeg has one and falls back to libx264 for any clip the hardware encode fails on.
+"""
+
+import os
+import subprocess
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, List, Optional
+
+# Hardware encoders tried by encoder="auto", in order of preference
+HW_ENCODERS = ("h264_nvenc", "h264_qsv", "h264_videotoolbox", "h264_amf")
+# Concurrent sessions for a hardware encoder (consumer GPUs allow only a few)
+HW_MAX_WORKERS = 2
+
+
+def _cfg() -> dict:
+    try:
+        from utils import config as cfg
+        return cfg.get_section("upscale")
+    except Exception:
+        return {}
+
+
+def _available_encoders() -> List[str]:
+    try:
+        out = subprocess.run(["ffmpeg", "-hide_banner", "-encoders"],
+                             capture_output=True, text=True, timeout=15).stdout
+    except Exception:
+        return []
+    names = []
+    for line in out.splitlines():
+        parts = line.split()
+        if len(parts) >= 2 and parts[0].startswith("V"):
+            names.append(parts[1])
+    return names
+
+
+def _probe_encoder_works(encoder: str) -> bool:
+    """Listed encoders can still lack a device/driver; encode one tiny frame to be sure."""
+    cmd = ["ffmpeg", "-v", "error", "-f", "lavfi", "-i", "color=black:s=256x144:d=0.1",
+           "-frames:v", "1", "-c:v", encoder, "-f", "null", "-"]
+    try:
+        return subprocess.run(cmd, capture_output=True, timeout=20).returncode == 0
+    except Exception:
+        return False
+
+
+class UpscalePipeline:
+    """
+    Usage:
+        upscaler = get_upscale_pipeline()
+        upscaler.submit(src, dst, on_done)
+
+    ``on_done(result)`` is called from a worker thread with
+    ``{"ok": bool, "path": dst, "error": str|None, "seconds": float, "encoder": str}``.
+    The output is written to a temporary file and renamed, so ``dst`` only
+    exists once the encode has completed.
+    """
+
+    def __init__(self, encoder: str = "libx264", preset: str = "fast", crf: int = 23,
+                 width: int = 3840, threads: int = 0, max_workers: int = 0):
+        cores = os.cpu_count() or 2
+        self.encoder = encoder if encoder != "auto" else self._pick_hw_encoder()
+        self.preset = preset
+        self.crf = int(crf)
+        self.width = int(width)
+        self.threads = int(threads) or min(4, cores)
+        workers = int(max_workers) or max(1, cores // self.threads)
+        if self.encoder in HW_ENCODERS:
+            workers = min(workers, HW_MAX_WORKERS)
+        self.max_workers = workers
+        self._pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="Upscale4K")
+
+    @staticmethod
+    def _pick_hw_encoder() -> str:
+        available = set(_available_encoders())
+        for name in HW_ENCODERS:
+            if name in available and _probe_encoder_works(name):
+                return name
+        return "libx264"
+
+    def describe(self) -> str:
+        """Short profile summary for logs."""
+        if self.encoder in HW_ENCODERS:
+            return f"{self.encoder}, q={self.crf}, {self.max_workers} encode song song"
+        return (f"{self.encoder} preset={self.preset} crf={self.crf}, "
+                f"{self.max_workers} encode × {self.threads} threads")
+
+    def command(self, src: str, dst: str, encoder: Optional[str] = None) -> List[str]:
+        encoder = encoder or self.encoder
+        cmd = ["ffmpeg", "-y", "-v", "error", "-i", src, "-vf", f"scale={self.width}:-2", "-c:v", encoder]
+        if encoder in ("libx264", "libx265"):
+            cmd += ["-preset", self.preset, "-crf", str(self.crf), "-threads", str(self.threads)]
+        elif encoder.endswith("_nvenc"):
+            cmd += ["-rc", "vbr", "-cq", str(self.crf), "-b:v", "0"]
+        elif encoder.endswith("_qsv"):
+            cmd += ["-global_quality", str(self.crf)]
+        elif encoder.endswith("_amf"):
+            cmd += ["-rc", "cqp", "-qp_i", str(self.crf), "-qp_p", str(self.crf)]
+        cmd += ["-c:a", "copy", "-movflags", "+faststart", dst]
+        return cmd
+
+    def submit(self, src: str, dst: str, on_done: Callable[[Dict[str, Any]], None]):
+        """Queue one clip; returns immediately."""
+        self._pool.submit(self._run, src, dst, on_done)
+
+    def _encode(self, src: str, dst: str, encoder: str):
+        tmp = dst + ".part.mp4"
+        try:
+            proc = subprocess.run(self.command(src, tmp, encoder), capture_output=True, text=True)
+            if proc.returncode != 0:
+                raise RuntimeError((proc.stderr or "").strip()[-300:] or f"ffmpeg exit {proc.returncode}")
+            os.replace(tmp, dst)
+        finally:
+            if os.path.exists(tmp):
+                try:
+                    os.remove(tmp)
+                except OSError:
+                    pass
+
+    def _run(self, src: str, dst: str, on_done):
+        result = {"ok": False, "path": dst, "error": None, "seconds": 0.0, "encoder": self.encoder}
+        start = time.perf_counter()
+        try:
+            try:
+                self._encode(src, dst, self.encoder)
+            except RuntimeError:
+                if self.encoder == "libx264":
+                    raise
+                # Hardware encoder rejected this clip (size, profile, busy device)
+                result["encoder"] = "libx264"
+                self._encode(src, dst, "libx264")
+            result["ok"] = True
+        except Exception as e:
+            result["error"] = str(e)
+        result["seconds"] = time.perf_counter() - start
+        try:
+            on_done(result)
+        except Exception:
+            pass
+
+
+# Global pipeline instance
+_global_upscaler: Optional[UpscalePipeline] = None
+_upscaler_lock = threading.Lock()
+
+
+def get_upscale_pipeline() -> UpscalePipeline:
+    """
+    Get the process-wide 4K upscale pipeline
+    Encoder profile and pool size come from the optional "upscale" config section
+
+    Returns:
+        UpscalePipeline instance
+    """
+    global _global_upscaler
+
+    with _upscaler_lock:
+        if _global_upscaler is None:
+            c = _cfg()
+            _global_upscaler = UpscalePipeline(
+                encoder=str(c.get("encoder", "libx264")),
+                preset=str(c.get("preset", "fast")),
+                crf=int(c.get("crf", 23)),
+                width=int(c.get("width", 3840)),
+                threads=int(c.get("threads", 0)),
+                max_workers=int(c.get("max_workers", 0)),
+            )
+        return _global_upscaler
@@ -1,22 +1,291 @@
-"""Shared video download logic"""
-import os, requests
+"""Shared video download logic
+
+Downloads stream into ``<dest>.part`` in large chunks and are renamed into place
+only once complete. A dropped connection resumes with an HTTP Range request, the
+result is checked against the server's length (and MD5 when the server sends
+one), and large files can be fetched as parallel ranged segments. A sidecar
+``<dest>.part.src`` records the URL and ETag/Last-Modified the part came from:
+a leftover part from another URL is discarded, and resumes send If-Range so a
+changed object is downloaded from scratch instead of being spliced. Chunk size and
+segmenting come from the optional "downloads" config section.
+"""
+import base64
+import glob
+import hashlib
+import json
+import os
+import re
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+
+from utils.performance import get_pooled_session
+
+
+class DownloadIncomplete(requests.RequestException):
+    """The body ended early or did not match the advertised length/checksum."""
+
+
+class SourceChanged(DownloadIncomplete):
+    """The object behind the URL changed since the part file was started."""
+
+
+def _cfg() -> dict:
+    try:
+        from utils import config as cfg
+        return cfg.get_section("downloads")
+    except Exception:
+        return {}
+
+
+def _total_from_headers(r) -> int:
+    """Full object size from Content-Range (206) or Content-Length (200); 0 if unknown."""
+    m = re.search(r"/(\d+)\s*$", r.headers.get("Content-Range", ""))
+    if m:
+        return int(m.group(1))
+    if r.status_code == 200:
+        try:
+            return int(r.headers.get("Content-Length") or 0)
+        except ValueError:
+            return 0
+    return 0
+
+
+def _validator_from_headers(r) -> str:
+    """Strong ETag, else Last-Modified: what If-Range compares against ("" if neither)."""
+    etag = r.headers.get("ETag", "")
+    if etag and not etag.startswith("W/"):
+        return etag
+    return r.headers.get("Last-Modified", "")
+
+
+def _md5_from_headers(r) -> str:
+    """Base64 MD5 of the whole object (GCS x-goog-hash or Content-MD5), if sent."""
+    if r.headers.get("Content-Encoding", "identity") != "identity":
+        return ""  # hash covers the encoded bytes, not what iter_content yields
+    for part in r.headers.get("x-goog-hash", "").split(","):
+        name, _, value = part.strip().partition("=")
+        if name == "md5" and value:
+            return value
+    return r.headers.get("Content-MD5", "") if r.status_code == 200 else ""
+
 
 class VideoDownloader:
-    def __init__(self, log_callback=None):
+    def __init__(self, log_callback=None, max_attempts=3, chunk_size=None,
+                 segment_threshold=None, segments=None):
+        c = _cfg()
         self.log = log_callback or print
+        self.max_attempts = max_attempts
+        self.chunk_size = chunk_size or int(c.get("chunk_kb", 1024)) * 1024
+        # Files at least this large are fetched as parallel ranged segments (0 = never)
+        self.segment_threshold = (segment_threshold if segment_threshold is not None
+                                  else int(float(c.get("segment_threshold_mb", 32)) * 1024 * 1024))
+        self.segments = max(1, segments or int(c.get("segments", 4)))
 
     def download(self, url: str, output_path: str, timeout=300) -> str:
+        """
+        Download ``url`` to ``output_path`` atomically.
+
+        Resumes a partial ``.part`` file with HTTP Range, verifies length/MD5, and
+        renames into place only when complete. Raises on failure.
+        """
         self.log(f"[Download] {os.path.basename(output_path)}")
-        with requests.get(url, stream=True, timeout=timeout, allow_redirects=True) as r:
-            r.raise_for_status()
-            total = int(r.headers.get('content-length', 0))
-            downloaded = 0
-            with open(output_path, 'wb') as f:
-                for chunk in r.iter_content(8192):
-                    if chunk:
-                        f.write(chunk)
-                        downloaded += len(chunk)
+        out_dir = os.path.dirname(output_path)
+        if out_dir:
+            os.makedirs(out_dir, exist_ok=True)
+        part_path = output_path + ".part"
+        info = {"total": 0, "md5": "", "validator": ""}
+        self._claim_part(url, part_path, info)
+        last_err = None
+        for attempt in range(1, self.max_attempts + 1):
+            try:
+                if attempt == 1 and self.segment_threshold and self.segments > 1:
+                    self._probe(url, part_path, timeout, info)
+                if (info["total"] >= self.segment_threshold > 0 and info.get("ranges")
+                        and self.segments > 1):
+                    self._fetch_segmented(url, part_path, info["total"], timeout, info)
+                else:
+                    self._fetch(url, part_path, timeout, info)
+                self._verify(part_path, info)
+                os.replace(part_path, output_path)
+                self._remove(part_path + ".src")
+                break
+            except requests.RequestException as e:
+                last_err = e
+                if isinstance(e, SourceChanged):
+                    self._discard_parts(part_path)
+                    info.update(total=0, md5="", validator="")
+                    self._save_source(url, part_path, info)
+                if attempt < self.max_attempts:
+                    self.log(f"[Download] Interrupted ({e}), resuming ({attempt}/{self.max_attempts})")
+                    time.sleep(attempt)
+        else:
+            raise last_err
         if not os.path.exists(output_path) or os.path.getsize(output_path) == 0:
             raise Exception("Download failed")
         self.log(f"[Download] ✓ Complete")
         return output_path
+
+    @staticmethod
+    def _remove(path: str):
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+
+    def _discard_parts(self, part_path: str):
+        """Delete ``part_path`` and its numbered segment files."""
+        for path in glob.glob(glob.escape(part_path) + "*"):
+            suffix = path[len(part_path):]
+            if suffix == "" or suffix.isdigit():
+                self._remove(path)
+
+    def _save_source(self, url: str, part_path: str, info):
+        try:
+            with open(part_path + ".src", "w", encoding="utf-8") as f:
+                json.dump({"url": url, "validator": info["validator"]}, f)
+        except OSError:
+            pass
+
+    def _claim_part(self, url: str, part_path: str, info):
+        """
+        Keep leftover part files only if they came from this URL; otherwise delete them.
+
+        The output name is reused across runs (e.g. scene/copy file names), so a part
+        with no sidecar or one recording another URL belongs to a different video.
+        """
+        try:
+            with open(part_path + ".src", "r", encoding="utf-8") as f:
+                src = json.load(f)
+        except (OSError, ValueError):
+            src = {}
+        if src.get("url") == url:
+            info["validator"] = src.get("validator", "")
+        else:
+            self._discard_parts(part_path)
+        self._save_source(url, part_path, info)
+
+    def _learn_validator(self, url: str, part_path: str, info, r):
+        """Record the object's validator; a different one than the part was started with means it changed."""
+        validator = _validator_from_headers(r)
+        if not validator or validator == info["validator"]:
+            return
+        if info["validator"]:
+            raise SourceChanged("object changed since the partial download started")
+        info["validator"] = validator
+        self._save_source(url, part_path, info)
+
+    def _range_headers(self, info, first_byte: int, last_byte: str = "") -> dict:
+        headers = {"Range": f"bytes={first_byte}-{last_byte}"}
+        if info["validator"]:
+            # Server sends the whole (new) object instead of a range of a changed one
+            headers["If-Range"] = info["validator"]
+        return headers
+
+    def _probe(self, url, part_path, timeout, info):
+        """Learn size, range support and MD5 with a one-byte ranged GET (signed URLs reject HEAD)."""
+        try:
+            with get_pooled_session("downloads").get(url, stream=True, timeout=timeout, allow_redirects=True,
+                                                     headers={"Range": "bytes=0-0"}) as r:
+                if r.status_code in (200, 206):
+                    info["total"] = _total_from_headers(r)
+                    info["md5"] = _md5_from_headers(r) or info["md5"]
+                    info["ranges"] = r.status_code == 206
+                    self._learn_validator(url, part_path, info, r)
+        except SourceChanged:
+            raise
+        except requests.RequestException:
+            pass  # fall back to a plain streamed download
+
+    def _fetch(self, url: str, part_path: str, timeout, info):
+        have = os.path.getsize(part_path) if os.path.exists(part_path) else 0
+        if have and info["total"] and have >= info["total"]:
+            return
+        headers = self._range_headers(info, have) if have else {}
+        with get_pooled_session("downloads").get(url, stream=True, timeout=timeout, allow_redirects=True, headers=headers) as r:
+            if r.status_code == 416:
+                # Range not satisfiable: the part is complete only if it is tied to this
+                # object (validator) and the server confirms its full size
+                total = _total_from_headers(r) or info["total"]
+                if total and have == total and info["validator"]:
+                    info["total"] = total
+                    return
+                self._discard_parts(part_path)
+                raise DownloadIncomplete(f"range {have}- not satisfiable (size {total or 'unknown'}), restarting")
+            r.raise_for_status()
+            if r.status_code == 200:
+                # Full body: a resumed part (if any) is replaced, so adopt this object's validator
+                info["validator"] = ""
+            self._learn_validator(url, part_path, info, r)
+            info["total"] = _total_from_headers(r) or info["total"]
+            info["md5"] = _md5_from_headers(r) or info["md5"]
+            # 206 continues the part file; a plain 200 means the server ignored Range
+            mode = 'ab' if have and r.status_code == 206 else 'wb'
+            with open(part_path, mode) as f:
+                for chunk in r.iter_content(self.chunk_size):
+                    if chunk:
+                        f.write(chunk)
+
+    def _fetch_segmented(self, url: str, part_path: str, total: int, timeout, info):
+        """Fetch ``total`` bytes as parallel ranged segments, then join them into ``part_path``."""
+        if os.path.exists(part_path) and os.path.getsize(part_path) == total:
+            return  # joined before an earlier verification failure/interruption
+        size = -(-total // self.segments)
+        ranges = [(start, min(total, start + size) - 1) for start in range(0, total, size)]
+        seg_paths = [f"{part_path}{idx}" for idx in range(len(ranges))]
+        self.log(f"[Download] {total // (1024 * 1024)} MB in {len(ranges)} segments")
+        with ThreadPoolExecutor(max_workers=len(ranges), thread_name_prefix="VideoSegment") as pool:
+            futures = [pool.submit(self._fetch_range, url, seg, start, end, timeout, info)
+                       for seg, (start, end) in zip(seg_paths, ranges)]
+            for fut in futures:
+                fut.result()  # re-raises the first segment error; finished segments are kept
+        with open(part_path, "wb") as out:
+            for seg in seg_paths:
+                with open(seg, "rb") as f:
+                    while True:
+                        block = f.read(self.chunk_size)
+                        if not block:
+                            break
+                        out.write(block)
+        for seg in seg_paths:
+            os.remove(seg)
+
+    def _fetch_range(self, url, seg_path, start, end, timeout, info):
+        want = end - start + 1
+        have = os.path.getsize(seg_path) if os.path.exists(seg_path) else 0
+        if have > want:
+            os.remove(seg_path)
+            have = 0
+        if have == want:
+            return
+        headers = self._range_headers(info, start + have, str(end))
+        with get_pooled_session("downloads").get(url, stream=True, timeout=timeout, allow_redirects=True, headers=headers) as r:
+            r.raise_for_status()
+            if r.status_code != 206:
+                if info["validator"]:
+                    raise SourceChanged(f"object changed (If-Range) while fetching segment {start}-{end}")
+                raise DownloadIncomplete(f"server ignored Range for segment {start}-{end}")
+            with open(seg_path, "ab") as f:
+                for chunk in r.iter_content(self.chunk_size):
+                    if chunk:
+                        f.write(chunk)
+        if os.path.getsize(seg_path) != want:
+            raise DownloadIncomplete(f"segment {start}-{end}: {os.path.getsize(seg_path)}/{want} bytes")
+
+    def _verify(self, part_path: str, info):
+        got = os.path.getsize(part_path) if os.path.exists(part_path) else 0
+        total = info["total"]
+        if total and got < total:
+            raise DownloadIncomplete(f"got {got}/{total} bytes")
+        if (total and got > total) or (info["md5"] and not self._md5_matches(part_path, info["md5"])):
+            # Corrupt part file (e.g. the object changed under a resume): start over
+            os.remove(part_path)
+            raise DownloadIncomplete("content does not match server length/checksum")
+
+    def _md5_matches(self, path: str, expected_b64: str) -> bool:
+        h = hashlib.md5()
+        with open(path, "rb") as f:
+            for block in iter(lambda: f.read(self.chunk_size), b""):
+                h.update(block)
+        return base64.b64encode(h.digest()).decode("ascii") == expected_b64
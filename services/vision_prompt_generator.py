@@ -2,13 +2,27 @@
 """
 Vision Prompt Generator Service
 Generate descriptive prompts from video frames using Gemini Vision API
+
+Frames are sent several per request (one JSON array of prompts back) and the
+requests run concurrently on a small pool. Every Google key is taken from the
+shared "google" key rotation registry, so per-key cooldowns and call spacing
+apply across vision, script and image requests.
+Prepared JPEG payloads are cached by frame content. Pool size and frames per
+request come from the optional "vision_prompts" config section.
 """
 
 import base64
+import hashlib
+import json
 import os
-from typing import List
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List
 import requests
 
+from services.core.key_manager import get_key_registry, outcome_for_error, outcome_for_status
+from utils.performance import SimpleCache, get_pooled_session
+
 try:
     from PIL import Image
     PIL_AVAILABLE = True
@@ -16,6 +30,20 @@ except ImportError:
     PIL_AVAILABLE = False
     Image = None
 
+_ENDPOINT = "https://generativelanguage.googleapis.com/v1beta/models/gemini-2.0-flash-exp:generateContent"
+
+# Base64 JPEG payloads by (frame sha256, max_size); shared by all generators
+_payload_cache = SimpleCache(max_size=256, default_ttl=0)
+_payload_lock = threading.Lock()
+
+
+def _cfg() -> dict:
+    try:
+        from utils import config as cfg
+        return cfg.get_section("vision_prompts")
+    except Exception:
+        return {}
+
 
 class VisionPromptGenerator:
     """Generate prompts from images using Gemini Vision API"""
@@ -41,6 +69,20 @@ class VisionPromptGenerator:
             except Exception as e:
                 self.log(f"[VisionPrompt] Warning: Could not load API key: {e}")
 
+        c = _cfg()
+        self.max_workers = max(1, int(c.get("max_workers", 4)))
+        self.frames_per_request = max(1, int(c.get("frames_per_request", 4)))
+        self._registry = get_key_registry('google')
+        self._keys: List[str] = []
+        if self.api_key:
+            keys = [self.api_key]
+            try:
+                from services.core.key_manager import get_all_keys
+                keys += [k for k in get_all_keys('google') if k != self.api_key]
+            except Exception:
+                pass
+            self._keys = list(dict.fromkeys(keys))
+
     def generate_scene_prompts(
         self, 
         scenes: List[dict], 
@@ -58,30 +100,59 @@ class VisionPromptGenerator:
         Returns:
             List of generated prompts (one per scene)
         """
-        prompts = []
-
+        prompts = [""] * len(scenes)
+        frames = []
         for i, scene in enumerate(scenes):
             frame_path = scene.get('frame_path')
             if not frame_path or not os.path.exists(frame_path):
                 self.log(f"[VisionPrompt] Warning: Frame {i} not found")
-                prompts.append("")
                 continue
+            frames.append((i, frame_path))
+        if not frames:
+            return prompts
+
+        size = self.frames_per_request
+        batches = [frames[k:k + size] for k in range(0, len(frames), size)]
+        workers = min(self.max_workers, len(batches))
+        self.log(f"[VisionPrompt] {len(frames)} frames in {len(batches)} requests ({workers} parallel)")
+
+        def run(batch):
+            return self._generate_batch(batch, language, style, len(scenes))
+
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="VisionPrompt") as pool:
+            for results in pool.map(run, batches):
+                for i, prompt in results.items():
+                    prompts[i] = prompt
+
+        return prompts
+
+    def _generate_batch(self, batch, language: str, style: str, total: int) -> Dict[int, str]:
+        """Prompts for one batch of (scene index, frame path); falls back to one request per frame."""
+        results: Dict[int, str] = {}
+        if len(batch) > 1:
+            try:
+                texts = self._generate_prompts_for_frames(
+                    [path for _, path in batch], language=language, style=style)
+                for (i, _), text in zip(batch, texts):
+                    results[i] = text
+                    self.log(f"[VisionPrompt] ✓ Generated prompt {i+1}/{total}")
+                return results
+            except Exception as e:
+                self.log(f"[VisionPrompt] Batch of {len(batch)} frames failed ({e}), retrying per frame")
 
+        for i, path in batch:
             try:
-                prompt = self._generate_prompt_for_frame(
-                    frame_path, 
+                results[i] = self._generate_prompt_for_frame(
+                    path,
                     language=language,
                     style=style,
                     scene_index=i
                 )
-                prompts.append(prompt)
-                self.log(f"[VisionPrompt] ✓ Generated prompt {i+1}/{len(scenes)}")
-
+                self.log(f"[VisionPrompt] ✓ Generated prompt {i+1}/{total}")
             except Exception as e:
                 self.log(f"[VisionPrompt] Error generating prompt for scene {i}: {e}")
-                prompts.append("")
-
-        return prompts
+                results[i] = ""
+        return results
 
     def _generate_prompt_for_frame(
         self, 
@@ -111,9 +182,6 @@ class VisionPromptGenerator:
         # Build system instruction based on language and style
         system_instruction = self._build_system_instruction(language, style)
 
-        # Call Gemini Vision API
-        endpoint = f"https://generativelanguage.googleapis.com/v1beta/models/gemini-2.0-flash-exp:generateContent?key={self.api_key}"
-
         payload = {
             "contents": [
                 {
@@ -137,24 +205,107 @@ class VisionPromptGenerator:
             }
         }
 
-        try:
-            response = requests.post(
-                endpoint,
-                json=payload,
-                timeout=30
+        return self._call_vision(payload).strip()
+
+    def _generate_prompts_for_frames(
+        self,
+        frame_paths: List[str],
+        language: str = "vi",
+        style: str = "Cinematic"
+    ) -> List[str]:
+        """
+        Generate prompts for several frames with a single request
+
+        Returns:
+            One prompt per frame, in order. Raises RuntimeError if the reply is not
+            a JSON array with one string per frame.
+        """
+        if not self.api_key:
+            raise RuntimeError("Google API key not configured")
+
+        parts = []
+        for n, path in enumerate(frame_paths, start=1):
+            parts.append({"text": f"Frame {n}:"})
+            parts.append({"inline_data": {"mime_type": "image/jpeg", "data": self._prepare_image(path)}})
+        parts.append({
+            "text": self._build_system_instruction(language, style).replace(
+                "Analyze this video frame and generate a detailed, descriptive prompt",
+                f"Analyze each of the {len(frame_paths)} video frames above and generate a detailed, "
+                f"descriptive prompt for each one,"
+            ).replace(
+                "Output only the prompt text, nothing else.",
+                f"Output only a JSON array of {len(frame_paths)} strings, one prompt per frame, in order."
             )
-            response.raise_for_status()
+        })
+
+        payload = {
+            "contents": [{"role": "user", "parts": parts}],
+            "generationConfig": {
+                "temperature": 0.7,
+                "maxOutputTokens": 200 * len(frame_paths),
+                "responseMimeType": "application/json"
+            }
+        }
+
+        text = self._call_vision(payload)
+        try:
+            prompts = json.loads(text)
+        except ValueError:
+            raise RuntimeError("Response is not a JSON array")
+        if (not isinstance(prompts, list) or len(prompts) != len(frame_paths)
+                or not all(isinstance(p, str) for p in prompts)):
+            raise RuntimeError(f"Expected {len(frame_paths)} prompts in response")
+        return [p.strip() for p in prompts]
+
+    def _call_vision(self, payload: dict) -> str:
+        """
+        POST a generateContent request with a key from the rotation manager
+
+        A 429 puts the key on the shared registry's backoff (2s, 4s, 8s, then a
+        60s cooldown) and the request is retried on the next available key.
+
+        Returns:
+            Text of the first candidate
+        """
+        registry = self._registry
+        attempts = len(self._keys) * (registry.max_backoffs + 2)
+        for _ in range(attempts):
+            usable = registry.valid(self._keys)
+            if not usable:
+                raise RuntimeError("Vision API request failed: all API keys are invalid (401/403)")
+            key = registry.acquire(usable)
+            if key is None:
+                break
+            try:
+                response = get_pooled_session("gemini").post(
+                    _ENDPOINT,
+                    params={"key": key},
+                    json=payload,
+                    timeout=30
+                )
+            except requests.RequestException as e:
+                registry.release(key, outcome_for_error(e))
+                raise RuntimeError(f"Vision API request failed: {e}")
+
+            outcome = outcome_for_status(response.status_code)
+            delay = registry.release(key, outcome)
+            if response.status_code == 429:
+                self.log(f"[VisionPrompt] Key ...{key[-6:]} rate limited, cooldown {delay:.0f}s")
+                continue
+            try:
+                response.raise_for_status()
+            except requests.RequestException as e:
+                raise RuntimeError(f"Vision API request failed: {e}")
 
             data = response.json()
             if 'candidates' in data and len(data['candidates']) > 0:
-                content = data['candidates'][0]['content']
+                content = data['candidates'][0].get('content', {})
                 if 'parts' in content and len(content['parts']) > 0:
-                    return content['parts'][0]['text'].strip()
+                    return content['parts'][0]['text']
 
             raise RuntimeError("No content in response")
 
-        except requests.RequestException as e:
-            raise RuntimeError(f"Vision API request failed: {e}")
+        raise RuntimeError("Vision API request failed: all API keys are rate-limited")
 
     def _prepare_image(self, image_path: str, max_size: int = 1024) -> str:
         """
@@ -167,6 +318,16 @@ class VisionPromptGenerator:
         Returns:
             Base64 encoded image data
         """
+        try:
+            with open(image_path, "rb") as f:
+                cache_key = f"{hashlib.sha256(f.read()).hexdigest()}:{max_size}"
+        except OSError as e:
+            raise RuntimeError(f"Image preparation failed: {e}")
+        with _payload_lock:
+            cached = _payload_cache.get(cache_key)
+        if cached is not None:
+            return cached
+
         if not PIL_AVAILABLE:
             raise RuntimeError(
                 "PIL/Pillow>=10.0.0 is required for image processing. "
@@ -176,6 +337,8 @@ class VisionPromptGenerator:
         try:
             # Open and resize image if needed
             img = Image.open(image_path)
+            # JPEG frames: let the decoder downscale by a power of two first
+            img.draft('RGB', (max_size, max_size))
 
             # Resize if too large
             if max(img.size) > max_size:
@@ -193,11 +356,14 @@ class VisionPromptGenerator:
             img.save(buffer, format='JPEG', quality=85)
             image_bytes = buffer.getvalue()
 
-            return base64.b64encode(image_bytes).decode('utf-8')
-
+            encoded = base64.b64encode(image_bytes).decode('utf-8')
         except Exception as e:
             raise RuntimeError(f"Image preparation failed: {e}")
 
+        with _payload_lock:
+            _payload_cache.set(cache_key, encoded)
+        return encoded
+
     def _build_system_instruction(self, language: str, style: str) -> str:
         """
         Build system instruction for prompt generation
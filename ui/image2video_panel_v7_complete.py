@@ -6,6 +6,7 @@ Image2Video V7 - Complete Implementation (Improved Layout)
 - Larger fonts for labels (15px, bold)
 - Right column 40% larger
 - Video thumbnails in result table
+- "Run all" runs several projects concurrently
 """
 
 from PyQt5.QtWidgets import (
@@ -13,10 +14,11 @@ from PyQt5.QtWidgets import (
     QListWidget, QPushButton, QLabel, QInputDialog,
     QMessageBox, QListWidgetItem, QStackedWidget
 )
-from PyQt5.QtCore import Qt, QTimer
+from PyQt5.QtCore import Qt
 from PyQt5.QtGui import QFont
 
 from ui.project_panel import ProjectPanel
+from ui.project_scheduler import ProjectRunScheduler
 from utils.config import load as load_cfg, save as save_cfg
 
 # === IMPROVED V7 STYLING - CONSISTENT ACROSS ALL PANELS ===
@@ -107,9 +109,14 @@ class Image2VideoPanelV7(QWidget):
         self.config = load_cfg()
         self.base_dir = self.config.get('download_root', 'D:/Tiktok/projects')
         self.project_panels = {}
-        self.run_all_queue = []
         self.is_running_all = False
 
+        self.scheduler = ProjectRunScheduler(panel_for=self._get_panel, parent=self)
+        self.scheduler.status_changed.connect(self._update_info)
+        self.scheduler.project_started.connect(lambda name: self._mark(name, "⏳"))
+        self.scheduler.project_finished.connect(lambda name, ok: self._mark(name, "✅" if ok else "⚠️"))
+        self.scheduler.all_finished.connect(self._all_done)
+
         self._build_ui()
         self._load_initial_projects()
 
@@ -180,7 +187,7 @@ class Image2VideoPanelV7(QWidget):
         left_layout.addWidget(self.project_list)
 
         # Compact run all button
-        self.btn_run_all = QPushButton("🔥 CHẠY TẤT CẢ\n(TUẦN TỰ)")
+        self.btn_run_all = QPushButton("🔥 CHẠY TẤT CẢ\n(SONG SONG)")
         self.btn_run_all.setMinimumHeight(50)
         self.btn_run_all.setCursor(Qt.PointingHandCursor)
         self.btn_run_all.setStyleSheet(BUTTON_WARNING)
@@ -299,27 +306,37 @@ class Image2VideoPanelV7(QWidget):
             return
 
         name = current.data(Qt.UserRole)
+        self.stacked.setCurrentWidget(self._get_panel(name))
 
+    def _get_panel(self, name):
+        """Get or create a project's panel"""
         if name in self.project_panels:
-            panel = self.project_panels[name]
-        else:
-            panel = ProjectPanel(
-                project_name=name,
-                base_dir=self.base_dir,
-                settings_provider=lambda: load_cfg(),
-                parent=self
-            )
+            return self.project_panels[name]
+
+        panel = ProjectPanel(
+            project_name=name,
+            base_dir=self.base_dir,
+            settings_provider=lambda: load_cfg(),
+            parent=self
+        )
 
-            # Apply enhanced styling to ProjectPanel labels
-            self._enhance_project_panel_styling(panel)
+        # Apply enhanced styling to ProjectPanel labels
+        self._enhance_project_panel_styling(panel)
 
-            panel.project_completed.connect(self._on_project_completed)
-            panel.run_all_requested.connect(self._run_all_projects)
+        panel.project_completed.connect(self._on_project_completed)
+        panel.run_all_requested.connect(self._run_all_projects)
 
-            self.stacked.addWidget(panel)
-            self.project_panels[name] = panel
+        self.stacked.addWidget(panel)
+        self.project_panels[name] = panel
+        return panel
 
-        self.stacked.setCurrentWidget(panel)
+    def _mark(self, name, mark):
+        """Show run state in the project list"""
+        for i in range(self.project_list.count()):
+            item = self.project_list.item(i)
+            if item.data(Qt.UserRole) == name:
+                item.setText(f"{mark} {name}")
+                break
 
     def _enhance_project_panel_styling(self, panel):
         """Enhance ProjectPanel with larger, bold labels"""
@@ -338,7 +355,9 @@ class Image2VideoPanelV7(QWidget):
                 label.setStyleSheet("font-weight: 700;")
 
     def _run_all_projects(self):
-        """Run all projects"""
+        """Run all projects concurrently"""
+        if self.scheduler.is_running:
+            return
         count = self.project_list.count()
         if count == 0:
             QMessageBox.warning(self, "Không có dự án", "Chưa có dự án!")
@@ -346,16 +365,18 @@ class Image2VideoPanelV7(QWidget):
 
         reply = QMessageBox.question(
             self, "Xác nhận",
-            f"Chạy {count} dự án?\n⚠️ Có thể mất nhiều thời gian.",
+            f"Chạy song song {count} dự án?\n⚠️ Có thể mất nhiều thời gian.",
             QMessageBox.Yes | QMessageBox.No, QMessageBox.No
         )
         if reply != QMessageBox.Yes:
             return
 
-        self.run_all_queue = [
+        names = [
             self.project_list.item(i).data(Qt.UserRole)
             for i in range(count)
         ]
+        for name in names:
+            self._mark(name, "📋")
 
         self.is_running_all = True
         self.btn_run_all.setEnabled(False)
@@ -363,41 +384,23 @@ class Image2VideoPanelV7(QWidget):
         self.btn_delete.setEnabled(False)
 
         self._update_info(f"Đang chạy: 0/{count}")
-        self._run_next()
-
-    def _run_next(self):
-        """Run next project"""
-        if not self.run_all_queue:
-            self._all_done()
-            return
-
-        name = self.run_all_queue.pop(0)
-        total = self.project_list.count()
-        current = total - len(self.run_all_queue)
-
-        self._update_info(f"Đang chạy: {name} ({current}/{total})")
-
-        for i in range(self.project_list.count()):
-            if self.project_list.item(i).data(Qt.UserRole) == name:
-                self.project_list.setCurrentRow(i)
-                if name in self.project_panels:
-                    QTimer.singleShot(500, self.project_panels[name]._run_seq)
-                break
+        self.scheduler.start(names)
 
     def _on_project_completed(self, name):
-        """Handle completion"""
+        """Handle completion (the scheduler starts the next projects)"""
         print(f"✅ Project '{name}' completed!")
-        if self.is_running_all:
-            QTimer.singleShot(2000, self._run_next)
 
-    def _all_done(self):
+    def _all_done(self, completed=0, skipped=0):
         """All done"""
         self.is_running_all = False
         self.btn_run_all.setEnabled(True)
         self.btn_add.setEnabled(True)
         self.btn_delete.setEnabled(True)
         self._update_info()
-        QMessageBox.information(self, "Hoàn tất", "✅ Xong tất cả!")
+        msg = "✅ Xong tất cả!"
+        if skipped:
+            msg += f"\n⚠️ Bỏ qua {skipped} dự án không có cảnh."
+        QMessageBox.information(self, "Hoàn tất", msg)
 
     def _save_projects(self):
         """Save projects"""
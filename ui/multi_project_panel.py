@@ -4,7 +4,7 @@ Multi-Project Manager V5 - Beautiful GUI + Original Logic
 Combines:
 - Modern V5 styling (rounded buttons, blue theme)
 - Original ProjectPanel logic (100% working)
-- Multi-project management (add, delete, run all)
+- Multi-project management (add, delete, run all concurrently)
 """
 
 from PyQt5.QtWidgets import (
@@ -12,10 +12,11 @@ from PyQt5.QtWidgets import (
     QListWidget, QPushButton, QLabel, QInputDialog,
     QMessageBox, QListWidgetItem, QStackedWidget
 )
-from PyQt5.QtCore import Qt, QTimer
+from PyQt5.QtCore import Qt
 from PyQt5.QtGui import QFont
 
 from ui.project_panel import ProjectPanel
+from ui.project_scheduler import ProjectRunScheduler
 from utils.config import load as load_cfg, save as save_cfg
 
 class MultiProjectPanel(QWidget):
@@ -28,9 +29,16 @@ class MultiProjectPanel(QWidget):
         self.config = load_cfg()
         self.base_dir = self.config.get('download_root', 'D:/Tiktok/projects')
         self.project_panels = {}  # name -> ProjectPanel
-        self.run_all_queue = []
         self.is_running_all = False
 
+        # Runs several projects at once for "run all"
+        self.scheduler = ProjectRunScheduler(panel_for=self._get_or_create_panel, parent=self)
+        self.scheduler.status_changed.connect(self._update_info_label)
+        self.scheduler.project_started.connect(lambda name: self._set_project_mark(name, "⏳"))
+        self.scheduler.project_finished.connect(
+            lambda name, ok: self._set_project_mark(name, "✅" if ok else "⚠️"))
+        self.scheduler.all_finished.connect(self._on_all_projects_completed)
+
         self._build_ui()
         self._load_initial_projects()
 
@@ -126,7 +134,7 @@ class MultiProjectPanel(QWidget):
         left_layout.addWidget(self.project_list)
 
         # Run all button - V5 Big Rounded Button
-        self.btn_run_all = QPushButton("🔥 CHẠY TOÀN BỘ CÁC DỰ ÁN\n(THEO THỨ TỰ)")
+        self.btn_run_all = QPushButton("🔥 CHẠY TOÀN BỘ CÁC DỰ ÁN\n(SONG SONG)")
         self.btn_run_all.setMinimumHeight(60)
         self.btn_run_all.setCursor(Qt.PointingHandCursor)
         self.btn_run_all.setStyleSheet("""
@@ -294,32 +302,46 @@ class MultiProjectPanel(QWidget):
             return
 
         project_name = current.data(Qt.UserRole)
+        panel = self._get_or_create_panel(project_name)
+
+        # Show panel
+        self.stacked_widget.setCurrentWidget(panel)
 
+    def _get_or_create_panel(self, project_name):
+        """Return the ProjectPanel of a project, creating it on first use"""
         # Check if panel already exists
         if project_name in self.project_panels:
-            panel = self.project_panels[project_name]
-        else:
-            # Create new ProjectPanel
-            panel = ProjectPanel(
-                project_name=project_name,
-                base_dir=self.base_dir,
-                settings_provider=lambda: load_cfg(),
-                parent=self
-            )
-
-            # Connect signals
-            panel.project_completed.connect(self._on_project_completed)
-            panel.run_all_requested.connect(self._run_all_projects)
-
-            # Add to stack
-            self.stacked_widget.addWidget(panel)
-            self.project_panels[project_name] = panel
+            return self.project_panels[project_name]
+
+        # Create new ProjectPanel
+        panel = ProjectPanel(
+            project_name=project_name,
+            base_dir=self.base_dir,
+            settings_provider=lambda: load_cfg(),
+            parent=self
+        )
 
-        # Show panel
-        self.stacked_widget.setCurrentWidget(panel)
+        # Connect signals
+        panel.project_completed.connect(self._on_project_completed)
+        panel.run_all_requested.connect(self._run_all_projects)
+
+        # Add to stack
+        self.stacked_widget.addWidget(panel)
+        self.project_panels[project_name] = panel
+        return panel
+
+    def _set_project_mark(self, project_name, mark):
+        """Show a run-state mark in front of a project in the list"""
+        for i in range(self.project_list.count()):
+            item = self.project_list.item(i)
+            if item.data(Qt.UserRole) == project_name:
+                item.setText(f"{mark} {project_name}")
+                break
 
     def _run_all_projects(self):
-        """Run all projects sequentially"""
+        """Run all projects concurrently (see ProjectRunScheduler)"""
+        if self.scheduler.is_running:
+            return
         count = self.project_list.count()
 
         if count == 0:
@@ -330,7 +352,7 @@ class MultiProjectPanel(QWidget):
         reply = QMessageBox.question(
             self,
             "Xác nhận chạy tất cả",
-            f"Bạn có chắc muốn chạy {count} dự án theo thứ tự?\n\n"
+            f"Bạn có chắc muốn chạy {count} dự án (song song)?\n\n"
             "⚠️ Quá trình này có thể mất nhiều thời gian.",
             QMessageBox.Yes | QMessageBox.No,
             QMessageBox.No
@@ -339,12 +361,12 @@ class MultiProjectPanel(QWidget):
         if reply != QMessageBox.Yes:
             return
 
-        # Build queue
-        self.run_all_queue = []
+        names = []
         for i in range(count):
             item = self.project_list.item(i)
             project_name = item.data(Qt.UserRole)
-            self.run_all_queue.append(project_name)
+            item.setText(f"📋 {project_name}")
+            names.append(project_name)
 
         # Start
         self.is_running_all = True
@@ -352,50 +374,14 @@ class MultiProjectPanel(QWidget):
         self.btn_add.setEnabled(False)
         self.btn_delete.setEnabled(False)
 
-        self._update_info_label(f"Đang chạy tuần tự: 0/{count}")
-
-        # Run first project
-        self._run_next_in_queue()
-
-    def _run_next_in_queue(self):
-        """Run next project in queue"""
-        if not self.run_all_queue:
-            # Done
-            self._on_all_projects_completed()
-            return
-
-        # Get next project
-        project_name = self.run_all_queue.pop(0)
-        remaining = len(self.run_all_queue)
-        total = self.project_list.count()
-        current_index = total - remaining - 1
-
-        self._update_info_label(f"Đang chạy: {project_name} ({current_index + 1}/{total})")
-
-        # Select and run
-        for i in range(self.project_list.count()):
-            item = self.project_list.item(i)
-            if item.data(Qt.UserRole) == project_name:
-                self.project_list.setCurrentRow(i)
-
-                # Get or create panel
-                if project_name in self.project_panels:
-                    panel = self.project_panels[project_name]
-
-                    # Trigger run
-                    QTimer.singleShot(500, panel._run_seq)
-
-                break
+        self._update_info_label(f"Đang chạy song song: 0/{count}")
+        self.scheduler.start(names)
 
     def _on_project_completed(self, project_name):
-        """Handle single project completion"""
+        """Handle single project completion (the scheduler starts the next ones)"""
         print(f"✅ Project '{project_name}' completed!")
 
-        # If running all, continue to next
-        if self.is_running_all:
-            QTimer.singleShot(2000, self._run_next_in_queue)
-
-    def _on_all_projects_completed(self):
+    def _on_all_projects_completed(self, completed=0, skipped=0):
         """Handle all projects completion"""
         self.is_running_all = False
         self.btn_run_all.setEnabled(True)
@@ -404,11 +390,10 @@ class MultiProjectPanel(QWidget):
 
         self._update_info_label()
 
-        QMessageBox.information(
-            self,
-            "Hoàn tất",
-            "✅ Đã chạy xong tất cả các dự án!"
-        )
+        message = "✅ Đã chạy xong tất cả các dự án!"
+        if skipped:
+            message += f"\n\n⚠️ Bỏ qua {skipped} dự án không có cảnh để chạy."
+        QMessageBox.information(self, "Hoàn tất", message)
 
     def _save_projects(self):
         """Save project list to config"""
@@ -4,7 +4,6 @@ import json
 import os
 import re
 import shutil
-import time
 import webbrowser
 
 from PyQt5.QtCore import QByteArray, QObject, Qt, QThread, QTimer, pyqtSignal
@@ -150,7 +149,6 @@ class SeqWorker(QObject):
             except Exception as e:
                 self.log.emit("ERR", f"Start thất bại: {e}")
             self.row_update.emit(i,j); done+=1; self.progress.emit(int(done*100/total), f"Đã gửi {done}/{len(self.jobs)} cảnh")
-            time.sleep(1.2)
         self.progress.emit(100, "Hoàn tất gửi tuần tự"); self.finished.emit(1)
 
 class CheckWorker(QObject):
@@ -306,12 +304,7 @@ class DownloadWorker(QObject):
                 base = f"{safe_name(self.project_name)}_canh_{j.get('scene_id','')}_video_{i}"
                 dest=os.path.join(self.outdir, f"{base}.mp4")
                 try:
-                    if self.video_downloader:
-                        self.video_downloader.download(u, dest)
-                    else:
-                        import requests
-                        with requests.get(u, stream=True, timeout=300, allow_redirects=True) as r:
-                            r.raise_for_status(); open(dest,"wb").write(r.content)
+                    (self.video_downloader or VideoDownloader(log_callback=lambda msg: None)).download(u, dest)
                     j["downloaded_idx"].add(i); j.setdefault("local_paths",[]).append(dest); j["status"]="DOWNLOADED"; ok+=1
                     # nếu đủ số lượng video mong đợi -> set thời gian hoàn thành
                     if len(j["downloaded_idx"]) >= min(self.expected_copies, len(vids)):
@@ -325,6 +318,7 @@ class DownloadWorker(QObject):
 
 class ProjectPanel(QWidget):
     project_completed = pyqtSignal(str)  # emit project_name when all videos downloaded
+    submission_finished = pyqtSignal(str)  # emit project_name when every scene has been sent
     run_all_requested = pyqtSignal()
     def __init__(self, project_name:str, base_dir:str, settings_provider=None, parent=None):
         super().__init__(parent)
@@ -445,7 +439,7 @@ class ProjectPanel(QWidget):
         hb_run.addWidget(self.btn_stop)
         lv.addLayout(hb_run)
 
-        self.btn_run_all=QPushButton("⚡ CHẠY TOÀN BỘ CÁC DỰ ÁN (THEO THỨ TỰ)")
+        self.btn_run_all=QPushButton("⚡ CHẠY TOÀN BỘ CÁC DỰ ÁN (SONG SONG)")
         self.btn_run_all.setMinimumHeight(32)
         self.btn_run_all.setMaximumHeight(32)
         self.btn_run_all.setObjectName('btn_warning')  # Orange color
@@ -643,7 +637,24 @@ class ProjectPanel(QWidget):
             self.client = LabsFlowClient(toks, on_event=self._on_event)
         return True
 
+    def remaining_work(self):
+        """Videos this project still has to produce (scenes × copies before a run)."""
+        copies = int(self.sp_copies.value())
+        if self.jobs:
+            return sum(max(0, copies - len(j.get("downloaded_idx", set()))) for j in self.jobs)
+        scenes = self.scenes
+        if not scenes and self.ed_json.toPlainText().strip():
+            try:
+                scenes = parse_prompt_any(json.loads(self.ed_json.toPlainText()))
+            except Exception:
+                scenes = []
+        return len(scenes or []) * copies
+
+    def downloaded_count(self):
+        return sum(len(j.get("downloaded_idx", set())) for j in self.jobs)
+
     def _run_seq(self):
+        """Start sending every scene; returns True if a worker was started."""
         try:
             # PR#5: Refresh tokens only when generation starts (not on tab show)
             self.refresh_tokens()
@@ -655,10 +666,10 @@ class ProjectPanel(QWidget):
                 except Exception:
                     pass
             n=self._prepare_jobs()
-            if n<=0: return
+            if n<=0: return False
             cfg = self._settings()
             model=self.cb_model.currentText(); aspect=self.cb_aspect.currentText(); copies=int(self.sp_copies.value()); pid=cfg.get("default_project_id") or DEFAULT_PROJECT_ID
-            if self._seq_running: self.console.warn("Đang chạy tuần tự, vui lòng chờ…"); return
+            if self._seq_running: self.console.warn("Đang chạy tuần tự, vui lòng chờ…"); return False
             self._seq_running=True
 
             # Get account manager to check for multi-account support
@@ -681,7 +692,10 @@ class ProjectPanel(QWidget):
                 self._w.moveToThread(self._t)
             else:
                 # Fallback to sequential worker with single account
-                if not self._ensure_client(): return
+                if not self._ensure_client():
+                    QApplication.restoreOverrideCursor(); self.btn_run.setEnabled(True); self.btn_run.setText("BẮT ĐẦU TẠO VIDEO")
+                    self.btn_stop.setEnabled(False); self._seq_running=False
+                    return False
                 self.console.info(f"Bắt đầu gửi tuần tự {n} cảnh; copies={copies}.")
                 self._t=QThread(self)
                 self._w=SeqWorker(self.client,self.jobs,model,aspect,copies,pid)
@@ -703,16 +717,19 @@ class ProjectPanel(QWidget):
                 if not self._timer:
                     self._timer=QTimer(self); self._timer.setInterval(10000); self._timer.timeout.connect(self._check)
                 self._timer.start()
+                self.submission_finished.emit(self.project_name)
             # FIXED: Add missing .start()
             self._w.finished.connect(on_finish)
             self._w.finished.connect(self._t.quit)
             self._w.finished.connect(self._w.deleteLater)
             self._t.finished.connect(self._t.deleteLater)
             self._t.start()
+            return True
         except Exception as e:
             self.console.err(f"Lỗi khởi chạy: {e}")
             try: QApplication.restoreOverrideCursor(); self.btn_run.setEnabled(True); self.btn_run.setText("BẮT ĐẦU TẠO VIDEO"); self._seq_running=False
             except Exception: pass
+            return False
 
     def _on_prog(self, v, t): self.pb.setValue(v); self.pb_text.setText(t)
 
@@ -0,0 +1,166 @@
+# ui/project_scheduler.py
+"""
+Project Run Scheduler - Runs several ProjectPanels at once for "Run all projects"
+
+A project goes through two phases: submission (its SeqWorker/ParallelSeqWorker
+sends every scene, one request per account at a time) and waiting (the panel
+checks and downloads until all videos are in). Only the submission phase loads
+the accounts, so the number of projects submitting at the same time is capped
+at ``submission.per_account_concurrency``; projects that are only waiting just
+count towards ``project_scheduler.max_parallel_projects``. Queued projects start
+smallest remaining work first, so short projects finish early and slots are
+never blocked behind one slow scene.
+"""
+
+import time
+
+from PyQt5.QtCore import QObject, QTimer, pyqtSignal
+
+from utils import config as cfg
+
+
+class ProjectRunScheduler(QObject):
+    """
+    Usage:
+        sched = ProjectRunScheduler(panel_for=self._get_or_create_panel, parent=self)
+        sched.status_changed.connect(self._update_info_label)
+        sched.all_finished.connect(self._on_all_projects_completed)
+        sched.start(project_names)
+
+    ``panel_for(name)`` returns the ProjectPanel of a project (creating it if needed).
+    """
+
+    project_started = pyqtSignal(str)
+    project_finished = pyqtSignal(str, bool)  # name, completed (False = could not start)
+    status_changed = pyqtSignal(str)          # aggregate progress/throughput text
+    all_finished = pyqtSignal(int, int)       # completed, skipped
+
+    def __init__(self, panel_for, parent=None):
+        super().__init__(parent)
+        self.panel_for = panel_for
+        self.queue = []           # (order, name) not started yet
+        self.active = {}          # name -> panel
+        self.submitting = set()   # names still in the submission phase
+        self.completed = []
+        self.skipped = []
+        self._connected = set()
+        self._started_at = 0.0
+        self._baseline = {}       # name -> videos already downloaded when started
+        self._pump_scheduled = False
+        self._status_timer = QTimer(self)
+        self._status_timer.setInterval(5000)
+        self._status_timer.timeout.connect(self._emit_status)
+
+    @property
+    def is_running(self) -> bool:
+        return bool(self.queue or self.active)
+
+    @staticmethod
+    def _limits():
+        c = cfg.get_section("project_scheduler")
+        max_active = max(1, int(c.get("max_parallel_projects", 3)))
+        max_submitting = max(1, cfg.get_int("submission.per_account_concurrency", 2))
+        return max_active, min(max_active, max_submitting)
+
+    def start(self, names):
+        if self.is_running:
+            return
+        self.queue = list(enumerate(names))
+        self.active.clear()
+        self.submitting.clear()
+        self.completed = []
+        self.skipped = []
+        self._baseline = {}
+        self._started_at = time.monotonic()
+        self._status_timer.start()
+        self._pump()
+
+    def _schedule_pump(self):
+        if not self._pump_scheduled:
+            self._pump_scheduled = True
+            QTimer.singleShot(0, self._pump)
+
+    def _pump(self):
+        self._pump_scheduled = False
+        max_active, max_submitting = self._limits()
+        while self.queue and len(self.active) < max_active and len(self.submitting) < max_submitting:
+            order, name = min(self.queue, key=self._priority)
+            self.queue.remove((order, name))
+            self._start_project(name)
+        self._emit_status()
+        if not self.is_running:
+            self._status_timer.stop()
+            self.all_finished.emit(len(self.completed), len(self.skipped))
+
+    def _priority(self, entry):
+        order, name = entry
+        try:
+            work = self.panel_for(name).remaining_work()
+        except Exception:
+            work = 0
+        return (work, order)
+
+    def _start_project(self, name):
+        try:
+            panel = self.panel_for(name)
+        except Exception as e:
+            print(f"[WARN] Không thể mở dự án '{name}': {e}")
+            panel = None
+        if panel is None:
+            self._skip(name)
+            return
+
+        if id(panel) not in self._connected:
+            panel.submission_finished.connect(self._on_submission_finished)
+            panel.project_completed.connect(self._on_project_completed)
+            self._connected.add(id(panel))
+
+        self.active[name] = panel
+        self.submitting.add(name)
+        self._baseline[name] = panel.downloaded_count()
+        if not panel._run_seq():
+            self.active.pop(name, None)
+            self.submitting.discard(name)
+            self._skip(name)
+            return
+        self.project_started.emit(name)
+
+    def _skip(self, name):
+        print(f"[WARN] Bỏ qua dự án '{name}': không có cảnh nào để chạy")
+        self.skipped.append(name)
+        self.project_finished.emit(name, False)
+
+    def _on_submission_finished(self, name):
+        if name in self.submitting:
+            self.submitting.discard(name)
+            self._schedule_pump()
+
+    def _on_project_completed(self, name):
+        if name not in self.active:
+            return
+        self.active.pop(name)
+        self.submitting.discard(name)
+        self.completed.append(name)
+        self.project_finished.emit(name, True)
+        self._schedule_pump()
+
+    def _videos_done(self):
+        done = 0
+        for name in self.completed + list(self.active):
+            try:
+                done += self.panel_for(name).downloaded_count() - self._baseline.get(name, 0)
+            except Exception:
+                pass
+        return max(0, done)
+
+    def _emit_status(self):
+        if not self._started_at:
+            return
+        total = len(self.completed) + len(self.skipped) + len(self.active) + len(self.queue)
+        minutes = max((time.monotonic() - self._started_at) / 60.0, 1e-6)
+        videos = self._videos_done()
+        self.status_changed.emit(
+            f"Đang chạy {len(self.active)} dự án ({len(self.submitting)} đang gửi) · "
+            f"Chờ {len(self.queue)} · Xong {len(self.completed)}/{total}\n"
+            f"🎬 {videos} video · {videos / minutes:.1f} video/phút"
+        )
@@ -1,16 +1,21 @@
 
 import json
 import os
+import queue
 import re
 import shutil
-import subprocess
-import datetime
 import time
+import datetime
 from xml.sax.saxutils import escape as xml_escape
 
 from PyQt5.QtCore import QObject, pyqtSignal
 
 from services.google.labs_flow_client import DEFAULT_PROJECT_ID, LabsFlowClient
+from services.google.operation_poller import get_operation_poller
+from services.media_probe import get_media_probe
+from services.utils.download_pipeline import get_download_pipeline
+from services.utils.job_journal import get_job_journal
+from services.utils.upscale_pipeline import get_upscale_pipeline
 from services.utils.video_downloader import VideoDownloader
 from services.account_manager import get_account_manager
 from utils import config as cfg
@@ -755,6 +760,7 @@ class _Worker(QObject):
     job_card = pyqtSignal(dict)
     job_finished = pyqtSignal()
     progress_update = pyqtSignal(str, int)  # NEW signal: (message, percent)
+    scene_ready = pyqtSignal(int, dict)     # scene index (1-based), scene streamed from the LLM
 
     def __init__(self, task, payload):
         super().__init__()
@@ -869,7 +875,9 @@ class _Worker(QObject):
             domain=p.get("domain"),
             topic=p.get("topic"),
             voice_config=voice_config,
-            progress_callback=on_progress  # NEW: Pass progress callback
+            progress_callback=on_progress,  # NEW: Pass progress callback
+            use_cache=p.get("use_cache", False),  # Only the "reuse last script" option reads the cache
+            scene_callback=self.scene_ready.emit
         )
         
         # Issue #33: Generate base seed for video generation consistency (character)
@@ -926,6 +934,19 @@ class _Worker(QObject):
         except Exception as e:
             self.log.emit(f"[WARN] Lưu kịch bản thất bại: {e}")
 
+        # Check against scenes this project generated in earlier runs, then remember these
+        try:
+            from services.utils.scene_similarity import SceneHistory
+            history = SceneHistory(os.path.join(dir_script, SceneHistory.FILE_NAME))
+            repeats = history.check(data.get("scenes", []))
+            if repeats:
+                msg = ", ".join(f"Cảnh {j} ≈ {label} ({sim*100:.0f}%)" for j, label, sim in repeats[:10])
+                self.log.emit(f"[WARN] Cảnh trùng với kịch bản trước của dự án: {msg}")
+                data["history_repeat_warning"] = msg
+            history.record(data.get("scenes", []))
+        except Exception as e:
+            self.log.emit(f"[WARN] Không kiểm tra được lịch sử cảnh: {e}")
+
         ctx = {"title": title, "prj_dir": prj_dir, "dir_script": dir_script, "dir_prompts": dir_prompts, "dir_videos": dir_videos, "scenes": data.get("scenes",[])}
         # Issue #33: Pass base_seed in context
         ctx["base_seed"] = base_seed
@@ -934,22 +955,13 @@ class _Worker(QObject):
         self.log.emit("[INFO] Hoàn tất sinh kịch bản & lưu file.")
         self.story_done.emit(data, ctx)
 
-    def _download(self, url, dst_path):
-        try:
-            self.video_downloader.download(url, dst_path)
-            return True
-        except Exception as e:
-            self.log.emit(f"[ERR] Download fail: {e}")
-            return False
-
     def _make_thumb(self, video_path, out_dir, scene, copy):
         try:
             os.makedirs(out_dir, exist_ok=True)
             thumb = os.path.join(out_dir, f"thumb_c{scene}_v{copy}.jpg")
             if shutil.which("ffmpeg"):
-                cmd=["ffmpeg","-y","-ss","00:00:00","-i",video_path,"-frames:v","1","-q:v","3",thumb]
-                subprocess.run(cmd, check=True)
-                return thumb
+                # Shared probe service: one ffmpeg per file, cached by content
+                return get_media_probe().analyze(video_path, thumb_path=thumb, with_metadata=False)["thumb"]
         except Exception as e:
             self.log.emit(f"[WARN] Tạo thumbnail lỗi: {e}")
         return ""
@@ -982,6 +994,8 @@ class _Worker(QObject):
         thumbs_dir = os.path.join(dir_videos, "thumbs")
 
         jobs = []
+        restored = []  # copies already downloaded by an interrupted earlier run
+        journal = get_job_journal(dir_videos)
         # Cache for LabsClient instances by project_id to avoid redundant creation
         client_cache = {}
 
@@ -989,6 +1003,12 @@ class _Worker(QObject):
         def on_labs_event(event):
             self._handle_labs_event(event, self.log.emit)
 
+        def client_for(entry):
+            pid = entry.get("project_id") or project_id
+            if pid not in client_cache:
+                client_cache[pid] = LabsClient(tokens, on_event=on_labs_event)
+            return client_cache[pid]
+
         # PR#5: Batch generation - make one call per scene with copies parameter (not N calls)
         for scene_idx, scene in enumerate(p["scenes"], start=1):
             # Use actual_scene_num if provided (for retry), otherwise use scene_idx
@@ -996,6 +1016,12 @@ class _Worker(QObject):
             ratio = scene["aspect"]
             model_key = p.get("model_key","")
 
+            # Reattach to operations an interrupted run already paid for
+            plan = journal.resume_plan(actual_scene_num, scene["prompt"], copies) if journal else []
+            if plan:
+                self._resume_scene(plan, scene, client_for, dir_videos, thumbs_dir, jobs, restored)
+                continue
+
             # Create or reuse client for this project_id
             if project_id not in client_cache:
                 client_cache[project_id] = LabsClient(tokens, on_event=on_labs_event)
@@ -1005,6 +1031,8 @@ class _Worker(QObject):
             body = {"prompt": scene["prompt"], "copies": copies, "model": model_key, "aspect_ratio": ratio}
             self.log.emit(f"[INFO] Start scene {actual_scene_num} with {copies} copies in one batch…")
             rc = client.start_one(body, model_key, ratio, scene["prompt"], copies=copies, project_id=project_id)
+            if rc > 0 and journal:
+                journal.record_submitted(actual_scene_num, scene["prompt"], body, "default", project_id, model_key)
 
             if rc > 0:
                 # Only create cards for operations that actually exist in the API response
@@ -1025,7 +1053,10 @@ class _Worker(QObject):
                         'card': card,
                         'body': body,
                         'scene': actual_scene_num,
-                        'copy': copy_idx  # 1-based index
+                        'copy': copy_idx,  # 1-based index
+                        'client': client,
+                        'project_id': project_id,
+                        'model_key': model_key
                     }
                     jobs.append(job_info)
             else:
@@ -1034,235 +1065,44 @@ class _Worker(QObject):
                     card={"scene":actual_scene_num,"copy":copy_idx,"status":"FAILED_START","error_reason":"Failed to start video generation","json":scene["prompt"],"url":"","path":"","thumb":"","dir":dir_videos}
                     self.job_card.emit(card)
 
-        # polling with improved error handling
-        retry_count = {}  # Track retry attempts per operation
-        download_retry_count = {}  # Track download retry attempts
-        max_retries = 3
-        max_download_retries = 5
-
-        for poll_round in range(120):
-            # PR#4: Check stop flag
-            if self.should_stop:
-                self.log.emit("[INFO] Đã dừng xử lý theo yêu cầu người dùng.")
-                break
+        # Sequential mode always downloads, naming files after the project title
+        self._poll_all_jobs(jobs, dir_videos, thumbs_dir, up4k, True, quality, title=title, restored=restored)
 
-            if not jobs:
-                self.log.emit("[INFO] Tất cả video đã hoàn tất hoặc thất bại.")
-                break
+    def _resume_scene(self, plan, scene, client_for, dir_videos, thumbs_dir, jobs, restored):
+        """
+        Restore a scene from the job journal instead of submitting it again.
 
-            # Extract all operation names from all jobs
-            names = []
-            metadata = {}
-            for job_info in jobs:
-                job_dict = job_info['body']
-                names.extend(job_dict.get("operation_names", []))
-                # Collect metadata for batch check
-                op_meta = job_dict.get("operation_metadata", {})
-                if op_meta:
-                    metadata.update(op_meta)
-
-            # Batch check with error handling
-            try:
-                rs = client.batch_check_operations(names, metadata)
-            except Exception as e:
-                self.log.emit(f"[WARN] Lỗi kiểm tra trạng thái (vòng {poll_round + 1}): {e}")
-                import time
-                time.sleep(10)  # Wait longer on error before retry
+        Downloaded copies get their DOWNLOADED card back (appended to ``restored``);
+        outstanding operations are queued in ``jobs`` for polling with the client
+        ``client_for(entry)`` returns for the account that created them.
+        """
+        for entry in plan:
+            scene_num, copy_idx, op_name = entry["scene"], entry["copy"], entry["op"]
+            card = {"scene": scene_num, "copy": copy_idx, "status": "PROCESSING", "json": scene["prompt"],
+                    "url": "", "path": "", "thumb": "", "dir": dir_videos}
+            job_info = {
+                'card': card,
+                'body': {"operation_names": [op_name], "operation_metadata": {op_name: entry.get("metadata")}},
+                'op_name': op_name,
+                'submitted_at': entry.get("submitted_ts"),
+                'scene': scene_num,
+                'copy': copy_idx,
+                'project_id': entry.get("project_id"),
+                'model_key': entry.get("model_key", ""),
+            }
+            if entry["status"] == "DOWNLOADED":
+                thumb = os.path.join(thumbs_dir, f"thumb_c{scene_num}_v{copy_idx}.jpg")
+                card["status"] = "DOWNLOADED"
+                card["path"] = entry["path"]
+                card["thumb"] = thumb if os.path.exists(thumb) else ""
+                job_info['restored'] = True
+                self.job_card.emit(card)
+                restored.append(job_info)
                 continue
-
-            new_jobs=[]
-            for job_info in jobs:
-                card = job_info['card']
-                job_dict = job_info['body']
-                copy_idx = job_info['copy']  # 1-based copy index
-
-                # Get operation names list and map this copy to its operation
-                op_names = job_dict.get("operation_names", [])
-                if not op_names:
-                    # No operation name - keep in queue for one more iteration in case it appears
-                    # Initialize skip counter if not present
-                    if 'no_op_count' not in job_info:
-                        job_info['no_op_count'] = 0
-                    job_info['no_op_count'] += 1
-
-                    # Only skip after multiple attempts
-                    if job_info['no_op_count'] > 3:
-                        sc = card['scene']
-                        cp = card['copy']
-                        self.log.emit(f"[WARN] Cảnh {sc} video {cp}: không có operation name sau 3 lần thử")
-                    else:
-                        new_jobs.append(job_info)
-                    continue
-
-                # Map copy index to the correct operation name (copy_idx is 1-based, array is 0-based)
-                op_index = copy_idx - 1
-                if op_index >= len(op_names):
-                    # This copy's operation doesn't exist - should not happen due to earlier check
-                    sc = card['scene']
-                    cp = card['copy']
-                    self.log.emit(f"[ERR] Cảnh {sc} video {cp}: operation index {op_index} out of bounds (only {len(op_names)} operations)")
-                    card["status"] = "FAILED"
-                    card["error_reason"] = "Operation index out of bounds"
-                    self.job_card.emit(card)
-                    continue
-
-                op_name = op_names[op_index]
-                op_result = rs.get(op_name) or {}
-
-                # VEO3 WORKING STRUCTURE: Check raw API response
-                raw_response = op_result.get('raw', {})
-                status = raw_response.get('status', '')
-
-                scene = card["scene"]
-                copy_num = card["copy"]
-
-                if status == 'MEDIA_GENERATION_STATUS_SUCCESSFUL':
-                    # Extract video URL from correct path
-                    op_metadata = raw_response.get('operation', {}).get('metadata', {})
-                    video_info = op_metadata.get('video', {})
-                    video_url = video_info.get('fifeUrl', '')
-
-                    if video_url:
-                        card["status"] = "READY"
-                        card["url"] = video_url
-
-                        self.log.emit(f"[SUCCESS] Scene {scene} Copy {copy_num}: Video ready!")
-
-                        # Download logic - Always download videos
-                        # Sanitize filename to handle Vietnamese characters and special characters
-                        raw_fn = f"{title}_scene{scene}_copy{copy_num}.mp4"
-                        fn = sanitize_filename(raw_fn)
-                        fp = os.path.join(dir_videos, fn)
-
-                        self.log.emit(f"[INFO] Downloading scene {scene} copy {copy_num}...")
-
-                        try:
-                            if self._download(video_url, fp):
-                                card["status"] = "DOWNLOADED"
-                                card["path"] = fp
-
-                                thumb = self._make_thumb(fp, thumbs_dir, scene, copy_num)
-                                card["thumb"] = thumb
-
-                                self.log.emit(f"[SUCCESS] ✓ Downloaded: {os.path.basename(fp)}")
-                            else:
-                                # Track download retries
-                                download_key = f"{scene}_{copy_num}"
-                                retries = download_retry_count.get(download_key, 0)
-                                if retries < max_download_retries:
-                                    download_retry_count[download_key] = retries + 1
-                                    self.log.emit(f"[WARN] Download failed, will retry ({retries + 1}/{max_download_retries})")
-                                    card["status"] = "DOWNLOAD_FAILED"
-                                    card["url"] = video_url
-                                    self.job_card.emit(card)
-                                    new_jobs.append(job_info)
-                                    continue
-                                else:
-                                    self.log.emit(f"[ERR] Download failed after {max_download_retries} attempts")
-                                    card["status"] = "DOWNLOAD_FAILED"
-                                    card["url"] = video_url
-                                    card["error_reason"] = "Download failed after retries"
-                                    self.job_card.emit(card)
-                        except Exception as e:
-                            # Track download retries for exceptions
-                            download_key = f"{scene}_{copy_num}"
-                            retries = download_retry_count.get(download_key, 0)
-                            if retries < max_download_retries:
-                                download_retry_count[download_key] = retries + 1
-                                self.log.emit(f"[ERR] Download error: {e} - will retry ({retries + 1}/{max_download_retries})")
-                                card["status"] = "DOWNLOAD_FAILED"
-                                card["url"] = video_url
-                                self.job_card.emit(card)
-                                new_jobs.append(job_info)
-                                continue
-                            else:
-                                self.log.emit(f"[ERR] Download error after {max_download_retries} attempts: {e}")
-                                card["status"] = "DOWNLOAD_FAILED"
-                                card["url"] = video_url
-                                card["error_reason"] = f"Download error: {str(e)[:50]}"
-                                self.job_card.emit(card)
-
-                        self.job_card.emit(card)
-                    else:
-                        # Video marked successful but no URL - this is an error state
-                        self.log.emit(f"[ERR] Scene {scene} Copy {copy_num}: No video URL in response")
-                        card["status"] = "DONE_NO_URL"
-                        card["error_reason"] = "No video URL in response"
-                        self.job_card.emit(card)
-
-                elif status == 'MEDIA_GENERATION_STATUS_FAILED':
-                    # Try to extract error details from API response
-                    error_info = raw_response.get('operation', {}).get('error', {})
-                    error_message = error_info.get('message', '')
-
-                    # Categorize the error
-                    if 'quota' in error_message.lower() or 'limit' in error_message.lower():
-                        error_reason = "Vượt quota API"
-                    elif 'policy' in error_message.lower() or 'content' in error_message.lower() or 'safety' in error_message.lower():
-                        error_reason = "Nội dung không phù hợp"
-                    elif 'timeout' in error_message.lower():
-                        error_reason = "Timeout"
-                    elif error_message:
-                        error_reason = error_message[:80]
-                    else:
-                        error_reason = "Video generation failed"
-
-                    card["status"] = "FAILED"
-                    card["error_reason"] = error_reason
-                    self.log.emit(f"[ERR] Scene {scene} Copy {copy_num} FAILED: {error_reason}")
-                    self.job_card.emit(card)
-
-                else:
-                    # Still processing (PENDING, ACTIVE, or other states)
-                    card["status"] = "PROCESSING"
-                    self.job_card.emit(card)
-                    new_jobs.append(job_info)
-
-            jobs=new_jobs
-
-            if jobs:
-                poll_info = f"vòng {poll_round + 1}/120"
-                # Warn if approaching timeout
-                if poll_round >= 100:
-                    self.log.emit(f"[WARN] Đang chờ {len(jobs)} video ({poll_info}) - sắp hết thời gian chờ!")
-                else:
-                    self.log.emit(f"[INFO] Đang chờ {len(jobs)} video ({poll_info})...")
-                try:
-                    import time
-                    time.sleep(5)
-                except Exception:
-                    pass
-
-        # If we exit the loop with remaining jobs, they timed out
-        if jobs:
-            self.log.emit(f"[WARN] Hết thời gian chờ, còn {len(jobs)} video chưa hoàn thành")
-            for job_info in jobs:
-                card = job_info['card']
-                if card.get("status") == "PROCESSING":
-                    card["status"] = "TIMEOUT"
-                    card["error_reason"] = "Quá thời gian chờ (timeout)"
-                    self.job_card.emit(card)
-
-        # 4K upscale
-
-        if up4k:
-            has_ffmpeg = shutil.which("ffmpeg") is not None
-            if not has_ffmpeg:
-                self.log.emit("[WARN] Không tìm thấy ffmpeg trong PATH — bỏ qua upscale 4K.")
-            else:
-                for job_info in jobs:
-                    card = job_info['card']
-                    if card.get("path"):
-                        src=card["path"]
-                        dst=src.replace(".mp4","_4k.mp4")
-                        cmd=["ffmpeg","-y","-i",src,"-vf","scale=3840:-2","-c:v","libx264","-preset","fast",dst]
-                        try:
-                            subprocess.run(cmd, check=True)
-                            card["path"]=dst
-                            card["status"]="UPSCALED_4K"
-                            self.job_card.emit(card)
-                        except Exception as e:
-                            self.log.emit(f"[ERR] 4K upscale fail: {e}")
+            job_info['client'] = client_for(entry)
+            self.job_card.emit(card)
+            jobs.append(job_info)
+        self.log.emit(f"[INFO] Scene {plan[0]['scene']}: resumed {len(plan)} operation(s) from job journal")
 
     def _run_video_parallel(self, p, account_mgr):
         """
@@ -1286,9 +1126,27 @@ class _Worker(QObject):
 
         self.log.emit(f"[INFO] 🚀 Parallel mode: {num_accounts} accounts, {len(p['scenes'])} scenes")
 
+        # Scenes an interrupted run already submitted are reattached, not resubmitted
+        journal = get_job_journal(dir_videos)
+        resumed_jobs = []
+        restored = []
+        resume_clients = {}
+
+        def client_for(entry):
+            account = next((a for a in accounts if a.name == entry.get("account")), None) or next(
+                (a for a in accounts if a.project_id == entry.get("project_id")), accounts[0])
+            if account.name not in resume_clients:
+                resume_clients[account.name] = LabsClient(
+                    account.tokens, on_event=lambda event: self._handle_labs_event(event, self.log.emit))
+            return resume_clients[account.name]
+
         # Distribute scenes across accounts using round-robin
         batches = [[] for _ in range(num_accounts)]
         for scene_idx, scene in enumerate(p["scenes"], start=1):
+            plan = journal.resume_plan(scene.get("actual_scene_num", scene_idx), scene["prompt"], copies) if journal else []
+            if plan:
+                self._resume_scene(plan, scene, client_for, dir_videos, thumbs_dir, resumed_jobs, restored)
+                continue
             account_idx = (scene_idx - 1) % num_accounts
             batches[account_idx].append((scene_idx, scene))
 
@@ -1314,7 +1172,7 @@ class _Worker(QObject):
             thread.start()
 
         # Monitor progress from all threads
-        total_scenes = len(p["scenes"])
+        total_scenes = sum(len(batch) for batch in batches)
         completed_starts = 0
 
         while completed_starts < total_scenes:
@@ -1324,7 +1182,6 @@ class _Worker(QObject):
 
             try:
                 # Wait for results from any thread
-                import queue
                 msg_type, data = results_queue.get(timeout=1.0)
 
                 if msg_type == "scene_started":
@@ -1360,7 +1217,9 @@ class _Worker(QObject):
             thread.join(timeout=60.0)  # 60s timeout to handle slow network/API
 
         # Summary of scene starts
-        if len(all_jobs) == 0:
+        if total_scenes == 0:
+            self.log.emit("[INFO] All scenes resumed from job journal")
+        elif len(all_jobs) == 0:
             self.log.emit(
                 f"[ERROR] All {total_scenes} scenes failed to start. "
                 "No video generation jobs were created."
@@ -1378,7 +1237,8 @@ class _Worker(QObject):
             )
 
         # Now poll for all jobs (same logic as sequential but with all jobs from all threads)
-        self._poll_all_jobs(all_jobs, dir_videos, thumbs_dir, up4k, auto_download, quality)
+        self._poll_all_jobs(resumed_jobs + all_jobs, dir_videos, thumbs_dir, up4k, auto_download, quality,
+                            restored=restored)
 
     def _process_scene_batch(self, account, batch, p, results_queue, all_jobs, jobs_lock, thread_id):
         """
@@ -1403,6 +1263,7 @@ class _Worker(QObject):
             copies = p["copies"]
             model_key = p.get("model_key", "")
             dir_videos = p["dir_videos"]
+            journal = get_job_journal(dir_videos)
 
             thread_name = f"T{thread_id+1}"
 
@@ -1421,6 +1282,10 @@ class _Worker(QObject):
                     results_queue.put(("log", f"{thread_name}: Starting scene {actual_scene_num} ({copies} copies)"))
 
                     rc = client.start_one(body, model_key, ratio, scene["prompt"], copies=copies, project_id=account.project_id)
+                    if rc > 0 and journal:
+                        journal.record_submitted(
+                            actual_scene_num, scene["prompt"], body, account.name, account.project_id, model_key
+                        )
 
                     if rc > 0:
                         actual_count = len(body.get("operation_names", []))
@@ -1449,7 +1314,8 @@ class _Worker(QObject):
                                 'scene': actual_scene_num,
                                 'copy': copy_idx,
                                 'client': client,  # Keep client reference for polling
-                                'project_id': account.project_id  # Issue #2 FIX: Store project_id for batch_check
+                                'project_id': account.project_id,  # Issue #2 FIX: Store project_id for batch_check
+                                'model_key': model_key
                             }
                             job_infos.append(job_info)
 
@@ -1486,10 +1352,6 @@ class _Worker(QObject):
                             ("log", f"{thread_name}: Scene {actual_scene_num} failed to start - {error_reason}")
                         )
 
-                    # Small delay between scenes to respect API rate limits
-                    # TODO: Make this configurable per account rate limits
-                    time.sleep(0.5)
-
                 except Exception as e:
                     # Exception during scene start - create failure cards
                     error_msg = f"Exception during start: {str(e)[:_MAX_ERROR_MESSAGE_LENGTH]}"
@@ -1516,206 +1378,259 @@ class _Worker(QObject):
         except Exception as e:
             results_queue.put(("log", f"Thread {thread_id+1} error: {e}"))
 
-    def _poll_all_jobs(self, jobs, dir_videos, thumbs_dir, up4k, auto_download, quality):
-        """Poll all jobs for completion (shared logic between parallel and sequential)"""
-        if not jobs:
+    def _poll_all_jobs(self, jobs, dir_videos, thumbs_dir, up4k, auto_download, quality, title=None,
+                       restored=None):
+        """
+        Wait for all jobs to finish (shared logic between parallel and sequential).
+
+        Operation names are handed to the process-wide poller, which batches status
+        checks per account/project and pushes completions back here as they happen.
+        When ``title`` is given, files are named ``{title}_scene{n}_copy{k}.mp4``.
+        Outcomes go to the job journal; ``restored`` holds copies a previous run
+        already downloaded (they still take part in the 4K upscale).
+        With ``up4k``, each clip is queued for upscaling as soon as it is downloaded.
+        """
+        if not jobs and not restored:
             self.log.emit("[INFO] No jobs to poll")
             return
 
-        # Group jobs by client to batch poll efficiently
-        client_jobs = {}
-        for job_info in jobs:
-            client = job_info.get('client')
-            if client not in client_jobs:
-                client_jobs[client] = []
-            client_jobs[client].append(job_info)
-
-        retry_count = {}
+        poller = get_operation_poller()
+        pipeline = get_download_pipeline()
+        events = queue.Queue()
+        pending = {}
+        busy = set()  # (scene, copy) with a download or thumbnail still running
+        finished = list(restored or [])
         download_retry_count = {}
-        max_retries = 3
         max_download_retries = 5
+        journal = get_job_journal(dir_videos)
 
-        for poll_round in range(120):
+        upscaling = set()  # (scene, copy) with a 4K encode queued or running
+        upscale_times = []
+        upscaler = None
+        if up4k:
+            if shutil.which("ffmpeg"):
+                upscaler = get_upscale_pipeline()
+                self.log.emit(f"[4K] Upscale từng clip ngay khi tải xong ({upscaler.describe()})")
+            else:
+                self.log.emit("[WARN] Không tìm thấy ffmpeg trong PATH — bỏ qua upscale 4K.")
+        upscale_start = time.perf_counter()
+
+        def on_done(op_name, op_result):
+            events.put(("op", op_name, op_result))
+
+        def watch(job_info):
+            op_name = job_info['op_name']
+            pending[op_name] = job_info
+            poller.watch(
+                job_info.get('client'), op_name, on_done,
+                metadata=job_info['body'].get("operation_metadata", {}).get(op_name),
+                project_id=job_info.get('project_id'),
+                model_key=job_info.get('model_key', ""),
+                submitted_at=job_info.get('submitted_at'),  # reattached ops keep their original deadline
+            )
+
+        def download(job_info):
+            card = job_info['card']
+            scene, copy_num = card["scene"], card["copy"]
+            busy.add((scene, copy_num))
+            pipeline.submit(
+                card["url"], job_info['dest'],
+                lambda result: events.put(("downloaded", job_info, result)),
+                thumb_fn=lambda path: self._make_thumb(path, thumbs_dir, scene, copy_num),
+                on_thumb=lambda thumb: events.put(("thumb", job_info, thumb)),
+                downloader=self.video_downloader,
+            )
+
+        def upscale(job_info):
+            card = job_info['card']
+            src = card.get("path")
+            if upscaler is None or not src:
+                return
+            dst = src.replace(".mp4", "_4k.mp4")
+            if job_info.get('restored') and os.path.exists(dst):
+                # Upscaled before the interruption
+                card["path"] = dst
+                card["status"] = "UPSCALED_4K"
+                self.job_card.emit(card)
+                return
+            upscaling.add((card["scene"], card["copy"]))
+            upscaler.submit(src, dst, lambda result: events.put(("upscaled", job_info, result)))
+
+        for job_info in finished:
+            upscale(job_info)
+
+        for job_info in jobs:
+            if job_info.get('op_name'):
+                watch(job_info)  # reattached from the job journal
+                continue
+            card = job_info['card']
+            op_names = job_info['body'].get("operation_names", [])
+            if not op_names:
+                self.log.emit(f"[WARN] Scene {card['scene']} copy {card['copy']}: no operation name")
+                continue
+            op_index = job_info['copy'] - 1
+            if op_index >= len(op_names):
+                self.log.emit(f"[ERR] Scene {card['scene']} copy {card['copy']}: operation index out of bounds")
+                card["status"] = "FAILED"
+                card["error_reason"] = "Operation index out of bounds"
+                self.job_card.emit(card)
+                continue
+            job_info['op_name'] = op_names[op_index]
+            watch(job_info)
+
+        while pending or busy or upscaling:
             if self.should_stop:
+                poller.unwatch(list(pending))
                 self.log.emit("[INFO] Polling stopped by user")
                 break
 
-            if not jobs:
-                self.log.emit("[INFO] All videos completed or failed")
-                break
+            try:
+                kind, key, result = events.get(timeout=1.0)
+            except queue.Empty:
+                continue
 
-            # Poll each client's jobs
-            for client, client_job_list in list(client_jobs.items()):
-                if not client_job_list:
+            if kind == "op":
+                job_info = pending.pop(key, None)
+                if job_info is None:
                     continue
-
-                # Extract all operation names for this client
-                names = []
-                metadata = {}
-                # Issue #2 FIX: Get project_id from first job (all jobs for same client have same project_id)
-                project_id = None
-                for job_info in client_job_list:
-                    job_dict = job_info['body']
-                    names.extend(job_dict.get("operation_names", []))
-                    # Collect metadata for batch check
-                    op_meta = job_dict.get("operation_metadata", {})
-                    if op_meta:
-                        metadata.update(op_meta)
-                    # Get project_id from first job
-                    if project_id is None:
-                        project_id = job_info.get('project_id')
-
-                if not names:
+                ready = self._apply_poll_result(job_info, result, dir_videos, auto_download, title)
+                if journal:
+                    card = job_info['card']
+                    if card["status"] in ("READY", "TIMEOUT"):
+                        journal.record_status(key, card["status"])
+                    else:
+                        journal.record_failed(key, card.get("error_reason") or card["status"])
+                if ready:
+                    download(job_info)
+                else:
+                    finished.append(job_info)
+                if pending:
+                    self.log.emit(f"[INFO] Waiting for {len(pending)} videos...")
+                else:
+                    self.log.emit("[INFO] All videos completed or failed")
+            elif kind == "downloaded":
+                card = key['card']
+                if result["ok"]:
+                    if journal:
+                        journal.record_downloaded(key['op_name'], result["path"])
+                    card["path"] = result["path"]
+                    card["status"] = "DOWNLOADED"
+                    self.log.emit(f"[DOWNLOAD] Scene {card['scene']} Copy {card['copy']}: Downloaded")
+                    self.job_card.emit(card)
+                    upscale(key)
                     continue
-
-                # Batch check - Issue #2 FIX: Pass project_id for multi-account support
-                try:
-                    rs = client.batch_check_operations(names, metadata, project_id=project_id)
-                except Exception as e:
-                    self.log.emit(f"[WARN] Poll error (round {poll_round + 1}): {e}")
-                    time.sleep(10)
+                self.log.emit(f"[ERR] Download fail: {result['error']}")
+                card["status"] = "DOWNLOAD_FAILED"
+                download_key = f"{card['scene']}_{card['copy']}"
+                retries = download_retry_count.get(download_key, 0)
+                if retries < max_download_retries:
+                    download_retry_count[download_key] = retries + 1
+                    self.log.emit(f"[WARN] Download failed, will retry ({retries + 1}/{max_download_retries})")
+                    self.job_card.emit(card)
+                    download(key)
                     continue
+                card["error_reason"] = "Tải video thất bại"
+                self.job_card.emit(card)
+                busy.discard((card["scene"], card["copy"]))
+                finished.append(key)
+            elif kind == "thumb":
+                card = key['card']
+                if result:
+                    card["thumb"] = result
+                self.job_card.emit(card)
+                busy.discard((card["scene"], card["copy"]))
+                finished.append(key)
+
+            elif kind == "upscaled":
+                card = key['card']
+                upscaling.discard((card["scene"], card["copy"]))
+                if result["ok"]:
+                    upscale_times.append(result["seconds"])
+                    card["path"] = result["path"]
+                    card["status"] = "UPSCALED_4K"
+                    self.job_card.emit(card)
+                    self.log.emit(f"[4K] Scene {card['scene']} Copy {card['copy']}: Upscaled "
+                                  f"in {result['seconds']:.1f}s ({result['encoder']})")
+                else:
+                    self.log.emit(f"[ERR] 4K upscale failed (Scene {card['scene']} Copy {card['copy']}): "
+                                  f"{result['error']}")
 
-                # Process results (same logic as original sequential)
-                new_jobs = []
-                for job_info in client_job_list:
-                    card = job_info['card']
-                    job_dict = job_info['body']
-                    copy_idx = job_info['copy']
-
-                    op_names = job_dict.get("operation_names", [])
-                    if not op_names:
-                        if 'no_op_count' not in job_info:
-                            job_info['no_op_count'] = 0
-                        job_info['no_op_count'] += 1
-
-                        if job_info['no_op_count'] > 3:
-                            self.log.emit(f"[WARN] Scene {card['scene']} copy {card['copy']}: no operation name")
-                        else:
-                            new_jobs.append(job_info)
-                        continue
-
-                    op_index = copy_idx - 1
-                    if op_index >= len(op_names):
-                        self.log.emit(f"[ERR] Scene {card['scene']} copy {card['copy']}: operation index out of bounds")
-                        card["status"] = "FAILED"
-                        card["error_reason"] = "Operation index out of bounds"
-                        self.job_card.emit(card)
-                        continue
-
-                    op_name = op_names[op_index]
-                    op_result = rs.get(op_name) or {}
-                    raw_response = op_result.get('raw', {})
-                    status = raw_response.get('status', '')
-
-                    scene = card["scene"]
-                    copy_num = card["copy"]
-
-                    if status == 'MEDIA_GENERATION_STATUS_SUCCESSFUL':
-                        op_metadata = raw_response.get('operation', {}).get('metadata', {})
-                        video_info = op_metadata.get('video', {})
-                        video_url = video_info.get('fifeUrl', '')
-
-                        if video_url:
-                            card["status"] = "READY"
-                            card["url"] = video_url
-                            self.log.emit(f"[SUCCESS] Scene {scene} Copy {copy_num}: Video ready!")
-
-                            # Download if enabled
-                            if auto_download:
-                                out_name = f"scene_{scene:03d}_copy_{copy_num:02d}.mp4"
-                                dst_path = os.path.join(dir_videos, out_name)
-
-                                if self._download(video_url, dst_path):
-                                    card["path"] = dst_path
-                                    card["status"] = "DOWNLOADED"
-
-                                    # Thumbnail
-                                    thumb = self._make_thumb(dst_path, thumbs_dir, scene, copy_num)
-                                    if thumb:
-                                        card["thumb"] = thumb
-
-                                    self.log.emit(f"[DOWNLOAD] Scene {scene} Copy {copy_num}: Downloaded")
-                                else:
-                                    card["status"] = "DOWNLOAD_FAILED"
-                                    card["error_reason"] = "Tải video thất bại"
-
-                            self.job_card.emit(card)
-                        else:
-                            # Video marked successful but no URL - error state
-                            self.log.emit(f"[ERR] Scene {scene} Copy {copy_num}: Không có URL video trong phản hồi")
-                            card["status"] = "DONE_NO_URL"
-                            card["error_reason"] = "Không có URL video"
-                            self.job_card.emit(card)
-
-                    elif status in ['MEDIA_GENERATION_STATUS_FAILED', 'MEDIA_GENERATION_STATUS_BLOCKED']:
-                        # Extract detailed error information from API response
-                        error_info = raw_response.get('operation', {}).get('error', {})
-                        error_message = error_info.get('message', '')
-
-                        # Categorize the error for better user understanding
-                        if 'quota' in error_message.lower() or 'limit' in error_message.lower():
-                            error_reason = "Vượt quota API"
-                        elif 'policy' in error_message.lower() or 'content' in error_message.lower() or 'safety' in error_message.lower():
-                            error_reason = "Nội dung không phù hợp (vi phạm chính sách)"
-                        elif 'timeout' in error_message.lower():
-                            error_reason = "Timeout - quá thời gian chờ"
-                        elif status == 'MEDIA_GENERATION_STATUS_BLOCKED':
-                            error_reason = "Bị chặn (nội dung vi phạm)"
-                        elif error_message:
-                            error_reason = error_message[:80]
-                        else:
-                            error_reason = "Tạo video thất bại"
-
-                        card["status"] = "FAILED"
-                        card["error_reason"] = error_reason
-                        self.log.emit(f"[FAILED] Scene {scene} Copy {copy_num}: {error_reason}")
-                        self.job_card.emit(card)
-
-                    else:
-                        # Still processing
-                        card["status"] = "PROCESSING"
-                        self.job_card.emit(card)
-                        new_jobs.append(job_info)
+        if upscale_times:
+            wall = time.perf_counter() - upscale_start
+            self.log.emit(f"[4K] {len(upscale_times)} clip: encode {sum(upscale_times):.0f}s tổng, "
+                          f"trung bình {sum(upscale_times) / len(upscale_times):.1f}s/clip, "
+                          f"{wall:.0f}s từ lúc bắt đầu poll")
 
-                client_jobs[client] = new_jobs
+    def _apply_poll_result(self, job_info, op_result, dir_videos, auto_download, title):
+        """
+        Update a job's card from a finished operation (or a poller timeout).
 
-            # Update main jobs list
-            jobs = [job for job_list in client_jobs.values() for job in job_list]
+        Returns:
+            True if the video is ready and should be downloaded (``job_info['dest']`` is set)
+        """
+        card = job_info['card']
+        scene = card["scene"]
+        copy_num = card["copy"]
+
+        if op_result.get("status") == "TIMEOUT":
+            card["status"] = "TIMEOUT"
+            card["error_reason"] = "Polling timeout (quá thời gian chờ)"
+            self.job_card.emit(card)
+            self.log.emit(f"[WARN] Scene {scene} Copy {copy_num}: polling timeout")
+            return False
 
-            if jobs:
-                # Warn if approaching timeout
-                if poll_round >= 100:
-                    self.log.emit(f"[WARN] Waiting for {len(jobs)} videos (round {poll_round + 1}/120) - approaching timeout!")
-                else:
-                    self.log.emit(f"[INFO] Waiting for {len(jobs)} videos (round {poll_round + 1}/120)...")
-                time.sleep(5)
-
-        # If we exit the loop with remaining jobs, they timed out
-        if jobs:
-            self.log.emit(f"[WARN] Polling timeout reached, {len(jobs)} videos still processing")
-            for job_info in jobs:
-                card = job_info['card']
-                if card.get("status") == "PROCESSING":
-                    card["status"] = "TIMEOUT"
-                    card["error_reason"] = "Polling timeout (quá thời gian chờ)"
-                    self.job_card.emit(card)
+        raw_response = op_result.get('raw', {})
+        status = raw_response.get('status', '')
+
+        if status == 'MEDIA_GENERATION_STATUS_SUCCESSFUL':
+            op_metadata = raw_response.get('operation', {}).get('metadata', {})
+            video_info = op_metadata.get('video', {})
+            video_url = video_info.get('fifeUrl', '')
+
+            if not video_url:
+                # Video marked successful but no URL - error state
+                self.log.emit(f"[ERR] Scene {scene} Copy {copy_num}: Không có URL video trong phản hồi")
+                card["status"] = "DONE_NO_URL"
+                card["error_reason"] = "Không có URL video"
+                self.job_card.emit(card)
+                return False
+
+            card["status"] = "READY"
+            card["url"] = video_url
+            self.log.emit(f"[SUCCESS] Scene {scene} Copy {copy_num}: Video ready!")
+            self.job_card.emit(card)
+
+            # Download if enabled
+            if not auto_download:
+                return False
+            if title:
+                # Sanitize filename to handle Vietnamese characters and special characters
+                out_name = sanitize_filename(f"{title}_scene{scene}_copy{copy_num}.mp4")
+            else:
+                out_name = f"scene_{scene:03d}_copy_{copy_num:02d}.mp4"
+            job_info['dest'] = os.path.join(dir_videos, out_name)
+            return True
 
-        # 4K upscale if requested
-        if up4k and shutil.which("ffmpeg"):
-            self.log.emit("[INFO] Starting 4K upscale...")
-            for job_info in jobs:
-                card = job_info['card']
-                if card.get("path"):
-                    src = card["path"]
-                    dst = src.replace(".mp4", "_4k.mp4")
-                    cmd = ["ffmpeg", "-y", "-i", src, "-vf", "scale=3840:-2", "-c:v", "libx264", "-preset", "fast", dst]
-                    try:
-                        subprocess.run(cmd, check=True)
-                        card["path"] = dst
-                        card["status"] = "UPSCALED_4K"
-                        self.job_card.emit(card)
-                        self.log.emit(f"[4K] Scene {card['scene']} Copy {card['copy']}: Upscaled")
-                    except Exception as e:
-                        self.log.emit(f"[ERR] 4K upscale failed: {e}")
+        # Extract detailed error information from API response
+        error_info = raw_response.get('operation', {}).get('error', {})
+        error_message = error_info.get('message', '')
+
+        # Categorize the error for better user understanding
+        if 'quota' in error_message.lower() or 'limit' in error_message.lower():
+            error_reason = "Vượt quota API"
+        elif 'policy' in error_message.lower() or 'content' in error_message.lower() or 'safety' in error_message.lower():
+            error_reason = "Nội dung không phù hợp (vi phạm chính sách)"
+        elif 'timeout' in error_message.lower():
+            error_reason = "Timeout - quá thời gian chờ"
+        elif status == 'MEDIA_GENERATION_STATUS_BLOCKED':
+            error_reason = "Bị chặn (nội dung vi phạm)"
+        elif error_message:
+            error_reason = error_message[:80]
+        else:
+            error_reason = "Tạo video thất bại"
 
+        card["status"] = "FAILED"
+        card["error_reason"] = error_reason
+        self.log.emit(f"[FAILED] Scene {scene} Copy {copy_num}: {error_reason}")
+        self.job_card.emit(card)
+        return False
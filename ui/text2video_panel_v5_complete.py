@@ -668,6 +668,15 @@ class Text2VideoPanelV5(QWidget):
         self.btn_change_folder = QPushButton()
         self.btn_change_folder.setVisible(False)
 
+        # Off: every run asks the LLM for a new script; on: same inputs reuse the cached one
+        self.cb_reuse_script = QCheckBox("Dùng lại kịch bản đã tạo (cùng ý tưởng & cài đặt)")
+        self.cb_reuse_script.setChecked(False)
+        self.cb_reuse_script.setToolTip(
+            "Bật: trả về kịch bản đã sinh trước đó cho cùng đầu vào (nhanh, không gọi LLM).\n"
+            "Tắt: luôn sinh kịch bản mới."
+        )
+        colL.addWidget(self.cb_reuse_script)
+
         # BUTTONS
         hb = QHBoxLayout()
         self.btn_auto = QPushButton("⚡ Tạo video tự động (3 bước)")
@@ -1149,7 +1158,8 @@ class Text2VideoPanelV5(QWidget):
             domain=domain or None,
             topic=topic or None,
             base_seed=base_seed,  # Issue #33: Pass base seed for character consistency
-            style_seed=style_seed  # PR #8: Pass style seed for visual style consistency
+            style_seed=style_seed,  # PR #8: Pass style seed for visual style consistency
+            use_cache=self.cb_reuse_script.isChecked()  # Reuse last script vs regenerate
         )
 
         self._append_log("[INFO] Bước 1/3: Sinh kịch bản...")
@@ -1171,6 +1181,7 @@ class Text2VideoPanelV5(QWidget):
         if task == "script":
             self.worker.story_done.connect(self._on_story_ready)
             self.worker.progress_update.connect(self._on_progress_update)  # NEW: Connect progress signal
+            self.worker.scene_ready.connect(self._on_scene_streamed)
         else:
             self.worker.job_card.connect(self._on_job_card)
 
@@ -1184,6 +1195,35 @@ class Text2VideoPanelV5(QWidget):
         self.progress_bar.setValue(percent)
         self.progress_bar.setFormat(f"{percent}% - {message}")
 
+    def _on_scene_streamed(self, idx, scene):
+        """Show a preview card for each scene while the rest of the script is still generating"""
+        if idx == 1:
+            self.cards.clear()
+            while self.cards_layout.count() > 1:
+                item = self.cards_layout.takeAt(0)
+                if item.widget():
+                    item.widget().deleteLater()
+            self.scene_cards = []
+
+        vi = scene.get('prompt_vi', '')
+        tgt = scene.get('prompt_tgt', '')
+        if SceneResultCard:
+            scene_data = {
+                'description': vi or tgt,
+                'desc': vi or tgt,
+                'speech': '',
+                'voice_over': '',
+                'prompt_image': vi or tgt,
+                'prompt_video': tgt or vi
+            }
+            card = SceneResultCard(idx, scene_data, alternating_color=(idx % 2 == 1))
+            self.cards_layout.insertWidget(len(self.scene_cards), card)
+            self.scene_cards.append(card)
+        else:
+            it = QListWidgetItem(f"Cảnh {idx}: {(vi or tgt)[:120]}")
+            it.setBackground(QColor("#E3F2FD") if idx % 2 == 1 else QColor("#FFFFFF"))
+            self.cards.addItem(it)
+
     def _on_worker_finished_cleanup(self):
         """Handle worker completion with proper cleanup"""
         self._append_log("[INFO] Worker hoàn tất.")
@@ -1234,6 +1274,14 @@ class Text2VideoPanelV5(QWidget):
                 f"2. Kiểm tra và chỉnh sửa các lời thoại trong tab 'Prompts'\n"
             )
 
+        if data.get("history_repeat_warning"):
+            warnings_to_show.append(
+                f"⚠️ CẢNH LẶP LẠI KỊCH BẢN TRƯỚC:\n{data.get('history_repeat_warning')}\n\n"
+                f"Đề xuất:\n"
+                f"1. Tạo lại kịch bản hoặc đổi ý tưởng để có nội dung mới\n"
+                f"2. Chỉnh sửa các cảnh trùng trong tab 'Prompts'\n"
+            )
+
         # Display all warnings in a single dialog
         if warnings_to_show:
             QMessageBox.warning(
@@ -163,17 +163,14 @@ class ImageGenerationWorker(QThread):
                 if char_count > 0:
                     self.progress.emit(f"[CHARACTER BIBLE] Injecting consistency for {char_count} character(s)")
 
-            # Generate scene images
+            # Generate scene images: Whisk first (one at a time), then Gemini in
+            # parallel (one request per API key) for every scene still without an image
             scenes = self.outline.get("scenes", [])
-            for i, scene in enumerate(scenes):
+            gemini_jobs = []
+            for scene in scenes:
                 if self.should_stop:
                     break
 
-                # NOTE: Rate limiting now handled by generate_image_with_rate_limit()
-                # No need for manual delay here anymore
-
-                self.progress.emit(f"Tạo ảnh cảnh {scene.get('index')}...")
-
                 prompt = scene.get("prompt_image", "")
 
                 if self.character_bible and hasattr(self.character_bible, 'characters'):
@@ -185,6 +182,7 @@ class ImageGenerationWorker(QThread):
 
                 img_data = None
                 if self.use_whisk and self.model_paths and self.prod_paths:
+                    self.progress.emit(f"Tạo ảnh cảnh {scene.get('index')}...")
                     try:
                         from services import whisk_service
                         img_data = whisk_service.generate_image(
@@ -199,34 +197,36 @@ class ImageGenerationWorker(QThread):
                         self.progress.emit(f"Whisk failed: {str(e)[:100]}")
                         img_data = None
 
-                if img_data is None and image_gen_service:
-                    try:
-                        self.progress.emit(f"Cảnh {scene.get('index')}: Dùng Gemini...")
+                if img_data:
+                    self.scene_image_ready.emit(scene.get("index"), img_data)
+                else:
+                    gemini_jobs.append((scene.get("index"), prompt, aspect_ratio))
 
-                        # Enhanced: Respect rate limit for subsequent requests
-                        img_data_url = image_gen_service.generate_image_with_rate_limit(
-                            text=prompt,
-                            api_keys=api_keys,
-                            model=model,
-                            aspect_ratio=aspect_ratio,
-                            delay_before=RATE_LIMIT_DELAY_SEC if i > 0 else 0,
-                            logger=lambda msg: self.progress.emit(msg),
-                        )
+            if gemini_jobs and image_gen_service and not self.should_stop:
+                def on_start(index):
+                    self.progress.emit(f"Cảnh {index}: Dùng Gemini...")
 
-                        if img_data_url and convert_to_bytes:
-                            img_data, error = convert_to_bytes(img_data_url)
-                            if img_data:
-                                self.progress.emit(f"Cảnh {scene.get('index')}: Gemini ✓")
-                            else:
-                                self.progress.emit(f"Cảnh {scene.get('index')}: {error}")
-                        else:
-                            img_data = None
-                    except Exception as e:
-                        self.progress.emit(f"Gemini failed: {e}")
-                        img_data = None
+                def on_result(index, img_result, error):
+                    img_data = None
+                    if img_result and convert_to_bytes:
+                        img_data, error = convert_to_bytes(img_result)
+                    if img_data:
+                        self.progress.emit(f"Cảnh {index}: Gemini ✓")
+                        self.scene_image_ready.emit(index, img_data)
+                    else:
+                        self.progress.emit(f"Cảnh {index}: Gemini failed: {error}")
 
-                if img_data:
-                    self.scene_image_ready.emit(scene.get("index"), img_data)
+                try:
+                    image_gen_service.generate_images_concurrently(
+                        gemini_jobs,
+                        api_keys=api_keys,
+                        on_result=on_result,
+                        on_start=on_start,
+                        should_stop=lambda: self.should_stop,
+                        log_callback=self.progress.emit,
+                    )
+                except Exception as e:
+                    self.progress.emit(f"Gemini failed: {e}")
 
             # Generate thumbnails
             social_media = self.outline.get("social_media", {})
@@ -13,6 +13,9 @@ class ImageWorker(QThread):
     """
     Background worker for image generation
     Prevents UI freezing during image generation API calls
+
+    Gemini scenes are generated concurrently (one request per API key) and
+    scene_done is emitted in completion order, not scene order.
     """
 
     # Signals
@@ -46,44 +49,60 @@ class ImageWorker(QThread):
             self.all_done.emit()
             return
 
+        if self.model == "gemini":
+            self._run_gemini(api_keys)
+        else:
+            self._run_whisk()
+
+        self.all_done.emit()
+
+    def _run_gemini(self, api_keys: list):
+        """All scenes in parallel, one request per API key; scene_done fires as each image arrives"""
+        from services.image_gen_service import generate_images_concurrently
+
+        jobs = []
         for i, scene in enumerate(self.scenes):
-            try:
-                scene_idx = scene.get('index', i)
-                prompt = scene.get('prompt', '')
-                aspect_ratio = scene.get('aspect_ratio', '1:1')
+            jobs.append((scene.get('index', i), scene.get('prompt', ''), scene.get('aspect_ratio', '1:1')))
+
+        def on_start(scene_idx):
+            self.progress.emit(scene_idx, f"Đang tạo ảnh cảnh {scene_idx + 1}...")
+
+        def on_result(scene_idx, img_result, error):
+            # Handle both bytes and data URL string formats
+            img_bytes = None
+            if img_result:
+                img_bytes, error = convert_to_bytes(img_result)
+            if img_bytes:
+                self.scene_done.emit(scene_idx, img_bytes)
+            else:
+                self.error.emit(scene_idx, f"Lỗi: {error}" if error else "Không nhận được dữ liệu ảnh")
+
+        try:
+            generate_images_concurrently(
+                jobs,
+                api_keys=api_keys,
+                on_result=on_result,
+                on_start=on_start,
+            )
+        except Exception as e:
+            self.error.emit(0, f"Lỗi: {str(e)}")
+
+    def _run_whisk(self):
+        from services.whisk_service import generate_image
 
+        for i, scene in enumerate(self.scenes):
+            scene_idx = scene.get('index', i)
+            try:
                 self.progress.emit(scene_idx, f"Đang tạo ảnh cảnh {scene_idx + 1}...")
-
-                # Generate image based on model using rate-limited function
-                if self.model == "gemini":
-                    from services.image_gen_service import generate_image_with_rate_limit
-                    img_result = generate_image_with_rate_limit(
-                        prompt=prompt,
-                        api_keys=api_keys,
-                        model="gemini",
-                        aspect_ratio=aspect_ratio,
-                        logger=lambda msg: self.progress.emit(scene_idx, msg)
-                    )
-
-                    # Handle both bytes and data URL string formats
-                    img_bytes = None
-                    if img_result:
-                        img_bytes, error = convert_to_bytes(img_result)
-                        if not img_bytes and error:
-                            self.error.emit(scene_idx, error)
-                else:
-                    from services.whisk_service import generate_image
-                    img_bytes = generate_image(prompt)
+                img_bytes = generate_image(scene.get('prompt', ''))
 
                 if img_bytes:
                     self.scene_done.emit(scene_idx, img_bytes)
                 else:
                     self.error.emit(scene_idx, "Không nhận được dữ liệu ảnh")
 
-                # Rate limiting between requests (reduced since generate_image_with_rate_limit handles it)
+                # Rate limiting between requests
                 time.sleep(0.5)
 
             except Exception as e:
                 self.error.emit(scene_idx, f"Lỗi: {str(e)}")
-
-        self.all_done.emit()
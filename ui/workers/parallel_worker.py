@@ -180,12 +180,9 @@ class ParallelSeqWorker(QObject):
 
                     self.log.emit("HTTP", f"{thread_name}: START OK -> {rc} ref(s)")
 
-                    # Queue update
+                    # Queue update (start requests are paced per account by the client)
                     self._queue_update(job_idx, job)
 
-                    # Rate limiting: small delay between jobs in same thread
-                    time.sleep(0.5)
-
                 except Exception as e:
                     self.log.emit("ERR", f"{thread_name}: Job {job_idx+1} failed: {e}")
                     self._queue_update(job_idx, job)
@@ -306,7 +303,6 @@ class ParallelSeqWorker(QObject):
                 self.row_update.emit(i, job)
                 done += 1
                 self.progress.emit(int(done * 100 / total), f"Đã gửi {done}/{len(self.jobs)} cảnh")
-                time.sleep(1.2)
 
             self.progress.emit(100, "Hoàn tất gửi tuần tự")
             self.finished.emit(1)
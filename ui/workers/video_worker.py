@@ -4,14 +4,18 @@ Video Generation Worker - Non-blocking video generation using QThread
 Prevents UI freezing during video generation API calls
 """
 import os
+import queue
 import shutil
-import subprocess
-import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
 
 from PyQt5.QtCore import QThread, pyqtSignal
 
 from services.account_manager import get_account_manager
 from services.google.labs_flow_client import DEFAULT_PROJECT_ID, LabsFlowClient
+from services.google.operation_poller import get_operation_poller
+from services.media_probe import get_media_probe
+from services.utils.download_pipeline import get_download_pipeline
+from services.utils.job_journal import get_job_journal
 from services.utils.video_downloader import VideoDownloader
 from utils import config as cfg
 from utils.filename_sanitizer import sanitize_filename
@@ -57,6 +61,7 @@ class VideoGenerationWorker(QThread):
         super().__init__(parent)
         self.payload = payload
         self.cancelled = False
+        self._journal = None  # job journal of the current run (set in _run_video)
         self.video_downloader = VideoDownloader(log_callback=lambda msg: self.log.emit(msg))
 
     def cancel(self):
@@ -98,25 +103,14 @@ class VideoGenerationWorker(QThread):
             detail = event.get("detail", "")
             self.log.emit(f"[ERROR] HTTP {code}: {detail}")
 
-    def _download(self, url, dst_path):
-        """Download video from URL."""
-        try:
-            self.video_downloader.download(url, dst_path)
-            return True
-        except Exception as e:
-            self.log.emit(f"[ERR] Download fail: {e}")
-            return False
-
     def _make_thumb(self, video_path, out_dir, scene, copy):
         """Generate thumbnail from video."""
         try:
             os.makedirs(out_dir, exist_ok=True)
             thumb = os.path.join(out_dir, f"thumb_c{scene}_v{copy}.jpg")
             if shutil.which("ffmpeg"):
-                cmd = ["ffmpeg", "-y", "-ss", "00:00:00", "-i", video_path,
-                       "-frames:v", "1", "-q:v", "3", thumb]
-                subprocess.run(cmd, check=True, capture_output=True)
-                return thumb
+                # Shared probe service: one ffmpeg per file, cached by content
+                return get_media_probe().analyze(video_path, thumb_path=thumb, with_metadata=False)["thumb"]
         except Exception as e:
             self.log.emit(f"[WARN] Tạo thumbnail lỗi: {e}")
         return ""
@@ -145,90 +139,221 @@ class VideoGenerationWorker(QThread):
 
         # Get account manager for multi-account support
         account_mgr = get_account_manager()
+        multi_account = account_mgr.is_multi_account_enabled()
 
-        # Check if multi-account mode is enabled
-        if account_mgr.is_multi_account_enabled():
-            enabled_accounts = account_mgr.get_enabled_accounts()
-            self.log.emit(
-                f"[INFO] Multi-account mode: {len(enabled_accounts)} accounts active"
-            )
-
-            # Log each account's details for transparency
-            for idx, acc in enumerate(enabled_accounts, 1):
-                token_count = len(acc.tokens)
-                proj_id_short = (
-                    acc.project_id[:12] + "..." if len(acc.project_id) > 12
-                    else acc.project_id
-                )
-                self.log.emit(
-                    f"[INFO]   Account {idx}: {acc.name} | "
-                    f"Project: {proj_id_short} | Tokens: {token_count}"
-                )
-
-            self.log.emit(
-                "[INFO] Using SEQUENTIAL processing with round-robin account distribution"
-            )
-            self.log.emit(
-                "[WARN] Parallel processing not yet implemented in VideoWorker, "
-                "using sequential"
-            )
+        # One submission lane per account (a single lane in legacy mode)
+        lanes = self._build_lanes(st, account_mgr)
+        if not lanes:
+            return
 
         copies = p["copies"]
         title = p["title"]
         dir_videos = p["dir_videos"]
         thumbs_dir = os.path.join(dir_videos, "thumbs")
+        model_key = p.get("model_key", "")
 
         total_scenes = len(p["scenes"])
         jobs = []
-        client_cache = {}
-
-        # Event handler for diagnostic logging
-        def on_labs_event(event):
-            self._handle_labs_event(event)
-
-        # Start video generation for each scene
+        restored = []  # videos already downloaded by an interrupted earlier run
+        self._journal = get_job_journal(dir_videos)
+
+        per_account = max(1, int((st.get("submission") or {}).get("per_account_concurrency", 2)))
+        self.log.emit(
+            f"[INFO] Parallel submission: {len(lanes)} account lane(s) × {per_account} concurrent request(s)"
+        )
+        executors = {
+            name: ThreadPoolExecutor(max_workers=per_account, thread_name_prefix=f"VideoSubmit-{idx}")
+            for idx, name in enumerate(lanes)
+        }
+
+        # Queue every scene on its account's lane
+        futures = {}
         for scene_idx, scene in enumerate(p["scenes"], start=1):
-            if self.cancelled:
-                self.error_occurred.emit("Generation cancelled by user")
-                return
-
             # Use actual_scene_num if provided (for retry), otherwise use scene_idx
             actual_scene_num = scene.get("actual_scene_num", scene_idx)
 
-            # Update progress: Starting scene
-            self.progress_updated.emit(
-                actual_scene_num - 1, total_scenes, f"Submitting scene {actual_scene_num}..."
-            )
-
-            ratio = scene["aspect"]
-            model_key = p.get("model_key", "")
+            # Reattach to operations an interrupted run already paid for
+            plan = self._journal.resume_plan(actual_scene_num, scene["prompt"], copies) if self._journal else []
+            if plan:
+                self._resume_scene(plan, scene, lanes, dir_videos, thumbs_dir, jobs, restored)
+                continue
 
-            # Get account for this scene (multi-account or legacy)
-            if account_mgr.is_multi_account_enabled():
-                # Use round-robin account selection for this scene
-                # Use scene_idx - 1 for round-robin (0-indexed), but actual_scene_num for display
+            if multi_account:
+                # Round-robin account selection (0-indexed), actual_scene_num for display
                 account = account_mgr.get_account_for_scene(scene_idx - 1)
-                if not account:
-                    self.log.emit("[ERROR] No enabled accounts available!")
-                    self.error_occurred.emit("No enabled accounts")
+                lane = lanes.get(account.name) if account else None
+                if lane is None:
+                    lane = next(iter(lanes.values()))
+            else:
+                lane = next(iter(lanes.values()))
+
+            proj_id_short = (
+                lane['project_id'][:12] + "..." if len(lane['project_id']) > 12
+                else lane['project_id']
+            )
+            self.log.emit(
+                f"[INFO] Scene {actual_scene_num}: Using account '{lane['name']}' | "
+                f"Project: {proj_id_short}"
+            )
+            fut = executors[lane['name']].submit(
+                self._submit_scene, lane, scene, actual_scene_num, model_key, copies, total_scenes
+            )
+            futures[fut] = (scene, actual_scene_num, lane)
+
+        try:
+            for fut in as_completed(futures):
+                if self.cancelled:
+                    for other in futures:
+                        other.cancel()
+                    self.error_occurred.emit("Generation cancelled by user")
                     return
 
-                tokens = account.tokens
-                project_id = account.project_id
+                scene, actual_scene_num, lane = futures[fut]
+                try:
+                    rc, body = fut.result()
+                except Exception as e:
+                    self.log.emit(f"[ERR] Scene {actual_scene_num}: start failed on '{lane['name']}': {e}")
+                    rc, body = 0, {}
+
+                if rc > 0:
+                    # Only create cards for operations that actually exist in the API response
+                    actual_count = len(body.get("operation_names", []))
+
+                    if actual_count < copies:
+                        self.log.emit(f"[WARN] Scene {actual_scene_num}: API returned {actual_count} operations but {copies} copies were requested")
+
+                    # Create cards only for videos that actually exist
+                    for copy_idx in range(1, actual_count + 1):
+                        card = {
+                            "scene": actual_scene_num,
+                            "copy": copy_idx,
+                            "status": "PROCESSING",
+                            "json": scene["prompt"],
+                            "url": "",
+                            "path": "",
+                            "thumb": "",
+                            "dir": dir_videos
+                        }
+                        self.job_card.emit(card)
+
+                        # Store card data with copy index for operation name mapping
+                        job_info = {
+                            'card': card,
+                            'body': body,
+                            'scene': actual_scene_num,
+                            'copy': copy_idx,
+                            'client': lane['client'],  # Poll with the account that created the job
+                            'project_id': lane['project_id'],
+                            'model_key': model_key
+                        }
+                        jobs.append(job_info)
+                else:
+                    # All copies failed to start
+                    for copy_idx in range(1, copies + 1):
+                        card = {
+                            "scene": actual_scene_num,
+                            "copy": copy_idx,
+                            "status": "FAILED_START",
+                            "error_reason": "Failed to start video generation",
+                            "json": scene["prompt"],
+                            "url": "",
+                            "path": "",
+                            "thumb": "",
+                            "dir": dir_videos
+                        }
+                        self.job_card.emit(card)
+        finally:
+            for ex in executors.values():
+                ex.shutdown(wait=False)
+
+        # Hand every operation to the shared poller; it groups checks per account/project
+        self._poll_jobs(jobs, title, dir_videos, thumbs_dir, total_scenes, restored)
+
+    def _resume_scene(self, plan, scene, lanes, dir_videos, thumbs_dir, jobs, restored):
+        """
+        Restore a scene from the job journal instead of submitting it again.
+
+        Downloaded copies get their DOWNLOADED card back (path appended to
+        ``restored``); outstanding operations are queued in ``jobs`` for polling
+        with the account that created them.
+        """
+        for entry in plan:
+            scene_num, copy_idx, op_name = entry["scene"], entry["copy"], entry["op"]
+            card = {
+                "scene": scene_num,
+                "copy": copy_idx,
+                "status": "PROCESSING",
+                "json": scene["prompt"],
+                "url": "",
+                "path": "",
+                "thumb": "",
+                "dir": dir_videos
+            }
+            if entry["status"] == "DOWNLOADED":
+                thumb = os.path.join(thumbs_dir, f"thumb_c{scene_num}_v{copy_idx}.jpg")
+                card["status"] = "DOWNLOADED"
+                card["path"] = entry["path"]
+                card["thumb"] = thumb if os.path.exists(thumb) else ""
+                self.job_card.emit(card)
+                self.scene_completed.emit(scene_num, entry["path"])
+                restored.append(entry["path"])
+                continue
+
+            lane = lanes.get(entry.get("account")) or next(
+                (ln for ln in lanes.values() if ln['project_id'] == entry.get("project_id")),
+                next(iter(lanes.values())),
+            )
+            self.job_card.emit(card)
+            jobs.append({
+                'card': card,
+                'body': {
+                    "operation_names": [op_name],
+                    "operation_metadata": {op_name: entry.get("metadata")},
+                },
+                'op_name': op_name,
+                'submitted_at': entry.get("submitted_ts"),
+                'scene': scene_num,
+                'copy': copy_idx,
+                'client': lane['client'],
+                'project_id': entry.get("project_id") or lane['project_id'],
+                'model_key': entry.get("model_key", ""),
+            })
+        self.log.emit(
+            f"[INFO] Scene {plan[0]['scene']}: resumed {len(plan)} operation(s) from job journal"
+        )
+
+    def _build_lanes(self, st, account_mgr):
+        """
+        Resolve the submission lanes: one per enabled account, or one legacy lane.
+
+        Returns:
+            Dict of lane name -> {'name', 'tokens', 'project_id', 'client'}, or an
+            empty dict after emitting an error
+        """
+        lanes = {}
+
+        if account_mgr.is_multi_account_enabled():
+            enabled_accounts = account_mgr.get_enabled_accounts()
+            self.log.emit(
+                f"[INFO] Multi-account mode: {len(enabled_accounts)} accounts active"
+            )
+
+            for idx, acc in enumerate(enabled_accounts, 1):
+                project_id = acc.project_id
 
                 # Validate tokens
-                if not tokens:
-                    self.log.emit(f"[ERROR] Account '{account.name}' has no tokens!")
-                    self.error_occurred.emit(f"Account '{account.name}' has no tokens")
-                    return
+                if not acc.tokens:
+                    self.log.emit(f"[ERROR] Account '{acc.name}' has no tokens!")
+                    self.error_occurred.emit(f"Account '{acc.name}' has no tokens")
+                    return {}
 
                 # Validate project_id
                 if not project_id or not isinstance(project_id, str) or not project_id.strip():
-                    self.log.emit(f"[ERROR] Account '{account.name}' has invalid project_id!")
+                    self.log.emit(f"[ERROR] Account '{acc.name}' has invalid project_id!")
                     self.error_occurred.emit(
-                        f"Account '{account.name}' has invalid project_id"
+                        f"Account '{acc.name}' has invalid project_id"
                     )
-                    return
+                    return {}
 
                 project_id = project_id.strip()
                 proj_id_short = (
@@ -236,316 +361,323 @@ class VideoGenerationWorker(QThread):
                     else project_id
                 )
                 self.log.emit(
-                    f"[INFO] Scene {actual_scene_num}: Using account '{account.name}' | "
-                    f"Project: {proj_id_short}"
+                    f"[INFO]   Account {idx}: {acc.name} | "
+                    f"Project: {proj_id_short} | Tokens: {len(acc.tokens)}"
                 )
-            else:
-                # Legacy mode: use old tokens and default_project_id
-                tokens = st.get("tokens") or []
-                if not tokens:
-                    self.log.emit(
-                        "[ERROR] No Google Labs tokens configured! "
-                        "Please add tokens in API Credentials."
-                    )
-                    self.error_occurred.emit("No tokens configured")
-                    return
+                lanes[acc.name] = {
+                    'name': acc.name,
+                    'tokens': acc.tokens,
+                    'project_id': project_id,
+                    'client': LabsFlowClient(acc.tokens, on_event=self._handle_labs_event),
+                }
+
+            if not lanes:
+                self.log.emit("[ERROR] No enabled accounts available!")
+                self.error_occurred.emit("No enabled accounts")
+            return lanes
+
+        # Legacy mode: use old tokens and default_project_id
+        tokens = st.get("tokens") or []
+        if not tokens:
+            self.log.emit(
+                "[ERROR] No Google Labs tokens configured! "
+                "Please add tokens in API Credentials."
+            )
+            self.error_occurred.emit("No tokens configured")
+            return {}
+
+        # Get project_id with strict validation and fallback
+        project_id = st.get("default_project_id")
+        if not project_id or not isinstance(project_id, str) or not project_id.strip():
+            # Use fallback if missing/invalid
+            project_id = DEFAULT_PROJECT_ID
+            self.log.emit(f"[INFO] Using default project_id: {project_id}")
+        else:
+            project_id = project_id.strip()
+            self.log.emit(f"[INFO] Using configured project_id: {project_id}")
+
+        # Validate project_id format (should be UUID-like)
+        if len(project_id) < 10:
+            self.log.emit(
+                f"[WARN] Project ID '{project_id}' seems invalid (too short), "
+                "using default"
+            )
+            project_id = DEFAULT_PROJECT_ID
 
-                # Get project_id with strict validation and fallback
-                project_id = st.get("default_project_id")
-                if not project_id or not isinstance(project_id, str) or not project_id.strip():
-                    # Use fallback if missing/invalid
-                    project_id = DEFAULT_PROJECT_ID
-                    self.log.emit(f"[INFO] Using default project_id: {project_id}")
-                else:
-                    project_id = project_id.strip()
-                    self.log.emit(f"[INFO] Using configured project_id: {project_id}")
-
-                # Validate project_id format (should be UUID-like)
-                if len(project_id) < 10:
-                    self.log.emit(
-                        f"[WARN] Project ID '{project_id}' seems invalid (too short), "
-                        "using default"
-                    )
-                    project_id = DEFAULT_PROJECT_ID
-
-            # Create or reuse client for this project_id
-            if project_id not in client_cache:
-                client_cache[project_id] = LabsFlowClient(tokens, on_event=on_labs_event)
-            client = client_cache[project_id]
-
-            # Single API call with copies parameter
-            body = {
-                "prompt": scene["prompt"],
-                "copies": copies,
-                "model": model_key,
-                "aspect_ratio": ratio
-            }
-            self.log.emit(f"[INFO] Start scene {actual_scene_num} with {copies} copies in one batch…")
-            rc = client.start_one(
-                body, model_key, ratio, scene["prompt"], copies=copies, project_id=project_id
+        lanes["default"] = {
+            'name': "default",
+            'tokens': tokens,
+            'project_id': project_id,
+            'client': LabsFlowClient(tokens, on_event=self._handle_labs_event),
+        }
+        return lanes
+
+    def _submit_scene(self, lane, scene, actual_scene_num, model_key, copies, total_scenes):
+        """
+        Start one scene on its account lane (runs on the lane's thread pool).
+
+        Returns:
+            (operation count, request body holding operation names/metadata)
+        """
+        if self.cancelled:
+            return 0, {}
+
+        # Update progress: Starting scene
+        self.progress_updated.emit(
+            actual_scene_num - 1, total_scenes, f"Submitting scene {actual_scene_num}..."
+        )
+
+        ratio = scene["aspect"]
+        # Single API call with copies parameter
+        body = {
+            "prompt": scene["prompt"],
+            "copies": copies,
+            "model": model_key,
+            "aspect_ratio": ratio
+        }
+        self.log.emit(f"[INFO] Start scene {actual_scene_num} with {copies} copies in one batch…")
+        rc = lane['client'].start_one(
+            body, model_key, ratio, scene["prompt"], copies=copies, project_id=lane['project_id']
+        )
+        if rc > 0 and self._journal:
+            self._journal.record_submitted(
+                actual_scene_num, scene["prompt"], body, lane['name'], lane['project_id'], model_key
             )
+        return rc, body
 
-            if rc > 0:
-                # Only create cards for operations that actually exist in the API response
-                actual_count = len(body.get("operation_names", []))
-
-                if actual_count < copies:
-                    self.log.emit(f"[WARN] Scene {actual_scene_num}: API returned {actual_count} operations but {copies} copies were requested")
-
-                # Create cards only for videos that actually exist
-                for copy_idx in range(1, actual_count + 1):
-                    card = {
-                        "scene": actual_scene_num,
-                        "copy": copy_idx,
-                        "status": "PROCESSING",
-                        "json": scene["prompt"],
-                        "url": "",
-                        "path": "",
-                        "thumb": "",
-                        "dir": dir_videos
-                    }
-                    self.job_card.emit(card)
-
-                    # Store card data with copy index for operation name mapping
-                    job_info = {
-                        'card': card,
-                        'body': body,
-                        'scene': actual_scene_num,
-                        'copy': copy_idx
-                    }
-                    jobs.append(job_info)
-            else:
-                # All copies failed to start
-                for copy_idx in range(1, copies + 1):
-                    card = {
-                        "scene": actual_scene_num,
-                        "copy": copy_idx,
-                        "status": "FAILED_START",
-                        "error_reason": "Failed to start video generation",
-                        "json": scene["prompt"],
-                        "url": "",
-                        "path": "",
-                        "thumb": "",
-                        "dir": dir_videos
-                    }
-                    self.job_card.emit(card)
-
-        # Polling loop with improved error handling
-        retry_count = {}
+    def _poll_jobs(self, jobs, title, dir_videos, thumbs_dir, total_scenes, restored=None):
+        """
+        Wait for job completions pushed by the shared operation poller.
+
+        Finished videos are handed to the download pipeline, so polling never
+        stalls on a large file or an ffmpeg thumbnail call. Every outcome is
+        written to the job journal so an interrupted run can resume.
+        """
+        poller = get_operation_poller()
+        pipeline = get_download_pipeline()
+        events = queue.Queue()
+        pending = {}
+        busy = set()  # (scene, copy) with a download or thumbnail still running
         download_retry_count = {}
-        max_retries = 3
         max_download_retries = 5
+        completed_videos = list(restored or [])
+        journal = self._journal
+
+        def on_done(op_name, op_result):
+            events.put(("op", op_name, op_result))
+
+        def watch(job_info):
+            op_name = job_info['op_name']
+            pending[op_name] = job_info
+            poller.watch(
+                job_info['client'], op_name, on_done,
+                metadata=job_info['body'].get("operation_metadata", {}).get(op_name),
+                project_id=job_info.get('project_id'),
+                model_key=job_info.get('model_key', ""),
+                submitted_at=job_info.get('submitted_at'),  # reattached ops keep their original deadline
+            )
 
-        completed_videos = []
+        def download(job_info):
+            card = job_info['card']
+            scene, copy_num = card["scene"], card["copy"]
+            busy.add((scene, copy_num))
+            self.log.emit(f"[INFO] Downloading scene {scene} copy {copy_num}...")
+            pipeline.submit(
+                card["url"], job_info['dest'],
+                lambda result: events.put(("downloaded", job_info, result)),
+                thumb_fn=lambda path: self._make_thumb(path, thumbs_dir, scene, copy_num),
+                on_thumb=lambda thumb: events.put(("thumb", job_info, thumb)),
+                downloader=self.video_downloader,
+            )
 
-        for poll_round in range(120):
+        for job_info in jobs:
+            if job_info.get('op_name'):
+                watch(job_info)  # reattached from the job journal
+                continue
+            card = job_info['card']
+            op_names = job_info['body'].get("operation_names", [])
+            op_index = job_info['copy'] - 1
+            if op_index >= len(op_names):
+                self.log.emit(
+                    f"[ERR] Cảnh {card['scene']} video {card['copy']}: "
+                    f"operation index {op_index} out of bounds"
+                )
+                card["status"] = "FAILED"
+                card["error_reason"] = "Operation index out of bounds"
+                self.job_card.emit(card)
+                continue
+            job_info['op_name'] = op_names[op_index]
+            watch(job_info)
+
+        while pending or busy:
             if self.cancelled:
+                poller.unwatch(list(pending))
                 self.log.emit("[INFO] Đã dừng xử lý theo yêu cầu người dùng.")
                 return
 
-            if not jobs:
-                self.log.emit("[INFO] Tất cả video đã hoàn tất hoặc thất bại.")
-                break
+            try:
+                kind, key, result = events.get(timeout=1.0)
+            except queue.Empty:
+                continue
+
+            if kind == "op":
+                job_info = pending.pop(key, None)
+                if job_info is None:
+                    continue
+                ready = self._process_result(job_info, result, title, dir_videos, total_scenes)
+                if journal:
+                    card = job_info['card']
+                    if card["status"] in ("READY", "TIMEOUT"):
+                        journal.record_status(key, card["status"])
+                    else:
+                        journal.record_failed(key, card.get("error_reason") or card["status"])
+                if ready:
+                    download(job_info)
+            elif kind == "downloaded":
+                if result["ok"] and journal:
+                    journal.record_downloaded(key['op_name'], result["path"])
+                if self._process_download(key, result, completed_videos, download_retry_count,
+                                          max_download_retries):
+                    download(key)
+                elif not result["ok"]:
+                    busy.discard((key['card']["scene"], key['card']["copy"]))
+            elif kind == "thumb":
+                card = key['card']
+                card["thumb"] = result
+                self.job_card.emit(card)
+                busy.discard((card["scene"], card["copy"]))
 
-            # Update progress based on completed jobs
             completed_count = len(completed_videos)
-            current_scene = min(completed_count + 1, total_scenes)
             self.progress_updated.emit(
                 completed_count,
                 total_scenes,
                 f"Processing... ({completed_count}/{total_scenes} scenes completed)"
             )
+            if kind == "op" and pending:
+                self.log.emit(f"[INFO] Đang chờ {len(pending)} video...")
 
-            # Extract all operation names from all jobs
-            names = []
-            metadata = {}
-            for job_info in jobs:
-                job_dict = job_info['body']
-                names.extend(job_dict.get("operation_names", []))
-                op_meta = job_dict.get("operation_metadata", {})
-                if op_meta:
-                    metadata.update(op_meta)
-
-            # Batch check with error handling
-            try:
-                rs = client.batch_check_operations(names, metadata)
-            except Exception as e:
-                self.log.emit(f"[WARN] Lỗi kiểm tra trạng thái (vòng {poll_round + 1}): {e}")
-                time.sleep(10)
-                continue
+        # Emit completion signal
+        self.all_completed.emit(completed_videos)
+        self.log.emit(f"[INFO] Video generation completed: {len(completed_videos)} videos downloaded")
 
-            new_jobs = []
-            for job_info in jobs:
-                card = job_info['card']
-                job_dict = job_info['body']
-                copy_idx = job_info['copy']
-
-                # Get operation names list and map this copy to its operation
-                op_names = job_dict.get("operation_names", [])
-                if not op_names:
-                    if 'no_op_count' not in job_info:
-                        job_info['no_op_count'] = 0
-                    job_info['no_op_count'] += 1
-
-                    if job_info['no_op_count'] > 3:
-                        sc = card['scene']
-                        cp = card['copy']
-                        self.log.emit(f"[WARN] Cảnh {sc} video {cp}: không có operation name sau 3 lần thử")
-                    else:
-                        new_jobs.append(job_info)
-                    continue
+    def _process_result(self, job_info, op_result, title, dir_videos, total_scenes):
+        """
+        Apply one finished operation to its card.
 
-                # Map copy index to the correct operation name
-                op_index = copy_idx - 1
-                if op_index >= len(op_names):
-                    sc = card['scene']
-                    cp = card['copy']
-                    self.log.emit(f"[ERR] Cảnh {sc} video {cp}: operation index {op_index} out of bounds")
-                    card["status"] = "FAILED"
-                    card["error_reason"] = "Operation index out of bounds"
-                    self.job_card.emit(card)
-                    continue
+        Returns:
+            True if the video is ready and should be downloaded (``job_info['dest']`` is set)
+        """
+        card = job_info['card']
+        scene = card["scene"]
+        copy_num = card["copy"]
+
+        if op_result.get("status") == "TIMEOUT":
+            card["status"] = "TIMEOUT"
+            card["error_reason"] = "Video generation timed out"
+            self.job_card.emit(card)
+            self.log.emit(f"[TIMEOUT] Scene {scene} Copy {copy_num}: Generation timed out")
+            return False
 
-                op_name = op_names[op_index]
-                op_result = rs.get(op_name) or {}
-
-                # Check raw API response
-                raw_response = op_result.get('raw', {})
-                status = raw_response.get('status', '')
-
-                scene = card["scene"]
-                copy_num = card["copy"]
-
-                if status == 'MEDIA_GENERATION_STATUS_SUCCESSFUL':
-                    # Extract video URL
-                    op_metadata = raw_response.get('operation', {}).get('metadata', {})
-                    video_info = op_metadata.get('video', {})
-                    video_url = video_info.get('fifeUrl', '')
-
-                    if video_url:
-                        card["status"] = "READY"
-                        card["url"] = video_url
-
-                        self.log.emit(f"[SUCCESS] Scene {scene} Copy {copy_num}: Video ready!")
-
-                        # Update progress: Downloading
-                        self.progress_updated.emit(
-                            scene - 1,
-                            total_scenes,
-                            f"Downloading scene {scene} copy {copy_num}..."
-                        )
-
-                        # Download video
-                        raw_fn = f"{title}_scene{scene}_copy{copy_num}.mp4"
-                        fn = sanitize_filename(raw_fn)
-                        fp = os.path.join(dir_videos, fn)
-
-                        self.log.emit(f"[INFO] Downloading scene {scene} copy {copy_num}...")
-
-                        try:
-                            if self._download(video_url, fp):
-                                card["status"] = "DOWNLOADED"
-                                card["path"] = fp
-
-                                thumb = self._make_thumb(fp, thumbs_dir, scene, copy_num)
-                                card["thumb"] = thumb
-
-                                self.log.emit(f"[SUCCESS] ✓ Downloaded: {os.path.basename(fp)}")
-
-                                # Track completed video and emit signal
-                                if fp not in completed_videos:
-                                    completed_videos.append(fp)
-                                    self.scene_completed.emit(scene, fp)
-                            else:
-                                # Track download retries
-                                download_key = f"{scene}_{copy_num}"
-                                retries = download_retry_count.get(download_key, 0)
-                                if retries < max_download_retries:
-                                    download_retry_count[download_key] = retries + 1
-                                    self.log.emit(f"[WARN] Download failed, will retry ({retries + 1}/{max_download_retries})")
-                                    card["status"] = "DOWNLOAD_FAILED"
-                                    card["url"] = video_url
-                                    self.job_card.emit(card)
-                                    new_jobs.append(job_info)
-                                    continue
-                                else:
-                                    self.log.emit(f"[ERR] Download failed after {max_download_retries} attempts")
-                                    card["status"] = "DOWNLOAD_FAILED"
-                                    card["url"] = video_url
-                                    card["error_reason"] = "Download failed after retries"
-                                    self.job_card.emit(card)
-                        except Exception as e:
-                            download_key = f"{scene}_{copy_num}"
-                            retries = download_retry_count.get(download_key, 0)
-                            if retries < max_download_retries:
-                                download_retry_count[download_key] = retries + 1
-                                self.log.emit(f"[ERR] Download error: {e} - will retry ({retries + 1}/{max_download_retries})")
-                                card["status"] = "DOWNLOAD_FAILED"
-                                card["url"] = video_url
-                                self.job_card.emit(card)
-                                new_jobs.append(job_info)
-                                continue
-                            else:
-                                self.log.emit(f"[ERR] Download error after {max_download_retries} attempts: {e}")
-                                card["status"] = "DOWNLOAD_FAILED"
-                                card["url"] = video_url
-                                card["error_reason"] = f"Download error: {str(e)[:50]}"
-                                self.job_card.emit(card)
+        # Check raw API response
+        raw_response = op_result.get('raw', {})
+        status = raw_response.get('status', '')
 
-                        self.job_card.emit(card)
-                    else:
-                        self.log.emit(f"[ERR] Scene {scene} Copy {copy_num}: No video URL in response")
-                        card["status"] = "DONE_NO_URL"
-                        card["error_reason"] = "No video URL in response"
-                        self.job_card.emit(card)
+        if status == 'MEDIA_GENERATION_STATUS_SUCCESSFUL':
+            # Extract video URL
+            op_metadata = raw_response.get('operation', {}).get('metadata', {})
+            video_info = op_metadata.get('video', {})
+            video_url = video_info.get('fifeUrl', '')
 
-                elif status == 'MEDIA_GENERATION_STATUS_FAILED':
-                    # Extract error details
-                    error_info = raw_response.get('operation', {}).get('error', {})
-                    error_message = error_info.get('message', '')
-
-                    # Categorize the error
-                    if 'quota' in error_message.lower() or 'limit' in error_message.lower():
-                        error_reason = "Vượt quota API"
-                    elif 'policy' in error_message.lower() or 'content' in error_message.lower() or 'safety' in error_message.lower():
-                        error_reason = "Nội dung không phù hợp"
-                    elif 'timeout' in error_message.lower():
-                        error_reason = "Timeout"
-                    elif error_message:
-                        error_reason = error_message[:80]
-                    else:
-                        error_reason = "Video generation failed"
+            if not video_url:
+                self.log.emit(f"[ERR] Scene {scene} Copy {copy_num}: No video URL in response")
+                card["status"] = "DONE_NO_URL"
+                card["error_reason"] = "No video URL in response"
+                self.job_card.emit(card)
+                return False
 
-                    card["status"] = "FAILED"
-                    card["error_reason"] = error_reason
-                    self.log.emit(f"[ERR] Scene {scene} Copy {copy_num} FAILED: {error_reason}")
-                    self.job_card.emit(card)
+            card["status"] = "READY"
+            card["url"] = video_url
+            self.job_card.emit(card)
 
-                else:
-                    # Still processing
-                    card["status"] = "PROCESSING"
-                    self.job_card.emit(card)
-                    new_jobs.append(job_info)
+            self.log.emit(f"[SUCCESS] Scene {scene} Copy {copy_num}: Video ready!")
 
-            jobs = new_jobs
+            # Update progress: Downloading
+            self.progress_updated.emit(
+                scene - 1,
+                total_scenes,
+                f"Downloading scene {scene} copy {copy_num}..."
+            )
 
-            if jobs:
-                poll_info = f"vòng {poll_round + 1}/120"
-                if poll_round >= 100:
-                    self.log.emit(f"[WARN] Đang chờ {len(jobs)} video ({poll_info}) - sắp hết thời gian chờ!")
-                else:
-                    self.log.emit(f"[INFO] Đang chờ {len(jobs)} video ({poll_info})...")
-                time.sleep(5)
-
-        # Handle timeout
-        if jobs:
-            for job_info in jobs:
-                card = job_info['card']
-                card["status"] = "TIMEOUT"
-                card["error_reason"] = "Video generation timed out"
-                self.job_card.emit(card)
-                self.log.emit(f"[TIMEOUT] Scene {card['scene']} Copy {card['copy']}: Generation timed out")
+            raw_fn = f"{title}_scene{scene}_copy{copy_num}.mp4"
+            job_info['dest'] = os.path.join(dir_videos, sanitize_filename(raw_fn))
+            return True
 
-        # Emit completion signal
-        self.all_completed.emit(completed_videos)
-        self.log.emit(f"[INFO] Video generation completed: {len(completed_videos)} videos downloaded")
+        if status in ('MEDIA_GENERATION_STATUS_FAILED', 'MEDIA_GENERATION_STATUS_BLOCKED'):
+            # Extract error details
+            error_info = raw_response.get('operation', {}).get('error', {})
+            error_message = error_info.get('message', '')
+
+            # Categorize the error
+            if 'quota' in error_message.lower() or 'limit' in error_message.lower():
+                error_reason = "Vượt quota API"
+            elif 'policy' in error_message.lower() or 'content' in error_message.lower() or 'safety' in error_message.lower():
+                error_reason = "Nội dung không phù hợp"
+            elif 'timeout' in error_message.lower():
+                error_reason = "Timeout"
+            elif error_message:
+                error_reason = error_message[:80]
+            else:
+                error_reason = "Video generation failed"
+
+            card["status"] = "FAILED"
+            card["error_reason"] = error_reason
+            self.log.emit(f"[ERR] Scene {scene} Copy {copy_num} FAILED: {error_reason}")
+            self.job_card.emit(card)
+            return False
+
+        # Terminal per the normalized status but not a known raw state
+        card["status"] = op_result.get("status") or "FAILED"
+        card["error_reason"] = "Unexpected operation state"
+        self.job_card.emit(card)
+        return False
+
+    def _process_download(self, job_info, result, completed_videos, download_retry_count,
+                          max_download_retries):
+        """
+        Apply a download-stage result to its card.
+
+        Returns:
+            True if the download failed and should be queued again
+        """
+        card = job_info['card']
+        scene = card["scene"]
+        copy_num = card["copy"]
+        fp = result["path"]
+        error = result["error"]
+
+        if result["ok"]:
+            card["status"] = "DOWNLOADED"
+            card["path"] = fp
+            self.log.emit(f"[SUCCESS] ✓ Downloaded: {os.path.basename(fp)}")
+
+            # Track completed video and emit signal
+            if fp not in completed_videos:
+                completed_videos.append(fp)
+                self.scene_completed.emit(scene, fp)
+            self.job_card.emit(card)
+            return False
+
+        # Track download retries
+        download_key = f"{scene}_{copy_num}"
+        retries = download_retry_count.get(download_key, 0)
+        card["status"] = "DOWNLOAD_FAILED"
+        if retries < max_download_retries:
+            download_retry_count[download_key] = retries + 1
+            self.log.emit(f"[ERR] Download error: {error} - will retry ({retries + 1}/{max_download_retries})")
+            self.job_card.emit(card)
+            return True
+
+        self.log.emit(f"[ERR] Download error after {max_download_retries} attempts: {error}")
+        card["error_reason"] = f"Download error: {str(error)[:50]}"
+        self.job_card.emit(card)
+        return False
@@ -1,8 +1,11 @@
 
+import copy
 import json
 import os
 import logging
-from typing import Tuple
+import threading
+import time
+from typing import Any, Optional, Tuple
 
 # Try to import python-dotenv for .env file support (optional)
 try:
@@ -87,39 +90,177 @@ def validate_config(cfg: dict) -> Tuple[bool, str]:
     return True, ""
 
 
+# Seconds between mtime checks of the config file; reads in between are served from memory
+_STAT_INTERVAL = 1.0
+
+
+class _ConfigStore:
+    """
+    In-memory copy of the config file, re-read only when its mtime/size changes.
+
+    The file is stat()ed at most once per _STAT_INTERVAL, so hot paths that read
+    config per request do no file I/O or JSON parsing.
+    """
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._raw: Optional[dict] = None  # file contents as parsed (None if missing/unreadable)
+        self._merged: Optional[dict] = None  # validated file contents merged over defaults
+        self._sig = None
+        self._checked = 0.0
+        self.version = 0
+
+    @staticmethod
+    def _signature():
+        try:
+            st = os.stat(CFG_PATH)
+            return (CFG_PATH, st.st_mtime_ns, st.st_size)
+        except OSError:
+            return (CFG_PATH, None, None)
+
+    def _reload(self, sig):
+        raw, merged = None, get_default_config()
+        if sig[1] is not None:
+            try:
+                with open(CFG_PATH, "r", encoding="utf-8") as f:
+                    raw = json.load(f)
+
+                # Validate loaded config
+                is_valid, error_msg = validate_config(raw)
+                if not is_valid:
+                    logger.error(f"Config validation failed: {error_msg}. Using defaults.")
+                else:
+                    # Merge loaded config with defaults (loaded values take precedence)
+                    merged.update(raw)
+                    logger.info("Config loaded successfully")
+
+            except json.JSONDecodeError as e:
+                logger.error(f"Config JSON decode error: {e}. Using defaults.")
+            except Exception as e:
+                logger.error(f"Error loading config: {e}. Using defaults.")
+        else:
+            logger.info("Config file not found, using defaults")
+        self._raw = raw if isinstance(raw, dict) else None
+        self._merged = merged
+        self._sig = sig
+        self.version += 1
+
+    def _fresh(self):
+        now = time.monotonic()
+        if self._merged is not None and now - self._checked < _STAT_INTERVAL:
+            return
+        self._checked = now
+        sig = self._signature()
+        if self._merged is None or sig != self._sig:
+            self._reload(sig)
+
+    def merged(self) -> dict:
+        with self._lock:
+            self._fresh()
+            return self._merged
+
+    def raw(self) -> Optional[dict]:
+        with self._lock:
+            self._fresh()
+            return self._raw
+
+    def current_version(self) -> int:
+        with self._lock:
+            self._fresh()
+            return self.version
+
+    def invalidate(self):
+        with self._lock:
+            self._merged = None
+
+
+_STORE = _ConfigStore()
+
+
 def load() -> dict:
     """
     Load config with defaults and validation.
     
     Returns:
         Configuration dictionary with validated structure and safe defaults.
+        The caller owns the returned dict (safe to modify and pass to save()).
     """
-    defaults = get_default_config()
-    cfg = defaults.copy()
+    return copy.deepcopy(_STORE.merged())
 
-    # Try to load existing config
-    if os.path.exists(CFG_PATH):
-        try:
-            with open(CFG_PATH, "r", encoding="utf-8") as f:
-                loaded_cfg = json.load(f)
-
-            # Validate loaded config
-            is_valid, error_msg = validate_config(loaded_cfg)
-            if not is_valid:
-                logger.error(f"Config validation failed: {error_msg}. Using defaults.")
-            else:
-                # Merge loaded config with defaults (loaded values take precedence)
-                cfg.update(loaded_cfg)
-                logger.info("Config loaded successfully")
-
-        except json.JSONDecodeError as e:
-            logger.error(f"Config JSON decode error: {e}. Using defaults.")
-        except Exception as e:
-            logger.error(f"Error loading config: {e}. Using defaults.")
-    else:
-        logger.info("Config file not found, using defaults")
 
-    return cfg
+def snapshot() -> dict:
+    """
+    Shared, read-only view of the current config (no copy).
+
+    Use for frequent reads; never modify the returned dict.
+    """
+    return _STORE.merged()
+
+
+def raw_snapshot() -> Optional[dict]:
+    """Config file contents as parsed, without defaults or validation (None if missing)."""
+    return _STORE.raw()
+
+
+def version() -> int:
+    """Counter that increases every time the config file content is (re)loaded."""
+    return _STORE.current_version()
+
+
+def invalidate():
+    """Force the next read to go back to the file."""
+    _STORE.invalidate()
+
+
+def get(path: str, default: Any = None) -> Any:
+    """
+    Read a value by dotted path, e.g. get("resilience.concurrency.labs", 3).
+
+    Returns default when any part of the path is missing.
+    """
+    node: Any = _STORE.merged()
+    for part in path.split("."):
+        if not isinstance(node, dict) or part not in node:
+            return default
+        node = node[part]
+    return node
+
+
+def get_int(path: str, default: int = 0) -> int:
+    try:
+        return int(get(path, default))
+    except (TypeError, ValueError):
+        return default
+
+
+def get_float(path: str, default: float = 0.0) -> float:
+    try:
+        return float(get(path, default))
+    except (TypeError, ValueError):
+        return default
+
+
+def get_bool(path: str, default: bool = False) -> bool:
+    v = get(path, default)
+    if isinstance(v, str):
+        return v.strip().lower() in ("1", "true", "yes", "on")
+    return bool(v)
+
+
+def get_str(path: str, default: str = "") -> str:
+    v = get(path, default)
+    return v if isinstance(v, str) else default
+
+
+def get_list(path: str, default: Optional[list] = None) -> list:
+    v = get(path, None)
+    return list(v) if isinstance(v, list) else list(default or [])
+
+
+def get_section(path: str) -> dict:
+    """Config sub-dict at ``path`` (empty dict if missing or not a dict). Read-only."""
+    v = get(path, None)
+    return v if isinstance(v, dict) else {}
 
 
 def _parse_comma_separated_env(env_value: str) -> list:
@@ -202,5 +343,7 @@ def save(cfg: dict) -> dict:
         logger.info("Config saved successfully")
     except Exception as e:
         logger.error(f"Error saving config: {e}")
+    finally:
+        invalidate()
 
     return cfg
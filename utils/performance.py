@@ -9,6 +9,7 @@ import hashlib
 import pickle
 import os
 import logging
+import threading
 from typing import Any, Callable, Dict, Optional
 from functools import wraps
 from pathlib import Path
@@ -73,6 +74,68 @@ def get_session(
     return _session
 
 
+# Keep-alive sessions keyed by scope (e.g. one per Labs account)
+_scoped_sessions: Dict[str, requests.Session] = {}
+_scoped_lock = threading.Lock()
+
+
+def _pool_cfg() -> Dict[str, Any]:
+    try:
+        from utils import config as cfg
+        return cfg.get_section("http_pool")
+    except Exception:
+        return {}
+
+
+def get_pooled_session(
+    scope: str = "default",
+    pool_connections: Optional[int] = None,
+    pool_maxsize: Optional[int] = None
+) -> requests.Session:
+    """
+    Get or create a keep-alive session for a scope
+    
+    Unlike get_session(), these sessions never retry on their own: callers such as
+    the Labs clients run their own token-aware retry loops, and a transport-level
+    POST retry could submit a paid generation twice. Each host gets its own
+    connection pool inside the session; use a distinct scope per account to keep
+    accounts' connections isolated.
+    
+    Args:
+        scope: Isolation key, e.g. "labs:<account>" or "downloads"
+        pool_connections: Number of per-host pools to keep (config: http_pool.pool_connections)
+        pool_maxsize: Connections kept alive per host (config: http_pool.pool_maxsize)
+    
+    Returns:
+        Shared requests.Session for the scope
+    """
+    with _scoped_lock:
+        session = _scoped_sessions.get(scope)
+        if session is None:
+            c = _pool_cfg()
+            adapter = HTTPAdapter(
+                pool_connections=pool_connections or int(c.get("pool_connections", 10)),
+                pool_maxsize=pool_maxsize or int(c.get("pool_maxsize", 20)),
+                max_retries=0
+            )
+            session = requests.Session()
+            session.mount("http://", adapter)
+            session.mount("https://", adapter)
+            _scoped_sessions[scope] = session
+        return session
+
+
+def close_pooled_sessions():
+    """Close all scoped sessions (e.g. on application exit or after token changes)"""
+    with _scoped_lock:
+        for session in _scoped_sessions.values():
+            try:
+                session.close()
+            except Exception:
+                pass
+        _scoped_sessions.clear()
+
+
 def _add_timeout_to_session(request_func):
     """Add default timeout to session requests"""
     @wraps(request_func)
@@ -156,13 +219,14 @@ class DiskCache:
     Simple disk-based cache for persistent storage
     """
 
-    def __init__(self, cache_dir: str = None, max_age_days: int = 7):
+    def __init__(self, cache_dir: str = None, max_age_days: float = 7, max_size_mb: float = 0):
         """
         Initialize disk cache
         
         Args:
             cache_dir: Directory for cache files (defaults to ./cache)
             max_age_days: Maximum age of cache files in days
+            max_size_mb: Evict oldest files once the cache exceeds this size (0 = unbounded)
         """
         if cache_dir is None:
             cache_dir = os.path.join(
@@ -173,6 +237,7 @@ class DiskCache:
         self.cache_dir = Path(cache_dir)
         self.cache_dir.mkdir(parents=True, exist_ok=True)
         self.max_age_seconds = max_age_days * 24 * 3600
+        self.max_size_bytes = int(max_size_mb * 1024 * 1024)
 
     def _get_cache_path(self, key: str) -> Path:
         """Get cache file path for key"""
@@ -205,12 +270,40 @@ class DiskCache:
     def set(self, key: str, value: Any):
         """Set value in disk cache"""
         cache_path = self._get_cache_path(key)
+        tmp_path = cache_path.with_name(f"{cache_path.name}.{threading.get_ident()}.tmp")
 
         try:
-            with open(cache_path, 'wb') as f:
+            # Write then rename, so concurrent readers never see a partial file
+            with open(tmp_path, 'wb') as f:
                 pickle.dump(value, f)
+            os.replace(tmp_path, cache_path)
         except (pickle.PickleError, IOError) as e:
+            tmp_path.unlink(missing_ok=True)
             logger.warning(f"Could not write to cache: {e}")
+            return
+
+        if self.max_size_bytes:
+            self._evict()
+
+    def _evict(self):
+        """Remove the oldest files until the cache fits in max_size_bytes"""
+        entries = []
+        for cache_file in self.cache_dir.glob("*.cache"):
+            try:
+                st = cache_file.stat()
+            except OSError:
+                continue
+            entries.append((st.st_mtime, st.st_size, cache_file))
+        total = sum(size for _, size, _ in entries)
+        for _, size, cache_file in sorted(entries, key=lambda e: e[0]):
+            if total <= self.max_size_bytes:
+                break
+            cache_file.unlink(missing_ok=True)
+            total -= size
+
+    def delete(self, key: str):
+        """Remove a single entry from disk cache"""
+        self._get_cache_path(key).unlink(missing_ok=True)
 
     def clear(self):
         """Clear all cache files"""